@@ -4,7 +4,13 @@ from flask_login import LoginManager
 from flask_mail import Mail
 from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
+from werkzeug.middleware.proxy_fix import ProxyFix
 
+from app.assets import StaticAssets
+from app.cache import FragmentCache, TTLCache
+from app.metrics import Metrics
+from app.ratelimit import LoginThrottle
+from app.storage import storage_from_config
 from config import config
 
 db = SQLAlchemy()
@@ -18,6 +24,11 @@ def create_app(config_name="default"):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
 
+    # Behind a router, take the client address and scheme from its headers
+    proxies = app.config["TRUSTED_PROXY_COUNT"]
+    if proxies:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
+
     # Initialize extensions
     db.init_app(app)
     login_manager.init_app(app)
@@ -25,6 +36,33 @@ def create_app(config_name="default"):
     mail.init_app(app)
     CORS(app)
 
+    # Per-worker caches and services; each app instance gets its own
+    from app.outbox import collect_metrics as collect_outbox_metrics
+    from app.tasks import TaskRunner
+
+    app.extensions["principal_cache"] = TTLCache(  # see models.load_user
+        maxsize=app.config["PRINCIPAL_CACHE_SIZE"], ttl=app.config["PRINCIPAL_CACHE_TTL"]
+    )
+    app.extensions["email_template_cache"] = TTLCache(
+        maxsize=app.config["EMAIL_TEMPLATE_CACHE_SIZE"], ttl=app.config["EMAIL_TEMPLATE_CACHE_TTL"]
+    )
+    app.extensions["qr_cache"] = TTLCache(maxsize=app.config["QR_CODE_CACHE_SIZE"])
+    app.extensions["ical_cache"] = TTLCache(maxsize=app.config["ICAL_CACHE_SIZE"])
+    app.extensions["calendar_cache"] = TTLCache(  # see app.calendar_cache
+        maxsize=app.config["CALENDAR_CACHE_SIZE"], ttl=app.config["CALENDAR_CACHE_TTL"]
+    )
+    app.extensions["upcoming_cache"] = FragmentCache(  # see routes.calendar.get_upcoming_events
+        maxsize=app.config["UPCOMING_CACHE_SIZE"],
+        ttl=app.config["UPCOMING_CACHE_TTL"],
+        stale_ttl=app.config["UPCOMING_CACHE_STALE"],
+    )
+    app.extensions["storage"] = storage_from_config(app.config)
+    app.extensions["metrics"] = Metrics()
+    app.extensions["metrics"].add_collector(collect_outbox_metrics)
+    app.extensions["login_throttle"] = LoginThrottle.from_config(app.config)
+    app.extensions["tasks"] = TaskRunner(app)
+    app.extensions["assets"] = StaticAssets(app)
+
     # Login manager configuration
     login_manager.login_view = "views.login"
     login_manager.login_message = "Please log in to access this page."
@@ -32,6 +70,7 @@ def create_app(config_name="default"):
 
     # Import models
     from app import models  # noqa: F401
+    from app import tokens  # noqa: F401
     from app.routes.admin import admin_bp
     from app.routes.attendance import attendance_bp
 
@@ -39,6 +78,7 @@ def create_app(config_name="default"):
     from app.routes.auth import auth_bp
     from app.routes.calendar import calendar_bp
     from app.routes.events import events_bp
+    from app.routes.notifications import notifications_bp
     from app.routes.views import views_bp
 
     # Register view routes (HTML templates)
@@ -50,6 +90,33 @@ def create_app(config_name="default"):
     app.register_blueprint(calendar_bp, url_prefix="/api/calendar")
     app.register_blueprint(attendance_bp, url_prefix="/api/attendance")
     app.register_blueprint(admin_bp, url_prefix="/api/admin")
+    app.register_blueprint(notifications_bp, url_prefix="/api/notifications")
+
+    # Deliver queued email from a background thread, started on the first request
+    if app.config["OUTBOX_WORKER_ENABLED"]:
+        from app.outbox import OutboxWorker
+
+        worker = app.extensions["outbox_worker"] = OutboxWorker(app)
+        app.before_request(worker.ensure_started)
+
+    # Send event reminders from a background thread, started on the first request
+    if app.config["REMINDER_SCHEDULER_ENABLED"]:
+        from app.reminders import ReminderScheduler
+
+        scheduler = app.extensions["reminder_scheduler"] = ReminderScheduler(app)
+        app.before_request(scheduler.ensure_started)
+
+    # Requeue announcement jobs lost with a restarted worker
+    if app.config["ANNOUNCEMENT_SWEEPER_ENABLED"]:
+        from app.announcements import AnnouncementSweeper
+
+        sweeper = app.extensions["announcement_sweeper"] = AnnouncementSweeper(app)
+        app.before_request(sweeper.ensure_started)
+
+    # Register CLI commands
+    from app.cli import register_commands
+
+    register_commands(app)
 
     # Create database tables
     with app.app_context():
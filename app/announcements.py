@@ -0,0 +1,234 @@
+"""Event announcements sent to every member of a department.
+
+A request only records an ``AnnouncementJob``; the work runs on the task
+runner: the audience is resolved in one query, the ``Notification`` rows are
+bulk-inserted, and email goes out in throttled batches, each over a single SMTP
+connection. Messages the relay refuses are handed to the outbox for retries.
+
+Each batch commits with the id of its last recipient and a heartbeat. The task
+runner does not survive a restart or deploy, so ``AnnouncementSweeper`` requeues
+queued or running jobs whose heartbeat is older than ``ANNOUNCEMENT_STALL_AFTER``
+seconds, and the job resumes after the last recipient it reached.
+"""
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from flask_mail import Message
+from markupsafe import escape
+from sqlalchemy import and_, func, insert, or_, select, update
+
+from app import db, mail
+from app.email import (
+    fill_user_fields,
+    queue_email,
+    record_send_failure,
+    render_event_email,
+    send_message,
+)
+from app.models import AnnouncementJob, Notification, User
+from app.tasks import PeriodicWorker, submit_task
+
+UNFINISHED = ("queued", "running")
+
+
+def start_announcement(event, department_id, created_by, title, message):
+    """Record an announcement job and hand it to the task runner."""
+    job = AnnouncementJob(
+        event_id=event.id,
+        department_id=department_id,
+        created_by=created_by,
+        title=title,
+        message=message,
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    submit_task(run_announcement, job.id)
+    # The task may already have run (or be running) in another session
+    db.session.expire(job)
+    return job
+
+
+def run_announcement(job_id):
+    """Deliver an announcement job, recording progress as it goes.
+
+    The job is claimed first, so a duplicate submission (or a sweep racing a
+    live run) returns without sending: only a queued job, or a running one
+    whose heartbeat has gone stale, can be claimed.
+    """
+    now = datetime.utcnow()
+    claimed = db.session.execute(
+        update(AnnouncementJob)
+        .where(
+            AnnouncementJob.id == job_id,
+            or_(
+                AnnouncementJob.status == "queued",
+                and_(AnnouncementJob.status == "running", _last_seen() < _stall_cutoff(now)),
+            ),
+        )
+        .values(
+            status="running",
+            heartbeat_at=now,
+            started_at=func.coalesce(AnnouncementJob.started_at, now),
+        )
+    ).rowcount
+    db.session.commit()
+    if not claimed:
+        return
+    job = db.session.get(AnnouncementJob, job_id)
+
+    try:
+        _deliver(job)
+    except Exception as exc:
+        db.session.rollback()
+        current_app.logger.exception("Announcement job %s failed", job_id)
+        job.status = "failed"
+        job.error = f"{type(exc).__name__}: {exc}"
+    else:
+        job.status = "completed"
+
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def _deliver(job):
+    audience = db.session.execute(
+        select(User.id, User.email, User.first_name)
+        .where(
+            User.department_id == job.department_id,
+            User.is_active == True,  # noqa: E712
+            User.id > (job.last_recipient_id or 0),
+        )
+        .order_by(User.id)
+    ).all()
+
+    # Notifications go out with the recipient count, so a resumed job skips them
+    if not job.total_recipients and audience:
+        job.total_recipients = len(audience)
+        db.session.execute(
+            insert(Notification),
+            [
+                {
+                    "user_id": user_id,
+                    "event_id": job.event_id,
+                    "title": job.title,
+                    "message": job.message,
+                    "notification_type": "event_alert",
+                }
+                for user_id, _, _ in audience
+            ],
+        )
+        db.session.commit()
+
+    text_parts, html_parts = render_event_email(
+        "event_announcement", job.event, title=job.title, message=job.message
+    )
+
+    config = current_app.config
+    batch_size = config["ANNOUNCEMENT_BATCH_SIZE"]
+    rate = config["ANNOUNCEMENT_MAX_EMAILS_PER_SECOND"]
+
+    for start in range(0, len(audience), batch_size):
+        batch = audience[start : start + batch_size]
+        started = time.monotonic()
+
+        messages = [
+            (
+                email,
+                job.title,
+                fill_user_fields(text_parts, first_name),
+                fill_user_fields(html_parts, escape(first_name)),
+            )
+            for _, email, first_name in batch
+        ]
+        sent, failed = _send_batch(messages)
+
+        job.emails_sent += sent
+        job.emails_failed += len(failed)
+        for recipient, subject, text_body, html_body in failed:
+            queue_email(subject, [recipient], text_body, html_body)
+        job.last_recipient_id = batch[-1][0]
+        job.heartbeat_at = datetime.utcnow()
+        db.session.commit()
+
+        if rate:
+            pause = len(batch) / rate - (time.monotonic() - started)
+            if pause > 0:
+                time.sleep(pause)
+
+
+def _send_batch(messages):
+    """Send over one SMTP connection; return the sent count and failed messages."""
+    sent, failed = 0, []
+    remaining = list(messages)
+    try:
+        with mail.connect() as connection:
+            while remaining:
+                recipient, subject, text_body, html_body = remaining.pop(0)
+                msg = Message(subject, recipients=[recipient])
+                msg.body = text_body
+                msg.html = html_body
+                try:
+                    send_message(connection, msg, "announcement")
+                except Exception:
+                    failed.append((recipient, subject, text_body, html_body))
+                else:
+                    sent += 1
+    except Exception as exc:
+        record_send_failure(exc, "announcement", stage="connect")
+        failed.extend(remaining)
+    return sent, failed
+
+
+def _last_seen():
+    """When a job last showed signs of life (jobs from before heartbeats: creation)."""
+    return func.coalesce(AnnouncementJob.heartbeat_at, AnnouncementJob.created_at)
+
+
+def _stall_cutoff(now):
+    return now - timedelta(seconds=current_app.config["ANNOUNCEMENT_STALL_AFTER"])
+
+
+def requeue_stalled_announcements(now=None):
+    """Resubmit unfinished jobs whose heartbeat has gone stale; return how many."""
+    now = now or datetime.utcnow()
+    stalled = db.session.execute(
+        select(AnnouncementJob.id, AnnouncementJob.heartbeat_at).where(
+            AnnouncementJob.status.in_(UNFINISHED), _last_seen() < _stall_cutoff(now)
+        )
+    ).all()
+
+    requeued = []
+    for job_id, heartbeat_at in stalled:
+        # Claim by moving the heartbeat, so one sweeper (in any worker) wins each job
+        claimed = db.session.execute(
+            update(AnnouncementJob)
+            .where(
+                AnnouncementJob.id == job_id,
+                (
+                    AnnouncementJob.heartbeat_at.is_(None)
+                    if heartbeat_at is None
+                    else AnnouncementJob.heartbeat_at == heartbeat_at
+                ),
+            )
+            .values(status="queued", heartbeat_at=now)
+        ).rowcount
+        if claimed:
+            requeued.append(job_id)
+    db.session.commit()
+
+    for job_id in requeued:
+        current_app.logger.warning("Requeueing stalled announcement job %s", job_id)
+        submit_task(run_announcement, job_id)
+    return len(requeued)
+
+
+class AnnouncementSweeper(PeriodicWorker):
+    """Daemon thread that requeues stalled announcement jobs."""
+
+    name = "announcement-sweeper"
+    interval_setting = "ANNOUNCEMENT_SWEEP_INTERVAL"
+
+    def tick(self):
+        requeue_stalled_announcements()
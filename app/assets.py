@@ -0,0 +1,133 @@
+"""Fingerprinted, precompressed static files.
+
+``url_for("static", filename="css/style.css")`` produces
+``/static/css/style.<digest>.css``, where the digest is a hash of the file's
+content, so the URL changes whenever the file does and the response can be
+cached forever. ``flask assets build`` writes ``.br`` and ``.gz`` copies next
+to each text asset at deploy time; each request is answered with the smallest
+variant the client accepts.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+import brotli
+from flask import current_app, request, send_from_directory
+from werkzeug.security import safe_join
+
+from app.storage import IMMUTABLE
+
+DIGEST_LENGTH = 12
+FINGERPRINT = re.compile(
+    r"^(?P<stem>.+)\.(?P<digest>[0-9a-f]{%d})(?P<ext>\.[^./]+)$" % DIGEST_LENGTH
+)
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".map", ".txt", ".html"}
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))  # in order of preference
+
+
+class StaticAssets:
+    """Replaces Flask's static view and fingerprints ``url_for("static")`` URLs."""
+
+    def __init__(self, app):
+        self._digests = {}  # filename: (mtime_ns, size, digest)
+        app.url_defaults(self.inject_fingerprint)
+        app.view_functions["static"] = self.serve
+
+    def digest(self, filename):
+        """Content hash of a static file, or ``None`` if there is no such file."""
+        path = safe_join(current_app.static_folder, filename)
+        if path is None or not os.path.isfile(path):
+            return None
+
+        stat = os.stat(path)
+        cached = self._digests.get(filename)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:DIGEST_LENGTH]
+        self._digests[filename] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def inject_fingerprint(self, endpoint, values):
+        if endpoint != "static" or "filename" not in values:
+            return
+        digest = self.digest(values["filename"])
+        if digest is not None:
+            stem, ext = os.path.splitext(values["filename"])
+            values["filename"] = f"{stem}.{digest}{ext}"
+
+    def serve(self, filename):
+        """Serve a static file, immutable if requested under its current fingerprint.
+
+        A fingerprint from an earlier version of the file gets the current
+        content with a normal revalidating response rather than a 404.
+        """
+        fingerprinted = False
+        match = FINGERPRINT.match(filename)
+        if match:
+            original = match["stem"] + match["ext"]
+            current = self.digest(original)
+            if current is not None:
+                fingerprinted = match["digest"] == current
+                filename = original
+
+        response = self._send(filename)
+        if fingerprinted:
+            response.headers["Cache-Control"] = IMMUTABLE
+        return response
+
+    def _send(self, filename):
+        folder = current_app.static_folder
+        path = safe_join(folder, filename)
+        mimetype = mimetypes.guess_type(filename)[0]
+        if path and os.path.splitext(filename)[1] in COMPRESSIBLE:
+            for encoding, suffix in ENCODINGS:
+                if request.accept_encodings[encoding] and _is_fresh(path + suffix, path):
+                    response = send_from_directory(folder, filename + suffix, mimetype=mimetype)
+                    response.headers["Content-Encoding"] = encoding
+                    response.vary.add("Accept-Encoding")
+                    return response
+
+        response = send_from_directory(folder, filename)
+        response.vary.add("Accept-Encoding")
+        return response
+
+
+def build_assets(folder):
+    """Write compressed variants of every text asset under ``folder``.
+
+    A variant is only kept when it is smaller than the original. Returns the
+    number of assets compressed.
+    """
+    built = 0
+    for root, _, names in os.walk(folder):
+        for name in names:
+            if os.path.splitext(name)[1] not in COMPRESSIBLE:
+                continue
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                data = f.read()
+
+            _write_variant(path + ".gz", gzip.compress(data, 9, mtime=0), len(data))
+            _write_variant(path + ".br", brotli.compress(data), len(data))
+            built += 1
+    return built
+
+
+def _write_variant(path, data, original_size):
+    if len(data) < original_size:
+        with open(path, "wb") as f:
+            f.write(data)
+    elif os.path.exists(path):
+        os.unlink(path)
+
+
+def _is_fresh(variant, original):
+    """Whether ``variant`` exists and was built after ``original`` last changed."""
+    try:
+        return os.stat(variant).st_mtime_ns >= os.stat(original).st_mtime_ns
+    except OSError:
+        return False
@@ -0,0 +1,143 @@
+"""In-process caches shared by the request handlers.
+
+Every cache here lives in ``app.extensions`` so each worker process (and each
+app instance created by the test suite) gets its own copy.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize=1024, ttl=None, timer=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the cached value for ``key`` or ``default`` if missing/expired."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= self._timer():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store ``value`` under ``key``, evicting the least recently used entry."""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = self._timer() + ttl if ttl is not None else None
+
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        """Drop ``key`` from the cache if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+class FragmentCache:
+    """Thread-safe LRU cache of computed values with single-flight refreshes.
+
+    ``get_or_compute`` returns a value while it is fresh (``ttl`` seconds).
+    After that, the first caller recomputes it; concurrent callers are served
+    the expired value for up to ``stale_ttl`` more seconds instead of
+    recomputing too, and callers with nothing to serve wait for the one
+    computation. A value computed across an ``invalidate`` or ``clear`` is
+    returned to its caller but not stored.
+    """
+
+    def __init__(self, maxsize=128, ttl=30, stale_ttl=300, timer=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._timer = timer
+        self._data = OrderedDict()  # key -> (value, fresh_until, stale_until)
+        self._flights = {}  # key -> threading.Event set when its computation ends
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """Return the value for ``key``, calling ``compute()`` if this caller must refresh it."""
+        while True:
+            with self._lock:
+                now = self._timer()
+                entry = self._data.get(key)
+                if entry is not None and entry[2] <= now:
+                    del self._data[key]
+                    entry = None
+                if entry is not None:
+                    self._data.move_to_end(key)
+                    if entry[1] > now or key in self._flights:
+                        return entry[0]
+                flight = self._flights.get(key)
+                if flight is None:
+                    flight = self._flights[key] = threading.Event()
+                    generation = self._generation
+                    break
+            flight.wait()  # nothing to serve yet; the refreshing caller stores it
+
+        try:
+            value = compute()
+            with self._lock:
+                if generation == self._generation:
+                    now = self._timer()
+                    fresh_until = now + self.ttl
+                    self._data[key] = (value, fresh_until, fresh_until + self.stale_ttl)
+                    self._data.move_to_end(key)
+                    while len(self._data) > self.maxsize:
+                        self._data.popitem(last=False)
+            return value
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.set()
+
+    def invalidate(self, key):
+        """Drop ``key``; a computation already running for it is not stored."""
+        with self._lock:
+            self._data.pop(key, None)
+            self._generation += 1
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and entry[1] > self._timer()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
@@ -0,0 +1,305 @@
+"""The FullCalendar payload of ``GET /api/calendar``, cached in month buckets.
+
+Every student browsing the calendar asks for the same few months, so entries
+are cached per worker in buckets keyed on ``(year, month, department_id)``
+(``None`` for the all-departments view). A bucket holds the active events
+starting in that month, serialized with their department name and color by a
+single joined query. A range request is assembled from the buckets of the
+months it spans and streamed to the client as JSON, entry by entry, so neither
+the query results nor the response body are held in memory at once.
+
+Creating, updating or deleting an event evicts the buckets of the months it
+was in and is now in, for its department and for the all-departments view.
+Changing a recurring series or one of its occurrences, or renaming a
+department, evicts everything. Evictions happen at flush and again after
+commit, so a bucket refilled in between from the old data is dropped as well.
+Writes that bypass the ORM (bulk updates, other workers) are picked up when a
+bucket expires after ``CALENDAR_CACHE_TTL`` seconds. The same evictions drop
+the cached lists of ``GET /api/calendar/upcoming``.
+"""
+import heapq
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, joinedload, object_session
+
+from app import db
+from app.localtime import campus_time, local_now
+from app.models import Department, Event, EventException
+from app.recurrence import expand, series_conditions
+
+ALL_BUCKETS = "*"  # queued in place of keys when every bucket is stale
+
+COLORS = [
+    "#3788d8",  # Blue
+    "#f39c12",  # Orange
+    "#27ae60",  # Green
+    "#e74c3c",  # Red
+    "#9b59b6",  # Purple
+    "#1abc9c",  # Turquoise
+    "#e67e22",  # Carrot
+    "#34495e",  # Dark Gray
+]
+
+
+def get_department_color(department_id):
+    """Get a consistent color for a department."""
+    if department_id:
+        return COLORS[department_id % len(COLORS)]
+    return COLORS[0]
+
+
+def calendar_window(start=None, end=None):
+    """Normalize a requested range, defaulting a missing bound.
+
+    Without ``start`` the window opens at the start of today (or
+    ``CALENDAR_DEFAULT_DAYS`` before ``end``); without ``end`` it closes
+    ``CALENDAR_DEFAULT_DAYS`` after ``start``. Raises ``ValueError`` for an
+    inverted range or one longer than ``CALENDAR_MAX_DAYS``.
+    """
+    config = current_app.config
+    default = timedelta(days=config["CALENDAR_DEFAULT_DAYS"])
+    start, end = campus_time(start), campus_time(end)
+    if start is None:
+        today = local_now().replace(hour=0, minute=0, second=0, microsecond=0)
+        start = end - default if end is not None else today
+    if end is None:
+        end = start + default
+
+    if end < start:
+        raise ValueError("End date must be after start date")
+    if end - start > timedelta(days=config["CALENDAR_MAX_DAYS"]):
+        raise ValueError("Date range is limited to %d days" % config["CALENDAR_MAX_DAYS"])
+    return start, end
+
+
+def calendar_events(start, end, department_id=None):
+    """Yield FullCalendar entries for active events starting at or after
+    ``start`` and ending by ``end``, in start order.
+
+    The range is assembled from month buckets; see ``bucket``.
+    """
+    department_id = department_id or None
+    for year, month in months(start, end):
+        for start_time, end_time, entry in bucket(year, month, department_id):
+            if start_time >= start and end_time <= end:
+                yield entry
+
+
+def stream_calendar_json(entries):
+    """Yield ``{"events": [...]}`` piece by piece as entries arrive."""
+    dumps = current_app.json.dumps
+    yield '{"events": ['
+    separator = ""
+    for entry in entries:
+        yield separator + dumps(entry)
+        separator = ", "
+    yield "]}"
+
+
+def bucket(year, month, department_id=None):
+    """Yield ``(start_time, end_time, entry)`` for the active events starting in a month.
+
+    A cached bucket is replayed; otherwise rows are streamed from the database
+    and the bucket is cached once fully read, unless it holds more than
+    ``CALENDAR_BUCKET_MAX_EVENTS`` events. Oversized months are streamed every
+    time, so memory stays bounded however busy a month gets.
+    """
+    cache = current_app.extensions["calendar_cache"]
+    key = (year, month, department_id)
+    cached = cache.get(key)
+    if cached is not None:
+        yield from cached
+        return
+
+    limit = current_app.config["CALENDAR_BUCKET_MAX_EVENTS"]
+    first = datetime(year, month, 1)
+    following = datetime(year + month // 12, month % 12 + 1, 1)
+    collected = []
+    for item in load_entries(first, following, department_id):
+        if collected is not None:
+            collected.append(item)
+            if len(collected) > limit:
+                collected = None
+        yield item
+    if collected is not None:
+        cache.set(key, tuple(collected))
+
+
+def load_entries(starts_from, starts_before, department_id=None):
+    """Query and serialize the events starting in a range, yielding
+    ``(start_time, end_time, entry)`` by start time.
+
+    Single events are fetched ``CALENDAR_STREAM_BATCH`` rows at a time; the
+    occurrences of recurring series are expanded for the range and merged in.
+    """
+    return heapq.merge(
+        _single_entries(starts_from, starts_before, department_id),
+        _series_entries(starts_from, starts_before, department_id),
+        key=lambda item: item[0],
+    )
+
+
+def _single_entries(starts_from, starts_before, department_id):
+    query = (
+        select(
+            Event.id,
+            Event.title,
+            Event.start_time,
+            Event.end_time,
+            Event.description,
+            Event.location,
+            Event.department_id,
+            Department.name.label("department"),
+        )
+        .outerjoin(Department, Department.id == Event.department_id)
+        .where(
+            Event.is_active == True,  # noqa: E712
+            Event.recurrence_rule.is_(None),
+            Event.start_time >= starts_from,
+            Event.start_time < starts_before,
+        )
+        .order_by(Event.start_time, Event.id)
+        .execution_options(yield_per=current_app.config["CALENDAR_STREAM_BATCH"])
+    )
+    if department_id:
+        query = query.where(Event.department_id == department_id)
+
+    for row in db.session.execute(query):
+        yield row.start_time, row.end_time, _entry(
+            row, row.start_time, row.end_time, row.department
+        )
+
+
+def _series_entries(starts_from, starts_before, department_id):
+    query = (
+        select(Event)
+        .options(joinedload(Event.department))
+        .where(
+            Event.is_active == True,  # noqa: E712
+            *series_conditions(starts_from, starts_before),
+        )
+    )
+    if department_id:
+        query = query.where(Event.department_id == department_id)
+
+    for occurrence in expand(db.session.scalars(query), starts_from, starts_before):
+        start, end = occurrence.start_time, occurrence.end_time
+        if start >= starts_from:  # ones already running belong to an earlier bucket
+            event = occurrence.event
+            entry = _entry(event, start, end, event.department.name if event.department else None)
+            entry["groupId"] = event.id  # FullCalendar moves and styles a series together
+            yield start, end, entry
+
+
+def _entry(event, start, end, department):
+    color = get_department_color(event.department_id)
+    return {
+        "id": event.id,
+        "title": event.title,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "description": event.description,
+        "location": event.location,
+        "department": department,
+        "backgroundColor": color,
+        "borderColor": color,
+    }
+
+
+def months(start, end):
+    """``(year, month)`` for every month from ``start``'s through ``end``'s."""
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def invalidate_buckets(keys):
+    """Evict month buckets so the next request reloads them.
+
+    The cached upcoming-events lists are dropped along with them.
+    """
+    upcoming = current_app.extensions.get("upcoming_cache")
+    if upcoming is not None:
+        upcoming.clear()
+    cache = current_app.extensions.get("calendar_cache")
+    if cache is None:
+        return
+    if ALL_BUCKETS in keys:
+        cache.clear()
+        return
+    for key in keys:
+        cache.invalidate(key)
+
+
+def _bucket_keys(target):
+    """Keys of every bucket ``target`` was in before this flush or is in now.
+
+    A series has occurrences in any number of months, so changing one (or
+    turning an event into or out of one) drops every bucket.
+    """
+    state = inspect(target)
+    if _history_values(state.attrs.recurrence_rule.load_history()):
+        return {ALL_BUCKETS}
+    starts = _history_values(state.attrs.start_time.load_history())
+    departments = _history_values(state.attrs.department_id.load_history()) | {None}
+    return {
+        (start.year, start.month, department_id)
+        for start in starts
+        for department_id in departments
+    }
+
+
+def _history_values(history):
+    return {value for value in (*history.unchanged, *history.added, *history.deleted) if value}
+
+
+@event.listens_for(Event.start_time, "set", active_history=True)
+@event.listens_for(Event.recurrence_rule, "set", active_history=True)
+@event.listens_for(Event.department_id, "set", active_history=True)
+def _keep_previous_bucket(target, value, oldvalue, initiator):
+    """Load the old value when these are set, so the history names the old bucket."""
+    return value
+
+
+@event.listens_for(Event, "before_insert")
+@event.listens_for(Event, "before_update")
+@event.listens_for(Event, "before_delete")
+def _queue_bucket_invalidation(mapper, connection, target):
+    """Evict a changed event's buckets now and again once the change is committed."""
+    keys = _bucket_keys(target)
+    invalidate_buckets(keys)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("stale_calendar_buckets", set()).update(keys)
+
+
+@event.listens_for(EventException, "before_insert")
+@event.listens_for(EventException, "before_update")
+@event.listens_for(EventException, "before_delete")
+def _queue_series_invalidation(mapper, connection, target):
+    """A cancelled or moved occurrence changes its series' buckets."""
+    invalidate_buckets({ALL_BUCKETS})
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("stale_calendar_buckets", set()).add(ALL_BUCKETS)
+
+
+@event.listens_for(Department, "after_update")
+def _clear_buckets(mapper, connection, target):
+    """Department names are in every entry; drop the lot when one changes."""
+    invalidate_buckets({ALL_BUCKETS})
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_buckets(session):
+    stale = session.info.pop("stale_calendar_buckets", None)
+    if stale:
+        invalidate_buckets(stale)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_stale_buckets(session):
+    session.info.pop("stale_calendar_buckets", None)
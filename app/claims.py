@@ -0,0 +1,49 @@
+"""Delivery ledgers that make scheduled sends happen once.
+
+Reminders and digests record each delivery in a table with a unique key. A run
+claims its rows with ``INSERT ... ON CONFLICT DO NOTHING ... RETURNING`` and
+only acts on the rows that come back, in the same transaction as the messages
+it queues. A second run (a retry, or another worker or node) gets nothing back
+for rows that already exist, so it skips them.
+"""
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+
+# Dialects whose INSERT supports ON CONFLICT DO NOTHING with RETURNING
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def claim(model, rows, keys):
+    """Insert ledger rows, returning the ``keys`` tuples of the rows that were new.
+
+    ``keys`` names the columns of the table's unique constraint.
+    """
+    if not rows:
+        return set()
+
+    dialect_insert = _UPSERT_INSERTS.get(db.session.get_bind().dialect.name)
+    if dialect_insert is None:
+        return claim_one_by_one(model, rows, keys)
+
+    stmt = (
+        dialect_insert(model)
+        .on_conflict_do_nothing(index_elements=list(keys))
+        .returning(*(getattr(model, key) for key in keys))
+    )
+    return {tuple(row) for row in db.session.execute(stmt, rows)}
+
+
+def claim_one_by_one(model, rows, keys):
+    """Portable fallback: one savepoint per row, skipping unique violations."""
+    claimed = set()
+    for row in rows:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(model), [row])
+        except IntegrityError:
+            continue
+        claimed.add(tuple(row[key] for key in keys))
+    return claimed
@@ -0,0 +1,117 @@
+"""Flask CLI commands (``flask <group> <command>``)."""
+import click
+from flask.cli import AppGroup
+
+roster_cli = AppGroup("roster", help="Manage student rosters.")
+outbox_cli = AppGroup("outbox", help="Deliver queued email.")
+reminders_cli = AppGroup("reminders", help="Send event reminders.")
+digest_cli = AppGroup("digest", help="Send the weekly event digest.")
+qr_cli = AppGroup("qr", help="Export event check-in QR codes.")
+assets_cli = AppGroup("assets", help="Prepare static assets for deployment.")
+calendar_cli = AppGroup("calendar", help="Calendar reports.")
+
+
+@roster_cli.command("import")
+@click.argument("csv_file", type=click.File("r", encoding="utf-8-sig"))
+@click.option("--workers", type=int, default=None, help="Password hashing processes.")
+@click.option("--batch-size", type=int, default=1000, show_default=True)
+def import_roster_command(csv_file, workers, batch_size):
+    """Create user accounts from a CSV roster."""
+    from app.roster import import_roster
+
+    report = import_roster(csv_file, workers=workers, batch_size=batch_size)
+
+    for error in report["errors"]:
+        click.echo(f"line {error['line']}: {error['email']}: {error['error']}", err=True)
+    click.echo(
+        f"Created {report['created']} users "
+        f"({report['without_password']} without a password), {report['failed']} failed."
+    )
+
+
+@outbox_cli.command("drain")
+@click.option("--batch-size", type=int, default=None)
+def drain_outbox_command(batch_size):
+    """Deliver every email that is due now."""
+    from app.outbox import drain_outbox
+
+    sent, failed = drain_outbox(batch_size)
+    click.echo(f"Sent {sent} emails, {failed} failed.")
+
+
+@reminders_cli.command("send")
+def send_reminders_command():
+    """Send every event reminder that is due now."""
+    from app.reminders import send_due_reminders
+
+    sent = send_due_reminders()
+    click.echo(f"Sent {sent} reminders.")
+
+
+@digest_cli.command("send")
+@click.option("--batch-size", type=int, default=None)
+def send_digest_command(batch_size):
+    """Queue this week's digest for every student."""
+    from app.digest import send_weekly_digest
+
+    queued = send_weekly_digest(batch_size=batch_size)
+    click.echo(f"Queued {queued} digests.")
+
+
+@qr_cli.command("export")
+@click.argument("output", type=click.File("wb"))
+@click.option("--event-id", "event_ids", type=int, multiple=True, help="Repeat for each event.")
+@click.option("--department-id", type=int, default=None)
+@click.option("--start", type=click.DateTime(), default=None, help="Events starting on/after.")
+@click.option("--end", type=click.DateTime(), default=None, help="Events starting on/before.")
+@click.option("--format", "fmt", type=click.Choice(["png", "svg"]), default="png")
+@click.option("--workers", type=int, default=None, help="Rendering processes.")
+def export_qr_command(output, event_ids, department_id, start, end, fmt, workers):
+    """Write the QR codes of the selected events to a ZIP file."""
+    from app.qrcodes import find_events, stream_qr_zip
+
+    events = find_events(event_ids, department_id, start, end)
+    for chunk in stream_qr_zip(events, fmt, workers=workers):
+        output.write(chunk)
+    click.echo(f"Exported {len(events)} QR codes.")
+
+
+@assets_cli.command("build")
+def build_assets_command():
+    """Write gzip (and brotli, if installed) copies of the static text assets."""
+    from flask import current_app
+
+    from app.assets import build_assets
+
+    built = build_assets(current_app.static_folder)
+    click.echo(f"Compressed {built} assets.")
+
+
+@calendar_cli.command("conflicts")
+@click.argument("output", type=click.File("w"), default="-")
+@click.option("--start", type=click.DateTime(), default=None, help="Range start (default today).")
+@click.option("--end", type=click.DateTime(), default=None, help="Range end.")
+@click.option("--department-id", type=int, default=None)
+@click.option("--all", "include_unrelated", is_flag=True, help="Include unrelated overlaps.")
+def conflicts_command(output, start, end, department_id, include_unrelated):
+    """Write every overlapping pair of events in a range as JSON lines."""
+    from app.calendar_cache import calendar_window
+    from app.conflicts import stream_conflict_report
+
+    try:
+        start, end = calendar_window(start, end)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    for line in stream_conflict_report(start, end, department_id, include_unrelated):
+        output.write(line)
+
+
+def register_commands(app):
+    """Attach the CLI command groups to ``app``."""
+    app.cli.add_command(roster_cli)
+    app.cli.add_command(outbox_cli)
+    app.cli.add_command(reminders_cli)
+    app.cli.add_command(digest_cli)
+    app.cli.add_command(qr_cli)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(calendar_cli)
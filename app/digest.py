@@ -0,0 +1,226 @@
+"""Weekly digest of upcoming events, emailed to every student.
+
+Each digest lists the upcoming events in the student's department plus any
+event they registered for. Instead of querying per student, the whole run
+takes three set-based queries: upcoming events and recurring series (with
+departments), the registrations for those, and a streamed scan of the
+students; series are expanded into their occurrences in the window (plus one
+query for their exceptions). Each event or occurrence is rendered once
+through the email template cache, the composed event list is memoized per
+(department, registrations) combination, and the messages are written to the
+outbox with one executemany per batch. The run commits once at the end, so the
+outbox sees either every digest or none.
+
+Each digest is recorded in ``digest_dispatches`` under (student, week), claimed
+in the same transaction as its message (see app.claims), so a retried or
+concurrent run for the same week skips the students already sent to.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from flask import current_app
+from markupsafe import escape
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.claims import claim
+from app.email import FIRST_NAME_PLACEHOLDER, queue_emails, render_event_email
+from app.localtime import local_now
+from app.models import Attendance, DigestDispatch, Event, User
+from app.recurrence import expand, series_conditions
+
+DIGEST_SUBJECT = "Your week on MuleSpace"
+
+# Stand-in for the per-student event list while the layout is rendered
+ITEMS_PLACEHOLDER = "\x00items\x00"
+
+
+def send_weekly_digest(now=None, batch_size=None):
+    """Queue a digest for every active student with something to show.
+
+    Students who already have a digest for the week of ``now`` (on the campus
+    clock) are skipped. Returns the number of digests written to the outbox.
+    """
+    config = current_app.config
+    now = now or local_now()
+    week_start = now.date() - timedelta(days=now.weekday())
+    batch_size = batch_size or config["DIGEST_BATCH_SIZE"]
+    until = now + timedelta(days=config["DIGEST_WINDOW_DAYS"])
+
+    events = db.session.scalars(
+        select(Event)
+        .options(joinedload(Event.department))
+        .where(
+            Event.is_active == True,  # noqa: E712
+            or_(
+                and_(
+                    Event.recurrence_rule.is_(None),
+                    Event.start_time > now,
+                    Event.start_time <= until,
+                ),
+                and_(*series_conditions(now, until)),
+            ),
+        )
+    ).all()
+    entries = _entries(events, now, until)
+    if not entries:
+        return 0
+
+    by_department = defaultdict(list)
+    for key, event, _ in entries:
+        by_department[event.department_id].append(key)
+
+    registrations = defaultdict(set)
+    for user_id, event_id in db.session.execute(
+        select(Attendance.user_id, Attendance.event_id).where(
+            Attendance.event_id.in_({event.id for _, event, _ in entries})
+        )
+    ):
+        registrations[user_id].add(event_id)
+
+    composer = _DigestComposer(entries)
+    students = db.session.execute(
+        select(User.id, User.email, User.first_name, User.department_id)
+        .outerjoin(
+            DigestDispatch,
+            (DigestDispatch.user_id == User.id) & (DigestDispatch.week_start == week_start),
+        )
+        .where(
+            User.role == "student",
+            User.is_active == True,  # noqa: E712
+            DigestDispatch.id.is_(None),
+        )
+        .order_by(User.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+    queued = 0
+    batch = []
+    for user_id, email, first_name, department_id in students:
+        registered = frozenset(registrations.get(user_id, ()))
+        items = composer.items(by_department.get(department_id, ()), registered)
+        if items is None:
+            continue
+
+        batch.append(
+            (
+                user_id,
+                email,
+                DIGEST_SUBJECT,
+                composer.fill(composer.text_layout, first_name, items[0]),
+                composer.fill(composer.html_layout, escape(first_name), items[1]),
+            )
+        )
+        if len(batch) >= batch_size:
+            queued += _flush(batch, week_start)
+
+    queued += _flush(batch, week_start)
+    db.session.commit()
+    return queued
+
+
+def _entries(events, now, until):
+    """``(key, event, times)`` for the events and occurrences starting in ``(now, until]``.
+
+    Keys are ``(event_id, occurrence_start)``, with ``None`` for single events;
+    ``times`` are the ``(start, end)`` shown. Sorted by start time.
+    """
+    entries = [
+        ((event.id, None), event, (event.start_time, event.end_time))
+        for event in events
+        if not event.recurrence_rule
+    ]
+    series = [event for event in events if event.recurrence_rule]
+    entries += [
+        (
+            (occurrence.event.id, occurrence.original_start),
+            occurrence.event,
+            (occurrence.start_time, occurrence.end_time),
+        )
+        for occurrence in expand(series, now, until + timedelta(seconds=1))
+        if now < occurrence.start_time <= until
+    ]
+    entries.sort(key=lambda entry: (entry[2][0], entry[0][0]))
+    return entries
+
+
+def _flush(batch, week_start):
+    """Claim a batch's dispatch rows, queue the claimed messages (uncommitted), and empty it.
+
+    ``batch`` holds ``(user_id, *message)`` tuples.
+    """
+    claimed = claim(
+        DigestDispatch,
+        [{"user_id": row[0], "week_start": week_start} for row in batch],
+        ("user_id", "week_start"),
+    )
+    messages = [row[1:] for row in batch if (row[0], week_start) in claimed]
+    queue_emails(messages)
+    batch.clear()
+    return len(messages)
+
+
+class _DigestComposer:
+    """Renders the shared pieces of a digest once and assembles them per student."""
+
+    def __init__(self, entries):
+        self.entries = {key: (event, times) for key, event, times in entries}
+        self.order = {key: position for position, (key, _, _) in enumerate(entries)}
+        self.keys_of = defaultdict(list)  # event id: entry keys (a series has several)
+        for key, _, _ in entries:
+            self.keys_of[key[0]].append(key)
+        self.text_layout, self.html_layout = _render_layout()
+        self._items = {}
+
+    def items(self, department_keys, registered):
+        """Return the ``(text, html)`` event list, or ``None`` if there is nothing.
+
+        ``registered`` holds event ids; registering for a series covers all of
+        its occurrences.
+        """
+        memo = (tuple(department_keys), registered)
+        if memo not in self._items:
+            keys = set(department_keys)
+            for event_id in registered:
+                keys.update(self.keys_of[event_id])
+            if not keys:
+                self._items[memo] = None
+            else:
+                rendered = [
+                    self._render(key, key[0] in registered)
+                    for key in sorted(keys, key=self.order.__getitem__)
+                ]
+                self._items[memo] = tuple("".join(parts) for parts in zip(*rendered))
+        return self._items[memo]
+
+    def _render(self, key, registered):
+        event, times = self.entries[key]
+        text_parts, html_parts = render_event_email(
+            "digest_item",
+            event,
+            times=times if key[1] is not None else None,
+            registered=registered,
+        )
+        return "".join(text_parts), "".join(html_parts)
+
+    @staticmethod
+    def fill(layout, first_name, items):
+        return layout.replace(FIRST_NAME_PLACEHOLDER, str(first_name)).replace(
+            ITEMS_PLACEHOLDER, items
+        )
+
+
+def _render_layout():
+    """Render the digest's surrounding text/HTML once (cached like event emails)."""
+    cache = current_app.extensions["email_template_cache"]
+    layouts = cache.get(("weekly_digest",))
+    if layouts is None:
+        context = {"first_name": FIRST_NAME_PLACEHOLDER, "items": ITEMS_PLACEHOLDER}
+        env = current_app.jinja_env
+        layouts = tuple(
+            env.get_template(f"email/weekly_digest.{ext}").render(context)
+            for ext in ("txt", "html")
+        )
+        cache.set(("weekly_digest",), layouts)
+    return layouts
@@ -1,7 +1,17 @@
 """Email utility functions for MuleSpace."""
+import time
+from contextlib import contextmanager
+
+from flask import current_app
 from flask_mail import Message
+from markupsafe import escape
+from sqlalchemy import insert
+
+from app import db, mail, metrics
+from app.models import OutboxEmail
 
-from app import mail
+# Stand-in for the recipient's name while the shared part of an email is rendered
+FIRST_NAME_PLACEHOLDER = "\x00first_name\x00"
 
 
 def send_email(subject, recipients, text_body, html_body, sender=None):
@@ -9,193 +19,139 @@ def send_email(subject, recipients, text_body, html_body, sender=None):
     msg = Message(subject, recipients=recipients, sender=sender)
     msg.body = text_body
     msg.html = html_body
-    mail.send(msg)
+    # Includes opening the SMTP connection, which is what a waiting request pays
+    with instrumented_send("direct"):
+        mail.send(msg)
+
+
+def send_message(connection, msg, source):
+    """Send ``msg`` over an open ``mail.connect()`` connection, with metrics."""
+    with instrumented_send(source):
+        connection.send(msg)
+
+
+@contextmanager
+def instrumented_send(source):
+    """Time one SMTP send and count its outcome.
+
+    Records ``email_send_seconds`` and ``email_sent_total``, or
+    ``email_send_failures_total`` labelled with the exception type, all
+    labelled with ``source`` (direct, outbox, announcement).
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as exc:
+        record_send_failure(exc, source)
+        raise
+    else:
+        metrics.inc("email_sent_total", source=source)
+    finally:
+        metrics.observe("email_send_seconds", time.perf_counter() - started, source=source)
+
+
+def record_send_failure(exc, source, stage="send"):
+    """Count a failed send, or a failed connection when ``stage="connect"``."""
+    metrics.inc(
+        "email_send_failures_total", source=source, stage=stage, exception=type(exc).__name__
+    )
+
+
+def queue_email(subject, recipients, text_body, html_body):
+    """Add an email to the outbox in the current transaction.
+
+    Nothing is sent until the caller commits; the outbox worker then delivers it.
+    """
+    for recipient in recipients:
+        db.session.add(
+            OutboxEmail(
+                recipient=recipient, subject=subject, text_body=text_body, html_body=html_body
+            )
+        )
+
+
+def queue_emails(messages):
+    """Bulk-add ``(recipient, subject, text_body, html_body)`` tuples to the outbox.
+
+    Same contract as ``queue_email``, but written with a single executemany.
+    """
+    rows = [
+        {"recipient": recipient, "subject": subject, "text_body": text, "html_body": html}
+        for recipient, subject, text, html in messages
+    ]
+    if rows:
+        db.session.execute(insert(OutboxEmail), rows)
 
 
 def send_registration_confirmation(user, event):
     """Send registration confirmation email to user."""
-    subject = f"Confirmed: You're registered for {event.title}"
+    send_email(*build_registration_confirmation(user, event))
+
 
-    # Plain text version
-    text_body = f"""
-Hi {user.first_name},
-
-Great news! You've successfully registered for:
-
-{event.title}
-
-Event Details:
-    Date: {event.start_time.strftime('%A, %B %d, %Y')}
-    Time: {event.start_time.strftime('%I:%M %p')} - {event.end_time.strftime('%I:%M %p')}
-    Location: {event.location}
-    Department: {event.department.name}
-
-{event.description if event.description else ''}
-
-We're excited to see you there! If you have any questions or need to make changes,
-please don't hesitate to reach out.
-
-Best regards,
-The MuleSpace Team
-Colby College
-"""
-
-    # HTML version
-    html_body = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <style>
-        body {{
-            font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            line-height: 1.6;
-            color: #1a1a1a;
-            max-width: 600px;
-            margin: 0 auto;
-            padding: 20px;
-        }}
-        .header {{
-            background: linear-gradient(135deg, #003C71 0%, #6B9AC4 100%);
-            color: white;
-            padding: 30px;
-            border-radius: 12px 12px 0 0;
-            text-align: center;
-        }}
-        .header h1 {{
-            margin: 0;
-            font-size: 24px;
-            font-weight: 600;
-        }}
-        .content {{
-            background: white;
-            padding: 30px;
-            border: 1px solid #e0e0e0;
-            border-top: none;
-        }}
-        .event-card {{
-            background: #f8f9fa;
-            border-left: 4px solid #003C71;
-            padding: 20px;
-            margin: 20px 0;
-            border-radius: 8px;
-        }}
-        .event-title {{
-            color: #003C71;
-            font-size: 20px;
-            font-weight: 600;
-            margin-bottom: 16px;
-        }}
-        .detail-row {{
-            padding: 8px 0;
-            display: flex;
-            align-items: flex-start;
-        }}
-        .detail-label {{
-            font-weight: 500;
-            color: #666;
-            min-width: 100px;
-        }}
-        .detail-value {{
-            color: #1a1a1a;
-        }}
-        .description {{
-            background: white;
-            padding: 16px;
-            border-radius: 6px;
-            margin-top: 16px;
-            color: #666;
-            line-height: 1.8;
-        }}
-        .footer {{
-            background: #f8f9fa;
-            padding: 20px 30px;
-            border-radius: 0 0 12px 12px;
-            text-align: center;
-            color: #666;
-            font-size: 14px;
-        }}
-        .button {{
-            display: inline-block;
-            padding: 12px 24px;
-            background: #003C71;
-            color: white;
-            text-decoration: none;
-            border-radius: 6px;
-            margin: 20px 0;
-            font-weight: 500;
-        }}
-        .message {{
-            background: #e8f5e9;
-            border-left: 4px solid #4caf50;
-            padding: 16px;
-            margin: 20px 0;
-            border-radius: 6px;
-        }}
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1>✓ Registration Confirmed!</h1>
-    </div>
-
-    <div class="content">
-        <p>Hi {user.first_name},</p>
-
-        <p>Great news! You've successfully registered for the following event:</p>
-
-        <div class="event-card">
-            <div class="event-title">{event.title}</div>
-
-            <div class="detail-row">
-                <span class="detail-label">Date:</span>
-                <span class="detail-value">{event.start_time.strftime('%A, %B %d, %Y')}</span>
-            </div>
-
-            <div class="detail-row">
-                <span class="detail-label">Time:</span>
-                <span class="detail-value">
-                    {event.start_time.strftime('%I:%M %p')} -
-                    {event.end_time.strftime('%I:%M %p')}
-                </span>
-            </div>
-
-            <div class="detail-row">
-                <span class="detail-label">Location:</span>
-                <span class="detail-value">{event.location}</span>
-            </div>
-
-            <div class="detail-row">
-                <span class="detail-label">Department:</span>
-                <span class="detail-value">{event.department.name}</span>
-            </div>
-
-            {f'<div class="description">{event.description}</div>' if event.description else ''}
-        </div>
-
-        <div class="message">
-            <strong>📌 What's Next?</strong><br>
-            We're excited to see you at this event! Make sure to add it to
-            your calendar so you don't miss it. When you arrive, you can
-            check in using the QR code at the venue or through the
-            MuleSpace app.
-        </div>
-
-        <p>
-            If you have any questions or need to make changes to your
-            registration, please don't hesitate to reach out to us.
-        </p>
-    </div>
-
-    <div class="footer">
-        <p><strong>MuleSpace</strong><br>
-        Campus Event Management System<br>
-        Colby College</p>
-        <p style="font-size: 12px; color: #999;">
-            This email was sent because you registered for an event through MuleSpace.
-        </p>
-    </div>
-</body>
-</html>
-"""
-
-    send_email(subject, [user.email], text_body, html_body)
+def queue_registration_confirmation(user, event):
+    """Queue registration confirmation email to user in the outbox."""
+    queue_email(*build_registration_confirmation(user, event))
+
+
+def build_registration_confirmation(user, event):
+    """Return ``(subject, recipients, text_body, html_body)`` for a confirmation."""
+    subject = f"Confirmed: You're registered for {event.title}"
+    text_parts, html_parts = render_event_email("registration_confirmation", event)
+
+    return (
+        subject,
+        [user.email],
+        fill_user_fields(text_parts, user.first_name),
+        fill_user_fields(html_parts, escape(user.first_name)),
+    )
+
+
+def render_event_email(template_name, event, times=None, **extra):
+    """Render the per-event part of an email once and cache it.
+
+    The templates under ``templates/email`` are compiled once by Jinja and
+    rendered with a placeholder for the recipient's first name. The result is
+    cached (keyed on ``Event.updated_at``, ``times`` and any ``extra`` context)
+    as the text/HTML bodies split at that placeholder, so each recipient only
+    costs a string join. ``times`` is the ``(start, end)`` of one occurrence of
+    a recurring event, shown instead of the event's own.
+    """
+    cache = current_app.extensions["email_template_cache"]
+    key = (template_name, event.id, event.updated_at, times, tuple(sorted(extra.items())))
+    parts = cache.get(key)
+
+    if parts is None:
+        context = {
+            **extra,
+            "first_name": FIRST_NAME_PLACEHOLDER,
+            "event": event_context(event, times),
+        }
+        env = current_app.jinja_env
+        parts = tuple(
+            env.get_template(f"email/{template_name}.{ext}")
+            .render(context)
+            .split(FIRST_NAME_PLACEHOLDER)
+            for ext in ("txt", "html")
+        )
+        cache.set(key, parts)
+
+    return parts
+
+
+def event_context(event, times=None):
+    """Event fields as the email templates display them."""
+    start_time, end_time = times or (event.start_time, event.end_time)
+    return {
+        "title": event.title,
+        "date": start_time.strftime("%A, %B %d, %Y"),
+        "start": start_time.strftime("%I:%M %p"),
+        "end": end_time.strftime("%I:%M %p"),
+        "location": event.location,
+        "department": event.department.name if event.department else None,
+        "description": event.description,
+    }
+
+
+def fill_user_fields(parts, first_name):
+    """Join a cached body back together around the recipient's first name."""
+    return str(first_name).join(parts)
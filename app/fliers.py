@@ -0,0 +1,146 @@
+"""Event flier images: validated on upload, resized off the request path.
+
+An upload is checked while the request waits (it must decode as an allowed
+image within the size limits), then its variants are rendered on the task
+runner: a bounded ``full`` image and a ``thumb`` for listings, each in the
+upload's own family (JPEG, or PNG when it has transparency) and as WebP. Images
+are rebuilt from their pixels, so EXIF (including GPS), ICC profiles and text
+chunks are dropped, and the raw upload is never written to disk.
+
+Files are named by a hash of the upload and kept in media storage (see
+``app.storage``), so identical uploads share them and their URLs can be cached
+forever.
+"""
+import hashlib
+import io
+import re
+
+from flask import current_app
+from PIL import Image, ImageOps, UnidentifiedImageError
+from sqlalchemy import update
+
+from app import db
+from app.models import Event
+from app.storage import IMMUTABLE, storage
+
+# Bump when the rendering below changes so old files are not reused
+RENDER_VERSION = 1
+
+ALLOWED_FORMATS = {"JPEG", "PNG", "GIF", "WEBP"}
+EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}
+CONTENT_TYPES = {"jpg": "image/jpeg", "png": "image/png", "webp": "image/webp"}
+
+# name: (longest edge in pixels, output format; None keeps the upload's family)
+VARIANTS = {
+    "full": (1600, None),
+    "full_webp": (1600, "WEBP"),
+    "thumb": (480, None),
+    "thumb_webp": (480, "WEBP"),
+}
+SAVE_OPTIONS = {
+    "JPEG": {"quality": 85, "optimize": True, "progressive": True},
+    "PNG": {"optimize": True},
+    "WEBP": {"quality": 80, "method": 4},
+}
+
+URL_PREFIX = "/api/events/fliers"
+FILENAME = re.compile(r"^[0-9a-f]{32}-(%s)\.(jpg|png|webp)$" % "|".join(VARIANTS))
+
+
+def save_flier(data):
+    """Validate an upload and return ``(flier_hash, flier_path)``.
+
+    ``flier_path`` is the URL of the ``full`` variant, known before anything is
+    rendered; pass it and the bytes to ``process_flier`` to render them.
+    Raises ``ValueError`` with a user-facing message if the upload is rejected.
+    """
+    family = validate_flier(data)
+    flier_hash = hashlib.sha256(b"%d:" % RENDER_VERSION + data).hexdigest()[:32]
+    return flier_hash, flier_url(flier_hash, "full", family)
+
+
+def validate_flier(data):
+    """Check an upload is an allowed, reasonably sized image; return its output family."""
+    config = current_app.config
+    if len(data) > config["FLIER_MAX_BYTES"]:
+        raise ValueError("Flier must be smaller than %d MB" % (config["FLIER_MAX_BYTES"] >> 20))
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.format not in ALLOWED_FORMATS:
+                raise ValueError("Flier must be a JPEG, PNG, GIF or WebP image")
+            if image.width * image.height > config["FLIER_MAX_PIXELS"]:
+                raise ValueError("Flier dimensions are too large")
+            family = "PNG" if _has_alpha(image) else "JPEG"
+            image.verify()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+        raise ValueError("Flier is not a valid image")
+    return family
+
+
+def render_variants(data):
+    """Return ``{variant: (extension, bytes)}`` for an upload.
+
+    Pure function of its argument, so it can run in any worker thread or process.
+    """
+    with Image.open(io.BytesIO(data)) as upload:
+        family = "PNG" if _has_alpha(upload) else "JPEG"
+        image = ImageOps.exif_transpose(upload).convert("RGBA" if family == "PNG" else "RGB")
+    image.info = {}
+
+    variants = {}
+    for name, (edge, fmt) in VARIANTS.items():
+        fmt = fmt or family
+        resized = image.copy()
+        resized.thumbnail((edge, edge), Image.LANCZOS)
+        buffer = io.BytesIO()
+        resized.save(buffer, fmt, **SAVE_OPTIONS[fmt])
+        variants[name] = EXTENSIONS[fmt], buffer.getvalue()
+    return variants
+
+
+def process_flier(flier_path, data):
+    """Task: render and store an upload's variants, unless an identical upload did.
+
+    If rendering or storing fails, the flier is taken off the events that use
+    it, so they show no flier rather than a link that will never resolve.
+    """
+    keys = {variant: storage_key(url) for variant, url in variant_urls(flier_path).items()}
+    media = storage()
+    if all(media.exists(key) for key in keys.values()):
+        return
+
+    try:
+        for variant, (ext, content) in render_variants(data).items():
+            media.save(keys[variant], content, CONTENT_TYPES[ext], IMMUTABLE)
+    except Exception:
+        current_app.logger.exception("Processing flier %s failed", flier_path)
+        db.session.rollback()
+        db.session.execute(
+            update(Event)
+            .where(Event.flier_path == flier_path)
+            .values(flier_path=None, flier_hash=None)
+        )
+        db.session.commit()
+
+
+def flier_url(flier_hash, variant, family):
+    fmt = VARIANTS[variant][1] or family
+    return f"{URL_PREFIX}/{flier_hash}-{variant}.{EXTENSIONS[fmt]}"
+
+
+def variant_urls(flier_path):
+    """URLs of every variant, derived from the ``full`` variant's URL."""
+    prefix, _, ext = flier_path.rpartition("-full.")
+    family = "PNG" if ext == "png" else "JPEG"
+    flier_hash = prefix.rpartition("/")[2]
+    return {variant: flier_url(flier_hash, variant, family) for variant in VARIANTS}
+
+
+def storage_key(url):
+    """Storage key of the variant served at ``url``."""
+    return "fliers/" + url.rpartition("/")[2]
+
+
+def _has_alpha(image):
+    return image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
@@ -0,0 +1,201 @@
+"""iCalendar (.ics) feeds for calendar apps.
+
+Calendar clients poll their subscriptions every few minutes, so each feed
+first computes a cheap validator with one aggregate query: the newest
+``Event.updated_at`` in scope plus counts that change when events or
+registrations come and go. A poll whose ``If-None-Match`` or
+``If-Modified-Since`` still matches is answered with 304 before any event is
+loaded. Otherwise each VEVENT is taken from a per-worker cache keyed on the
+event's id and ``updated_at``, so an edit to one event re-renders only that one.
+
+Event times are campus wall-clock times (see app.localtime), so DTSTART and
+DTEND are written as floating times and the feed names the campus zone in
+``X-WR-TIMEZONE``; clients place them on that clock rather than reading them
+as UTC.
+
+A recurring series is one VEVENT with its RRULE, so clients expand it
+themselves. Cancelled occurrences are listed as EXDATEs, and each moved
+occurrence follows as an override VEVENT with the same UID and a
+RECURRENCE-ID. Editing an occurrence bumps the series' ``updated_at``, which
+refreshes both the cached block and the feed validators.
+"""
+import hashlib
+from datetime import timedelta
+
+from flask import current_app
+from sqlalchemy import and_, func, or_, select
+
+from app import db
+from app.localtime import local_now
+from app.models import Attendance, Event
+from app.recurrence import load_exceptions
+
+PRODID = "-//MuleSpace//Campus Events//EN"
+
+
+def feed_scope(department_id=None, user_id=None):
+    """Conditions selecting the events of a feed (active or not).
+
+    Events (and series whose last occurrence) ended more than
+    ``ICAL_PAST_DAYS`` ago drop out of every feed.
+    """
+    since = local_now() - timedelta(days=current_app.config["ICAL_PAST_DAYS"])
+    conditions = [
+        or_(
+            Event.end_time >= since,
+            and_(
+                Event.recurrence_rule.isnot(None),
+                or_(Event.recurrence_end.is_(None), Event.recurrence_end >= since),
+            ),
+        )
+    ]
+    if department_id is not None:
+        conditions.append(Event.department_id == department_id)
+    if user_id is not None:
+        conditions.append(
+            Event.id.in_(select(Attendance.event_id).where(Attendance.user_id == user_id))
+        )
+    return conditions
+
+
+def feed_validators(department_id=None, user_id=None):
+    """Return ``(etag, last_modified)`` for a feed without loading its events.
+
+    Inactive events are included: cancelling an event bumps its ``updated_at``,
+    which must change the validator even though the event leaves the feed.
+    """
+    newest, total = db.session.execute(
+        select(func.max(Event.updated_at), func.count(Event.id)).where(
+            *feed_scope(department_id, user_id)
+        )
+    ).one()
+    state = [department_id, user_id, newest, total]
+
+    if user_id is not None:
+        registered, newest_registration, last_id = db.session.execute(
+            select(
+                func.count(Attendance.id),
+                func.max(Attendance.checked_in_at),
+                func.max(Attendance.id),
+            ).where(Attendance.user_id == user_id)
+        ).one()
+        state += [registered, last_id]
+        if newest_registration and (newest is None or newest_registration > newest):
+            newest = newest_registration
+
+    etag = hashlib.sha256(repr(state).encode()).hexdigest()[:32]
+    return etag, newest
+
+
+def render_feed(name, department_id=None, user_id=None):
+    """Render the feed's VCALENDAR, reusing cached VEVENTs."""
+    events = db.session.scalars(
+        select(Event)
+        .where(Event.is_active == True, *feed_scope(department_id, user_id))  # noqa: E712
+        .order_by(Event.start_time, Event.id)
+    ).all()
+    exceptions = load_exceptions([event.id for event in events if event.recurrence_rule])
+    parts = [
+        "BEGIN:VCALENDAR\r\n",
+        "VERSION:2.0\r\n",
+        f"PRODID:{PRODID}\r\n",
+        "CALSCALE:GREGORIAN\r\n",
+        "METHOD:PUBLISH\r\n",
+        _line("X-WR-CALNAME", name),
+        f"X-WR-TIMEZONE:{current_app.config['EVENT_TIMEZONE']}\r\n",
+    ]
+    parts.extend(vevent(event, exceptions.get(event.id)) for event in events)
+    parts.append("END:VCALENDAR\r\n")
+    return "".join(parts)
+
+
+def vevent(event, exceptions=None):
+    """One event as a VEVENT block, cached until the event is next updated.
+
+    A series' block carries its RRULE and ``exceptions`` (``{original_start:
+    EventException}``, as from ``load_exceptions``).
+    """
+    cache = current_app.extensions["ical_cache"]
+    key = (event.id, event.updated_at)
+    block = cache.get(key)
+    if block is None:
+        lines = _vevent_lines(event, event.start_time, event.end_time)
+        overrides = []
+        if event.recurrence_rule:
+            lines.append(f"RRULE:{_floating_rule(event.recurrence_rule)}\r\n")
+            for original_start, exception in sorted((exceptions or {}).items()):
+                if exception.is_cancelled:
+                    lines.append(f"EXDATE:{_floating(original_start)}\r\n")
+                else:
+                    overrides += _vevent_lines(
+                        event,
+                        exception.start_time,
+                        exception.end_time,
+                        f"RECURRENCE-ID:{_floating(original_start)}\r\n",
+                    )
+                    overrides.append("END:VEVENT\r\n")
+        lines.append("END:VEVENT\r\n")
+        block = "".join(lines + overrides)
+        cache.set(key, block)
+    return block
+
+
+def _vevent_lines(event, start_time, end_time, *extra):
+    """The opening lines of a VEVENT for ``event`` at the given times."""
+    lines = [
+        "BEGIN:VEVENT\r\n",
+        f"UID:event-{event.id}@mulespace\r\n",
+        f"DTSTAMP:{_utc(event.updated_at or event.created_at)}\r\n",
+        *extra,
+        f"DTSTART:{_floating(start_time)}\r\n",
+        f"DTEND:{_floating(end_time)}\r\n",
+        _line("SUMMARY", event.title),
+    ]
+    if event.location:
+        lines.append(_line("LOCATION", event.location))
+    if event.description:
+        lines.append(_line("DESCRIPTION", event.description))
+    return lines
+
+
+def _floating_rule(rule):
+    """An RRULE with its UNTIL written as a floating time, to match DTSTART.
+
+    Rules are saved that way, but ones saved before may still end in ``Z``.
+    """
+    return ";".join(
+        part.rstrip("Z") if part.startswith("UNTIL=") else part for part in rule.split(";")
+    )
+
+
+def _utc(value):
+    """Format a naive UTC datetime (``created_at``/``updated_at``) as a UTC date-time."""
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def _floating(value):
+    """Format a naive campus wall-clock time as a floating date-time (no ``Z``)."""
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+def _line(name, value):
+    """A content line with TEXT escaping, folded at 75 octets (RFC 5545 3.1)."""
+    value = (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+    line = f"{name}:{value}".encode()
+    folded = []
+    limit = 75
+    while len(line) > limit:
+        cut = limit
+        while (line[cut] & 0xC0) == 0x80:  # do not split a UTF-8 sequence
+            cut -= 1
+        folded.append(line[:cut])
+        line = line[cut:]
+        limit = 74  # continuation lines start with a space
+    folded.append(line)
+    return "\r\n ".join(chunk.decode() for chunk in folded) + "\r\n"
@@ -0,0 +1,38 @@
+"""The campus clock that event times are kept on.
+
+The event forms send start and end times without an offset and the pages read
+them back the same way, so ``Event.start_time`` and ``end_time`` are naive
+wall-clock times in ``EVENT_TIMEZONE``. Anything that compares them with the
+current moment, or hands them to something that expects an absolute time,
+converts through the helpers here.
+"""
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from flask import current_app
+
+
+def campus_timezone():
+    """The ``EVENT_TIMEZONE`` as a ``tzinfo``."""
+    return ZoneInfo(current_app.config["EVENT_TIMEZONE"])
+
+
+def local_now():
+    """The current campus wall-clock time, naive like the stored event times."""
+    return datetime.now(campus_timezone()).replace(tzinfo=None)
+
+
+def timestamp(value):
+    """Unix time of a naive campus wall-clock time."""
+    return int(value.replace(tzinfo=campus_timezone()).timestamp())
+
+
+def campus_time(value):
+    """Convert an aware datetime to naive campus wall-clock time.
+
+    Naive values are taken to be campus times already and returned unchanged,
+    as is ``None``.
+    """
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(campus_timezone()).replace(tzinfo=None)
+    return value
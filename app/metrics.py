@@ -0,0 +1,119 @@
+"""Process-local application metrics.
+
+Each worker keeps its own registry in ``app.extensions["metrics"]``; admins can
+read it through ``GET /api/admin/metrics``. Values that live in the database
+rather than in the process (such as the outbox backlog) are reported by
+collectors, which run each time a snapshot is taken.
+"""
+import bisect
+import threading
+from collections import defaultdict
+
+from flask import current_app
+
+# Upper bounds (seconds) suited to network calls such as SMTP sends
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Bucketed distribution of observed values, with their count and sum."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # the last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self):
+        """Cumulative bucket counts keyed by upper bound, Prometheus style."""
+        cumulative = {}
+        running = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            running += count
+            cumulative[str(bound)] = running
+        return {"buckets": cumulative, "count": self.count, "sum": self.sum}
+
+
+class Metrics:
+    """Thread-safe registry of labelled counters, gauges and histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._gauges = {}
+        self._histograms = {}
+        self._collectors = []
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += amount
+
+    def value(self, name, **labels):
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def gauge(self, name, **labels):
+        with self._lock:
+            return self._gauges.get((name, tuple(sorted(labels.items()))))
+
+    def observe(self, name, value, **labels):
+        """Record ``value`` in the histogram ``name`` (default buckets)."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def histogram(self, name, **labels):
+        with self._lock:
+            return self._histograms.get((name, tuple(sorted(labels.items()))))
+
+    def add_collector(self, collector):
+        """Call ``collector(registry)`` before every snapshot to refresh gauges."""
+        self._collectors.append(collector)
+
+    def snapshot(self):
+        """Return every series grouped by metric type and name."""
+        for collector in self._collectors:
+            collector(self)
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted(
+                (key, histogram.to_dict()) for key, histogram in self._histograms.items()
+            )
+
+        result = {"counters": {}, "gauges": {}, "histograms": {}}
+        for (name, labels), value in counters:
+            result["counters"].setdefault(name, []).append({"labels": dict(labels), "value": value})
+        for (name, labels), value in gauges:
+            result["gauges"].setdefault(name, []).append({"labels": dict(labels), "value": value})
+        for (name, labels), data in histograms:
+            result["histograms"].setdefault(name, []).append({"labels": dict(labels), **data})
+        return result
+
+
+def registry():
+    return current_app.extensions["metrics"]
+
+
+def inc(name, amount=1, **labels):
+    """Increment a counter on the current app's registry."""
+    registry().inc(name, amount, **labels)
+
+
+def observe(name, value, **labels):
+    """Record an observation on the current app's registry."""
+    registry().observe(name, value, **labels)
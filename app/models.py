@@ -1,15 +1,81 @@
 from datetime import datetime
 
+from flask import current_app
 from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload, object_session
 from werkzeug.security import check_password_hash, generate_password_hash
 
 from app import db, login_manager
 
+AUTHORIZATION_FIELDS = ("role", "department_id", "is_active")
+
 
 @login_manager.user_loader
 def load_user(user_id):
-    """Load user by ID for Flask-Login."""
-    return db.session.get(User, int(user_id))
+    """Load user by ID for Flask-Login.
+
+    The fields needed for authorization are served from the per-worker principal
+    cache; the full ``User`` row is only loaded if a handler asks for more.
+    """
+    user_id = int(user_id)
+    cache = current_app.extensions["principal_cache"]
+    record = cache.get(user_id)
+
+    if record is None:
+        row = db.session.execute(
+            db.select(User.id, User.role, User.department_id, User.is_active).filter_by(id=user_id)
+        ).first()
+        if row is None:
+            return None
+        record = tuple(row)
+        cache.set(user_id, record)
+
+    return UserPrincipal(*record)
+
+
+def invalidate_principals(user_ids):
+    """Evict cached principals so the next request reloads them."""
+    cache = current_app.extensions.get("principal_cache")
+    if cache is None:
+        return
+    for user_id in user_ids:
+        cache.invalidate(user_id)
+
+
+class UserPrincipal(UserMixin):
+    """Authenticated user as seen by ``current_user``.
+
+    Carries the id, role, department and active flag. Any other attribute
+    (``email``, ``to_dict``, ``set_password``...) is delegated to the ``User``
+    row, which is loaded on first access.
+    """
+
+    def __init__(self, id, role, department_id, is_active):
+        self.id = id
+        self.role = role
+        self.department_id = department_id
+        self._is_active = is_active
+        self._user = None
+
+    @property
+    def is_active(self):
+        return self._is_active
+
+    @property
+    def user(self):
+        """The backing ``User`` row, loaded together with its department."""
+        if self._user is None:
+            self._user = db.session.get(User, self.id, options=[joinedload(User.department)])
+        return self._user
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+    def __repr__(self):
+        return f"<UserPrincipal {self.id}>"
 
 
 class User(UserMixin, db.Model):
@@ -29,6 +95,8 @@ class User(UserMixin, db.Model):
     department_id = db.Column(db.Integer, db.ForeignKey("departments.id"), nullable=True)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Bearer tokens issued before this no longer authorize writes
+    tokens_valid_after = db.Column(db.DateTime, nullable=True)
 
     # Relationships
     department = db.relationship("Department", back_populates="users")
@@ -64,6 +132,50 @@ class User(UserMixin, db.Model):
         return f"<User {self.username}>"
 
 
+@event.listens_for(User, "before_update")
+def _expire_access_tokens(mapper, connection, target):
+    """Stop earlier bearer tokens writing once the fields they carry change."""
+    state = db.inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in AUTHORIZATION_FIELDS):
+        target.tokens_valid_after = datetime.utcnow()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _queue_principal_invalidation(mapper, connection, target):
+    """Evict a changed user now and again once the change is committed."""
+    invalidate_principals([target.id])
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("stale_principals", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_principals(session):
+    stale = session.info.pop("stale_principals", None)
+    if stale:
+        invalidate_principals(stale)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_stale_principals(session):
+    session.info.pop("stale_principals", None)
+
+
+class RevokedToken(db.Model):
+    """Bearer tokens revoked before their expiry (see app.tokens)."""
+
+    __tablename__ = "revoked_tokens"
+
+    jti = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<RevokedToken {self.jti}>"
+
+
 class Department(db.Model):
     """Department model for organizing users and events."""
 
@@ -113,6 +225,10 @@ class Event(db.Model):
     created_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     qr_code_path = db.Column(db.String(255), nullable=True)
     flier_path = db.Column(db.String(255), nullable=True)
+    flier_hash = db.Column(db.String(32), nullable=True)  # set for processed uploads
+    # Series only (see app.recurrence): the RRULE and the end of the last occurrence
+    recurrence_rule = db.Column(db.String(255), nullable=True)
+    recurrence_end = db.Column(db.DateTime, nullable=True, index=True)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -121,9 +237,21 @@ class Event(db.Model):
     department = db.relationship("Department", back_populates="events")
     creator = db.relationship("User", foreign_keys=[created_by])
     attendees = db.relationship("Attendance", back_populates="event", lazy="dynamic")
+    exceptions = db.relationship(
+        "EventException", back_populates="event", lazy="dynamic", cascade="all, delete-orphan"
+    )
+
+    def to_dict(self, include_attendees=False, registered_count=None):
+        """Convert event to dictionary for API responses.
+
+        Listings that already selected the attendee count pass it as
+        ``registered_count`` rather than counting once per event.
+        """
+        from app.fliers import variant_urls
+
+        if registered_count is None:
+            registered_count = self.attendees.count()
 
-    def to_dict(self, include_attendees=False):
-        """Convert event to dictionary for API responses."""
         data = {
             "id": self.id,
             "title": self.title,
@@ -139,9 +267,11 @@ class Event(db.Model):
             "creator_name": f"{self.creator.first_name} {self.creator.last_name}",
             "qr_code_path": self.qr_code_path,
             "flier_path": self.flier_path,
+            "flier_variants": variant_urls(self.flier_path) if self.flier_hash else None,
+            "recurrence_rule": self.recurrence_rule,
             "is_active": self.is_active,
-            "registered_count": self.attendees.count(),
-            "attendance_count": self.attendees.count(),
+            "registered_count": registered_count,
+            "attendance_count": registered_count,
             "registration_required": True,
             "points": 0,
             "tags": None,
@@ -158,6 +288,40 @@ class Event(db.Model):
         return f"<Event {self.title}>"
 
 
+class EventException(db.Model):
+    """A cancelled or moved occurrence of a recurring event (see app.recurrence)."""
+
+    __tablename__ = "event_exceptions"
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey("events.id"), nullable=False)
+    original_start = db.Column(db.DateTime, nullable=False)
+    start_time = db.Column(db.DateTime, nullable=True)  # new times of a moved occurrence
+    end_time = db.Column(db.DateTime, nullable=True)
+    is_cancelled = db.Column(db.Boolean, default=False, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    event = db.relationship("Event", back_populates="exceptions")
+
+    __table_args__ = (
+        db.UniqueConstraint("event_id", "original_start", name="unique_event_exception"),
+    )
+
+    def to_dict(self):
+        """Convert exception to dictionary for API responses."""
+        return {
+            "id": self.id,
+            "event_id": self.event_id,
+            "original_start": self.original_start.isoformat(),
+            "start_time": self.start_time.isoformat() if self.start_time else None,
+            "end_time": self.end_time.isoformat() if self.end_time else None,
+            "is_cancelled": self.is_cancelled,
+        }
+
+    def __repr__(self):
+        return f"<EventException Event:{self.event_id} {self.original_start}>"
+
+
 class Attendance(db.Model):
     """Attendance model for tracking event participation."""
 
@@ -193,6 +357,52 @@ class Attendance(db.Model):
         return f"<Attendance Event:{self.event_id} User:{self.user_id}>"
 
 
+class OccurrenceAttendance(db.Model):
+    """Check-in to one occurrence of a recurring event (see app.recurrence).
+
+    ``Attendance`` holds the registration for the whole series; each occurrence
+    a user turns up to gets a row here, named by the occurrence's original start.
+    """
+
+    __tablename__ = "occurrence_attendance"
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey("events.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    occurrence_start = db.Column(db.DateTime, nullable=False)
+    checked_in_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    check_in_method = db.Column(db.String(20), default="qr_code")
+
+    event = db.relationship("Event")
+    user = db.relationship("User")
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            "event_id", "user_id", "occurrence_start", name="unique_occurrence_attendance"
+        ),
+    )
+
+    def to_dict(self):
+        """Convert attendance to dictionary for API responses."""
+        return {
+            "id": self.id,
+            "event_id": self.event_id,
+            "event_title": self.event.title if self.event else None,
+            "occurrence_start": self.occurrence_start.isoformat(),
+            "user_id": self.user_id,
+            "user_name": f"{self.user.first_name} {self.user.last_name}" if self.user else None,
+            "user_email": self.user.email if self.user else None,
+            "checked_in_at": self.checked_in_at.isoformat(),
+            "check_in_method": self.check_in_method,
+        }
+
+    def __repr__(self):
+        return (
+            f"<OccurrenceAttendance Event:{self.event_id} User:{self.user_id} "
+            f"{self.occurrence_start}>"
+        )
+
+
 class Notification(db.Model):
     """Notification model for targeted event alerts."""
 
@@ -213,6 +423,18 @@ class Notification(db.Model):
     user = db.relationship("User", back_populates="notifications")
     event = db.relationship("Event")
 
+    __table_args__ = (
+        # Inbox listing, newest first (keyset on sent_at, id)
+        db.Index("ix_notifications_user_sent", "user_id", "sent_at", "id"),
+        # Unread badge: only unread rows are indexed, so counting stays cheap
+        db.Index(
+            "ix_notifications_unread",
+            "user_id",
+            postgresql_where=is_read == False,  # noqa: E712
+            sqlite_where=is_read == False,  # noqa: E712
+        ),
+    )
+
     def to_dict(self):
         """Convert notification to dictionary for API responses."""
         return {
@@ -228,3 +450,122 @@ class Notification(db.Model):
 
     def __repr__(self):
         return f"<Notification {self.title}>"
+
+
+class OutboxEmail(db.Model):
+    """Email waiting to be delivered by the background outbox worker."""
+
+    __tablename__ = "email_outbox"
+
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    text_body = db.Column(db.Text, nullable=False)
+    html_body = db.Column(db.Text, nullable=True)
+    status = db.Column(db.String(20), default="pending", nullable=False)  # pending, sent, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (db.Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),)
+
+    def __repr__(self):
+        return f"<OutboxEmail {self.id} {self.status}>"
+
+
+class AnnouncementJob(db.Model):
+    """Progress of an event announcement sent to a department in the background."""
+
+    __tablename__ = "announcement_jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey("events.id"), nullable=False)
+    department_id = db.Column(db.Integer, db.ForeignKey("departments.id"), nullable=False)
+    created_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    status = db.Column(
+        db.String(20), default="queued", nullable=False
+    )  # queued, running, completed, failed
+    total_recipients = db.Column(db.Integer, default=0, nullable=False)
+    emails_sent = db.Column(db.Integer, default=0, nullable=False)
+    emails_failed = db.Column(db.Integer, default=0, nullable=False)
+    # Resume point and liveness, so a job lost with its worker can be requeued
+    last_recipient_id = db.Column(db.Integer, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    # Relationships
+    event = db.relationship("Event")
+
+    def to_dict(self):
+        """Convert job to dictionary for API responses."""
+        return {
+            "id": self.id,
+            "event_id": self.event_id,
+            "department_id": self.department_id,
+            "created_by": self.created_by,
+            "title": self.title,
+            "message": self.message,
+            "status": self.status,
+            "total_recipients": self.total_recipients,
+            "emails_sent": self.emails_sent,
+            "emails_failed": self.emails_failed,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def __repr__(self):
+        return f"<AnnouncementJob {self.id} {self.status}>"
+
+
+class ReminderDispatch(db.Model):
+    """Ledger of event reminders already sent, one row per (event, start, user, offset)."""
+
+    __tablename__ = "reminder_dispatches"
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey("events.id"), nullable=False)
+    # The start reminded of: an occurrence's original start, or a single event's start
+    occurrence_start = db.Column(db.DateTime, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    offset_minutes = db.Column(db.Integer, nullable=False)
+    sent_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            "event_id",
+            "occurrence_start",
+            "user_id",
+            "offset_minutes",
+            name="unique_reminder_dispatch",
+        ),
+    )
+
+    def __repr__(self):
+        return (
+            f"<ReminderDispatch Event:{self.event_id} User:{self.user_id} {self.offset_minutes}m>"
+        )
+
+
+class DigestDispatch(db.Model):
+    """Ledger of weekly digests already queued, one row per (user, week)."""
+
+    __tablename__ = "digest_dispatches"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    week_start = db.Column(db.Date, nullable=False)  # Monday of the digest's week
+    sent_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (db.UniqueConstraint("user_id", "week_start", name="unique_digest_dispatch"),)
+
+    def __repr__(self):
+        return f"<DigestDispatch User:{self.user_id} {self.week_start}>"
@@ -0,0 +1,143 @@
+"""Background delivery of the transactional email outbox.
+
+Handlers write ``OutboxEmail`` rows in the same commit as the change that
+triggered them (see ``app.email.queue_email``). A daemon thread per worker
+process drains due rows in batches, sending each batch over a single SMTP
+connection and rescheduling failures with exponential backoff.
+"""
+from datetime import datetime, timedelta
+
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy import func, select
+
+from app import db, mail, metrics
+from app.email import record_send_failure, send_message
+from app.models import OutboxEmail
+from app.tasks import PeriodicWorker
+
+
+def retry_delay(attempts, base, cap):
+    """Seconds to wait before the next attempt after ``attempts`` failures."""
+    return min(base * 2 ** (attempts - 1), cap)
+
+
+def claim_due_emails(batch_size, now=None):
+    """Lock and return up to ``batch_size`` pending emails that are due.
+
+    ``SKIP LOCKED`` lets several workers (or nodes) drain the outbox without
+    sending the same row twice; SQLite ignores it and serializes writers instead.
+    """
+    now = now or datetime.utcnow()
+    return (
+        OutboxEmail.query.filter(
+            OutboxEmail.status == "pending", OutboxEmail.next_attempt_at <= now
+        )
+        .order_by(OutboxEmail.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+
+def deliver_pending(batch_size=None):
+    """Send one batch of due emails; return ``(sent, failed)`` counts."""
+    config = current_app.config
+    emails = claim_due_emails(batch_size or config["OUTBOX_BATCH_SIZE"])
+    if not emails:
+        db.session.commit()
+        return 0, 0
+
+    sent = failed = 0
+    attempted = set()
+    try:
+        with mail.connect() as connection:
+            for email in emails:
+                attempted.add(email.id)
+                try:
+                    send_message(connection, _message(email), "outbox")
+                except Exception as exc:
+                    _record_failure(email, exc, config)
+                    failed += 1
+                else:
+                    email.status = "sent"
+                    email.sent_at = datetime.utcnow()
+                    metrics.observe(
+                        "email_outbox_delay_seconds",
+                        (email.sent_at - email.created_at).total_seconds(),
+                    )
+                    sent += 1
+    except Exception as exc:
+        # Could not connect (or the connection dropped): retry whatever is left
+        record_send_failure(exc, "outbox", stage="connect")
+        for email in emails:
+            if email.id not in attempted:
+                _record_failure(email, exc, config)
+                failed += 1
+
+    db.session.commit()
+    return sent, failed
+
+
+def drain_outbox(batch_size=None):
+    """Deliver batches until no due email is left; return total counts."""
+    total_sent = total_failed = 0
+    while True:
+        sent, failed = deliver_pending(batch_size)
+        total_sent += sent
+        total_failed += failed
+        if sent + failed == 0:
+            return total_sent, total_failed
+
+
+def collect_metrics(registry):
+    """Report the outbox backlog: rows per status and the oldest pending age.
+
+    The outbox is shared by every worker, so these are read from the database
+    when metrics are scraped rather than tracked in process.
+    """
+    rows = db.session.execute(
+        select(OutboxEmail.status, func.count(), func.min(OutboxEmail.created_at))
+        .where(OutboxEmail.status.in_(("pending", "failed")))
+        .group_by(OutboxEmail.status)
+    ).all()
+    by_status = {status: (count, oldest) for status, count, oldest in rows}
+
+    for status in ("pending", "failed"):
+        registry.set_gauge("email_outbox_depth", by_status.get(status, (0, None))[0], status=status)
+
+    oldest = by_status.get("pending", (0, None))[1]
+    age = (datetime.utcnow() - oldest).total_seconds() if oldest else 0
+    registry.set_gauge("email_outbox_oldest_pending_seconds", age)
+
+
+def _message(email):
+    msg = Message(email.subject, recipients=[email.recipient])
+    msg.body = email.text_body
+    msg.html = email.html_body
+    return msg
+
+
+def _record_failure(email, exc, config):
+    email.attempts += 1
+    email.last_error = f"{type(exc).__name__}: {exc}"
+    current_app.logger.warning("Outbox email %s failed: %s", email.id, email.last_error)
+
+    if email.attempts >= config["OUTBOX_MAX_ATTEMPTS"]:
+        email.status = "failed"
+    else:
+        delay = retry_delay(
+            email.attempts, config["OUTBOX_RETRY_BASE_DELAY"], config["OUTBOX_RETRY_MAX_DELAY"]
+        )
+        email.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+
+
+class OutboxWorker(PeriodicWorker):
+    """Daemon thread that keeps draining the outbox for one app."""
+
+    name = "outbox-worker"
+    interval_setting = "OUTBOX_POLL_INTERVAL"
+
+    def tick(self):
+        sent, failed = deliver_pending()
+        return sent + failed
@@ -0,0 +1,228 @@
+"""Event check-in QR codes, rendered once and served from a content-addressed cache.
+
+An image is addressed by a digest of everything that goes into it (payload,
+format and render settings), so its URL can be computed without rendering and
+never changes meaning. Bytes are looked up in the per-worker memory cache, then
+in media storage (see ``app.storage``), and only rendered on a miss; new events get theirs
+rendered on the task runner instead of in ``create_event``. Batches for
+printing are rendered across a process pool and streamed as a ZIP.
+
+The encoded URL carries a signed check-in token (see ``app.tokens``), so a
+QR code changes whenever the event's times or recurrence do. A recurring
+series has one code for all of its occurrences.
+"""
+import hashlib
+import io
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import qrcode
+import qrcode.image.svg
+from flask import current_app
+from sqlalchemy import select
+from werkzeug.utils import secure_filename
+
+from app import db
+from app.models import Event
+from app.storage import IMMUTABLE, storage
+from app.tokens import issue_checkin_token
+
+FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+
+# Bump when the rendering below changes so old digests are not reused
+RENDER_VERSION = 1
+BOX_SIZE = 10
+BORDER = 5
+
+
+def checkin_payload(event, base_url=None, rotation=None, now=None):
+    """The check-in URL encoded in an event's QR code, with its signed token.
+
+    ``event`` only needs ``id``, ``department_id``, ``start_time``,
+    ``end_time``, ``recurrence_rule`` and ``recurrence_end``, so a query row
+    works as well as an ``Event``.
+    """
+    base_url = base_url or current_app.config["QR_CODE_BASE_URL"]
+    token = issue_checkin_token(event, rotation=rotation, now=now)
+    return f"{base_url}/check-in?event={event.id}&token={token}"
+
+
+def valid_payloads(event, now=None):
+    """Payloads an event's QR code URLs may currently point at.
+
+    The fixed payload, plus rotating ones for the current and previous slot so
+    a code that just rotated still loads.
+    """
+    payloads = [checkin_payload(event)]
+    rotation = current_app.config["CHECKIN_TOKEN_ROTATION"]
+    if rotation:
+        now = now or time.time()
+        payloads += [
+            checkin_payload(event, rotation=rotation, now=now),
+            checkin_payload(event, rotation=rotation, now=now - rotation),
+        ]
+    return payloads
+
+
+def qr_digest(payload, fmt):
+    """Content address of the image for ``payload`` in ``fmt``."""
+    key = f"{RENDER_VERSION}:{BOX_SIZE}:{BORDER}:{fmt}:{payload}"
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def qr_code_url(event_id, payload, fmt="png"):
+    """URL the image is served from (see ``events.get_event_qr_image``)."""
+    return f"/api/events/{event_id}/qr-code/{qr_digest(payload, fmt)}.{fmt}"
+
+
+def render_qr(payload, fmt="png"):
+    """Render ``payload`` as PNG or SVG bytes.
+
+    SVG is written as vector paths straight from the module matrix, skipping
+    the raster step entirely. Pure function of its arguments, so it can run in
+    any worker thread or process.
+    """
+    qr = qrcode.QRCode(version=1, box_size=BOX_SIZE, border=BORDER)
+    qr.add_data(payload)
+    qr.make(fit=True)
+
+    buffer = io.BytesIO()
+    if fmt == "svg":
+        qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).save(buffer)
+    else:
+        qr.make_image(fill_color="black", back_color="white").save(buffer)
+    return buffer.getvalue()
+
+
+def qr_code_bytes(payload, fmt="png", persist=True):
+    """Return ``(digest, bytes)`` for a QR code, rendering only on a cache miss.
+
+    Short-lived (rotating) codes pass ``persist=False`` to stay out of storage.
+    """
+    digest = qr_digest(payload, fmt)
+    data = _lookup(digest, fmt, persisted=persist)
+    if data is None:
+        data = render_qr(payload, fmt)
+        _store(digest, fmt, data, persist=persist)
+    return digest, data
+
+
+def qr_codes_bytes(payloads, fmt="png", pool=None):
+    """Bytes for many payloads, rendering the misses across ``pool`` if given."""
+    digests = [qr_digest(payload, fmt) for payload in payloads]
+    found = {digest: _lookup(digest, fmt) for digest in digests}
+
+    missing = {digest: payload for digest, payload in zip(digests, payloads) if not found[digest]}
+    if missing:
+        mapper = pool.map if pool is not None else map
+        rendered = mapper(render_qr, missing.values(), repeat(fmt, len(missing)))
+        for digest, data in zip(missing, rendered):
+            _store(digest, fmt, data)
+            found[digest] = data
+
+    return [found[digest] for digest in digests]
+
+
+def find_events(event_ids=None, department_id=None, start=None, end=None):
+    """Rows of the active events selected for a batch, by start time."""
+    query = select(
+        Event.id,
+        Event.title,
+        Event.department_id,
+        Event.start_time,
+        Event.end_time,
+        Event.recurrence_rule,
+        Event.recurrence_end,
+    ).where(
+        Event.is_active == True  # noqa: E712
+    )
+    if event_ids:
+        query = query.where(Event.id.in_(event_ids))
+    if department_id:
+        query = query.where(Event.department_id == department_id)
+    if start:
+        query = query.where(Event.start_time >= start)
+    if end:
+        query = query.where(Event.start_time <= end)
+    return db.session.execute(query.order_by(Event.start_time, Event.id)).all()
+
+
+def stream_qr_zip(events, fmt="png", workers=None, chunk_size=32):
+    """Yield a ZIP of the events' QR codes piece by piece.
+
+    ``events`` are rows from ``find_events``. Images are rendered ``chunk_size`` at a
+    time across a process pool, and the archive is written to a buffer that is
+    drained after every entry, so memory stays bounded by one chunk however
+    many events are exported.
+    """
+    workers = workers or os.cpu_count() or 1
+    compression = zipfile.ZIP_STORED if fmt == "png" else zipfile.ZIP_DEFLATED
+    buffer = _DrainableBuffer()
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(events) > 1 else None
+    try:
+        with zipfile.ZipFile(buffer, "w", compression) as archive:
+            for start in range(0, len(events), chunk_size):
+                chunk = events[start : start + chunk_size]
+                payloads = [checkin_payload(event) for event in chunk]
+                for event, data in zip(chunk, qr_codes_bytes(payloads, fmt, pool)):
+                    archive.writestr(_archive_name(event.id, event.title, fmt), data)
+                    yield buffer.drain()
+        yield buffer.drain()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+def prerender_event_qr_code(event_id):
+    """Task: render an event's PNG ahead of the first request for it."""
+    event = db.session.get(Event, event_id)
+    if event is not None:
+        qr_code_bytes(checkin_payload(event), "png")
+
+
+def storage_key(digest, fmt):
+    return f"qrcodes/{digest}.{fmt}"
+
+
+def _lookup(digest, fmt, persisted=True):
+    """Cached bytes from memory or storage, or ``None``."""
+    cache = current_app.extensions["qr_cache"]
+    data = cache.get(digest)
+    if data is None and persisted:
+        data = storage().read(storage_key(digest, fmt))
+        if data is not None:
+            cache.set(digest, data)
+    return data
+
+
+def _store(digest, fmt, data, persist=True):
+    if persist:
+        storage().save(storage_key(digest, fmt), data, FORMATS[fmt], IMMUTABLE)
+    current_app.extensions["qr_cache"].set(digest, data)
+
+
+def _archive_name(event_id, title, fmt):
+    return f"event-{event_id}-{secure_filename(title) or 'untitled'}.{fmt}"
+
+
+class _DrainableBuffer(io.RawIOBase):
+    """Write-only, unseekable sink that hands back what was written since the last drain."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
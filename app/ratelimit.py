@@ -0,0 +1,121 @@
+"""Sliding-window rate limiting for the login endpoints.
+
+The default backend keeps a deque of timestamps per key in process memory.
+Deployments running several nodes can point ``LOGIN_RATE_LIMIT_STORAGE_URL`` at
+Redis so every node sees the same windows.
+"""
+import math
+import secrets
+import threading
+import time
+from collections import deque
+
+
+class MemoryBackend:
+    """Per-process sliding-window log."""
+
+    sweep_interval = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hits = {}
+        self._calls = 0
+
+    def hit(self, key, limit, window, now):
+        """Record a hit for ``key``; return seconds to wait if over ``limit``, else 0."""
+        with self._lock:
+            self._calls += 1
+            if self._calls % self.sweep_interval == 0:
+                self._sweep(now, window)
+
+            hits = self._hits.setdefault(key, deque())
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+
+            if len(hits) >= limit:
+                return hits[0] + window - now
+
+            hits.append(now)
+            return 0
+
+    def _sweep(self, now, window):
+        for key in [k for k, hits in self._hits.items() if not hits or hits[-1] <= now - window]:
+            del self._hits[key]
+
+
+class RedisBackend:
+    """Sliding-window log stored in Redis sorted sets, shared across nodes."""
+
+    def __init__(self, client, prefix="mulespace:ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+
+    def hit(self, key, limit, window, now):
+        key = self.prefix + key
+        member = f"{now}:{secrets.token_hex(4)}"
+
+        pipe = self.client.pipeline()
+        pipe.zremrangebyscore(key, 0, now - window)
+        pipe.zadd(key, {member: now})
+        pipe.zcard(key)
+        pipe.expire(key, math.ceil(window))
+        _, _, count, _ = pipe.execute()
+
+        if count <= limit:
+            return 0
+
+        # Over the limit: take the hit back and report when the oldest one expires
+        pipe = self.client.pipeline()
+        pipe.zrem(key, member)
+        pipe.zrange(key, 0, 0, withscores=True)
+        _, oldest = pipe.execute()
+        return max(oldest[0][1] + window - now, 0.001) if oldest else window
+
+
+def backend_from_url(url):
+    """Build the storage backend named by ``LOGIN_RATE_LIMIT_STORAGE_URL``."""
+    if not url or url.startswith("memory://"):
+        return MemoryBackend()
+
+    try:
+        import redis
+    except ImportError as exc:  # pragma: no cover - depends on the environment
+        raise RuntimeError("The redis package is required for a shared rate limit store") from exc
+
+    return RedisBackend(redis.Redis.from_url(url))
+
+
+class LoginThrottle:
+    """Per-IP and per-account sliding-window limits on login attempts."""
+
+    def __init__(self, backend, ip_limit, account_limit, window, timer=time.time):
+        self.backend = backend
+        self.ip_limit = ip_limit
+        self.account_limit = account_limit
+        self.window = window
+        self._timer = timer
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            backend_from_url(config.get("LOGIN_RATE_LIMIT_STORAGE_URL")),
+            ip_limit=config["LOGIN_RATE_LIMIT_PER_IP"],
+            account_limit=config["LOGIN_RATE_LIMIT_PER_ACCOUNT"],
+            window=config["LOGIN_RATE_LIMIT_WINDOW"],
+        )
+
+    def check(self, ip, account):
+        """Record an attempt; return ``(scope, retry_after)`` if it must be rejected."""
+        now = self._timer()
+
+        retry_after = self.backend.hit(f"ip:{ip}", self.ip_limit, self.window, now)
+        if retry_after:
+            return "ip", retry_after
+
+        retry_after = self.backend.hit(
+            f"account:{account.strip().lower()}", self.account_limit, self.window, now
+        )
+        if retry_after:
+            return "account", retry_after
+
+        return None
@@ -0,0 +1,275 @@
+"""Recurring events: a subset of RFC 5545 RRULEs, expanded lazily.
+
+A series is one ``Event`` row whose ``start_time`` and ``end_time`` are its
+first occurrence and whose ``recurrence_rule`` says how it repeats, e.g.
+``FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20311215T000000``. Occurrences are never
+stored. They are computed for the window a caller asks about, starting from the
+period that contains the window rather than from the first occurrence, so the
+cost depends on the window and not on how long the series has been running.
+Cancelled or moved occurrences are stored sparsely as ``EventException`` rows
+keyed on the occurrence's original start.
+
+``Event.recurrence_end`` holds the end of the last occurrence (``None`` for a
+series without ``COUNT`` or ``UNTIL``), so the series that can touch a window
+are found with an indexed range query.
+
+Supported rule parts: ``FREQ`` (``DAILY``, ``WEEKLY``, ``MONTHLY``),
+``INTERVAL``, ``BYDAY`` (weekly rules, plain weekday codes), ``COUNT`` and
+``UNTIL``. ``UNTIL`` is a floating campus time like the event times; a
+trailing ``Z`` is accepted but ignored.
+"""
+import heapq
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, select
+
+from app import db
+from app.localtime import campus_time
+from app.models import Event, EventException
+
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+MAX_COUNT = 1000
+
+Rule = namedtuple("Rule", "freq interval byday count until")
+Occurrence = namedtuple("Occurrence", "event original_start start_time end_time")
+
+
+def parse_rule(text):
+    """Parse an RRULE string; raises ``ValueError`` naming the offending part."""
+    parts = {}
+    for part in text.strip().removeprefix("RRULE:").split(";"):
+        name, sep, value = part.partition("=")
+        name = name.strip().upper()
+        if not sep or not value or name in parts:
+            raise ValueError(f"Invalid recurrence rule part: {part!r}")
+        parts[name] = value.strip().upper()
+
+    unsupported = set(parts) - {"FREQ", "INTERVAL", "BYDAY", "COUNT", "UNTIL"}
+    if unsupported:
+        raise ValueError("Unsupported recurrence rule part: %s" % ", ".join(sorted(unsupported)))
+
+    freq = parts.get("FREQ")
+    if freq not in FREQUENCIES:
+        raise ValueError("FREQ must be one of %s" % ", ".join(FREQUENCIES))
+
+    try:
+        interval = int(parts.get("INTERVAL", 1))
+        count = int(parts["COUNT"]) if "COUNT" in parts else None
+    except ValueError:
+        raise ValueError("INTERVAL and COUNT must be whole numbers")
+    if interval < 1:
+        raise ValueError("INTERVAL must be at least 1")
+    if count is not None and not 1 <= count <= MAX_COUNT:
+        raise ValueError(f"COUNT must be between 1 and {MAX_COUNT}")
+    if count is not None and "UNTIL" in parts:
+        raise ValueError("Use COUNT or UNTIL, not both")
+
+    byday = ()
+    if "BYDAY" in parts:
+        if freq != "WEEKLY":
+            raise ValueError("BYDAY is only supported for weekly rules")
+        days = parts["BYDAY"].split(",")
+        if not set(days) <= set(WEEKDAYS):
+            raise ValueError("BYDAY must list weekday codes such as MO,WE")
+        byday = tuple(sorted({WEEKDAYS.index(day) for day in days}))
+
+    until = None
+    if "UNTIL" in parts:
+        value = parts["UNTIL"].rstrip("Z")
+        try:
+            until = datetime.strptime(value, "%Y%m%dT%H%M%S" if "T" in value else "%Y%m%d")
+        except ValueError:
+            raise ValueError("UNTIL must look like 20311215 or 20311215T000000")
+        if "T" not in value:
+            until += timedelta(days=1) - timedelta(microseconds=1)  # the whole day
+
+    return Rule(freq, interval, byday, count, until)
+
+
+def format_rule(rule):
+    """The canonical RRULE string for a ``Rule``."""
+    parts = [f"FREQ={rule.freq}"]
+    if rule.interval != 1:
+        parts.append(f"INTERVAL={rule.interval}")
+    if rule.byday:
+        parts.append("BYDAY=" + ",".join(WEEKDAYS[day] for day in rule.byday))
+    if rule.count is not None:
+        parts.append(f"COUNT={rule.count}")
+    if rule.until is not None:
+        parts.append("UNTIL=" + rule.until.strftime("%Y%m%dT%H%M%S"))
+    return ";".join(parts)
+
+
+def set_recurrence(event, text):
+    """Make ``event`` a series repeating by ``text`` (or a single event if empty).
+
+    Call again whenever the event's times change. Raises ``ValueError`` if the
+    rule is invalid or its first occurrence is not the event itself.
+    """
+    if not text:
+        event.recurrence_rule = event.recurrence_end = None
+        return
+
+    rule = parse_rule(text)
+    start, end = campus_time(event.start_time), campus_time(event.end_time)
+    if rule.byday and start.weekday() not in rule.byday:
+        raise ValueError("BYDAY must include the weekday of the first occurrence")
+    if rule.until is not None and rule.until < start:
+        raise ValueError("UNTIL must not be before the first occurrence")
+
+    if rule.count is not None:
+        *_, last = _starts(start, rule)
+        recurrence_end = last + (end - start)
+    elif rule.until is not None:
+        recurrence_end = rule.until + (end - start)
+    else:
+        recurrence_end = None
+
+    event.recurrence_rule = format_rule(rule)
+    event.recurrence_end = recurrence_end
+
+
+def is_occurrence(event, original_start):
+    """Whether the series ``event`` has a (regular) occurrence starting at ``original_start``."""
+    rule = parse_rule(event.recurrence_rule)
+    for start in _starts(event.start_time, rule, not_before=original_start):
+        return start == original_start
+    return False
+
+
+def series_conditions(window_start, window_end):
+    """Conditions selecting the series that may have occurrences in a window."""
+    return [
+        Event.recurrence_rule.isnot(None),
+        Event.start_time < window_end,
+        or_(Event.recurrence_end.is_(None), Event.recurrence_end > window_start),
+    ]
+
+
+def load_exceptions(event_ids):
+    """``{event_id: {original_start: EventException}}`` for the given series, in one query."""
+    exceptions = {}
+    if event_ids:
+        rows = db.session.scalars(
+            select(EventException).where(EventException.event_id.in_(event_ids))
+        )
+        for exception in rows:
+            exceptions.setdefault(exception.event_id, {})[exception.original_start] = exception
+    return exceptions
+
+
+def expand(series, window_start, window_end):
+    """Yield the occurrences of several series overlapping a window, by start time.
+
+    Cancelled occurrences are skipped and moved ones are reported at their new
+    times (only if those overlap the window).
+    """
+    series = list(series)
+    exceptions = load_exceptions([event.id for event in series])
+    return heapq.merge(
+        *(
+            occurrences(event, window_start, window_end, exceptions.get(event.id, {}))
+            for event in series
+        ),
+        key=lambda occurrence: (occurrence.start_time, occurrence.event.id),
+    )
+
+
+def occurrences(event, window_start, window_end, exceptions=None):
+    """Yield a series' occurrences overlapping ``[window_start, window_end)``, by start time."""
+    exceptions = exceptions or {}
+    rule = parse_rule(event.recurrence_rule)
+    duration = event.end_time - event.start_time
+
+    moved = sorted(
+        (exception.start_time, exception.end_time, exception.original_start)
+        for exception in exceptions.values()
+        if not exception.is_cancelled
+        and exception.start_time < window_end
+        and exception.end_time > window_start
+    )
+    regular = (
+        (start, start + duration, start)
+        for start in _starts(event.start_time, rule, not_before=window_start - duration)
+        if start not in exceptions
+    )
+    for start, end, original in heapq.merge(moved, regular):
+        if start >= window_end:  # every moved occurrence starts earlier, so all were seen
+            return
+        if end > window_start:
+            yield Occurrence(event, original, start, end)
+
+
+def current_occurrence(event, moment):
+    """The first occurrence of series ``event`` still running at ``moment``, or starting later.
+
+    ``None`` once the series is over.
+    """
+    exceptions = load_exceptions([event.id]).get(event.id, {})
+    return next(occurrences(event, moment, datetime.max, exceptions), None)
+
+
+def occurrence_dict(occurrence):
+    """``Event.to_dict`` with the times of one occurrence."""
+    data = occurrence.event.to_dict()
+    data.update(
+        {
+            "date": occurrence.start_time.date().isoformat(),
+            "start_time": occurrence.start_time.time().isoformat(),
+            "end_time": occurrence.end_time.time().isoformat(),
+            "occurrence_start": occurrence.original_start.isoformat(),
+        }
+    )
+    return data
+
+
+def _starts(dtstart, rule, not_before=None):
+    """Occurrence starts in order, skipping whole periods before ``not_before``.
+
+    Counted rules are walked from the first period, as the count depends on it;
+    ``COUNT`` is capped at ``MAX_COUNT`` so that stays cheap.
+    """
+    period = 0
+    if not_before is not None and rule.count is None and not_before > dtstart:
+        period = _period_of(dtstart, rule, not_before)
+
+    produced = 0
+    while True:
+        for start in _period_starts(dtstart, rule, period):
+            if start < dtstart:
+                continue
+            if rule.until is not None and start > rule.until:
+                return
+            if not_before is None or start >= not_before:
+                yield start
+            produced += 1
+            if rule.count is not None and produced >= rule.count:
+                return
+        period += 1
+
+
+def _period_of(dtstart, rule, moment):
+    """Index of the period containing ``moment`` (never past it)."""
+    if rule.freq == "DAILY":
+        return (moment - dtstart) // timedelta(days=rule.interval)
+    if rule.freq == "WEEKLY":
+        week = dtstart - timedelta(days=dtstart.weekday())
+        return (moment - week) // timedelta(weeks=rule.interval)
+    months = (moment.year - dtstart.year) * 12 + moment.month - dtstart.month
+    return months // rule.interval
+
+
+def _period_starts(dtstart, rule, period):
+    """Candidate starts within one period, in order."""
+    if rule.freq == "DAILY":
+        return [dtstart + timedelta(days=period * rule.interval)]
+    if rule.freq == "WEEKLY":
+        week = dtstart - timedelta(days=dtstart.weekday()) + timedelta(weeks=period * rule.interval)
+        return [week + timedelta(days=day) for day in rule.byday or (dtstart.weekday(),)]
+    year, month = divmod(dtstart.month - 1 + period * rule.interval, 12)
+    try:
+        return [dtstart.replace(year=dtstart.year + year, month=month + 1)]
+    except ValueError:  # no such day this month (e.g. the 31st); skipped, as in RFC 5545
+        return []
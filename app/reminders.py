@@ -0,0 +1,214 @@
+"""Reminders sent to attendees shortly before an event starts.
+
+Every ``REMINDER_INTERVAL`` seconds the scheduler looks, for each offset in
+``REMINDER_OFFSETS``, for events whose start time has entered that offset's
+window (a range scan on the ``start_time`` index). An offset's window is the
+``REMINDER_LATE_GRACE`` minutes after its moment, so an event created or
+registered for later than that skips the reminder and gets the next, tighter
+one instead: one created two hours out gets the one-hour reminder only. The
+tightest offset's window runs up to the start, so it is never missed. Times are
+compared on the campus clock (see ``app.localtime``).
+
+Recurring series are expanded into the occurrences starting in each window,
+and everyone registered for the series is reminded of each one.
+
+Delivery is claimed through the ``ReminderDispatch`` ledger (see ``app.claims``)
+and only the attendees whose rows come back are notified. The claim, the
+``Notification`` rows and the outbox emails share one transaction, so each
+(event or occurrence, user, offset) is handled exactly once no matter how many
+workers or nodes run the scheduler.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from flask import current_app
+from markupsafe import escape
+from sqlalchemy import and_, insert, select
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.claims import claim
+from app.email import fill_user_fields, queue_emails, render_event_email
+from app.localtime import local_now
+from app.models import Attendance, Event, Notification, ReminderDispatch, User
+from app.recurrence import expand, series_conditions
+from app.tasks import PeriodicWorker
+
+DISPATCH_KEY = ("event_id", "occurrence_start", "user_id", "offset_minutes")
+
+
+def send_due_reminders(now=None):
+    """Send every reminder that is due; return how many were sent."""
+    config = current_app.config
+    now = now or local_now()
+    offsets = sorted(config["REMINDER_OFFSETS"])
+
+    sent = 0
+    previous = 0
+    for offset in offsets:
+        # The tightest reminder goes out however late; the others only within the grace
+        opens = (
+            previous
+            if offset == offsets[0]
+            else max(previous, offset - config["REMINDER_LATE_GRACE"])
+        )
+        sent += _send_window(
+            offset, now + timedelta(minutes=opens), now + timedelta(minutes=offset)
+        )
+        previous = offset
+    return sent
+
+
+def describe_offset(minutes):
+    """Human-readable lead time, e.g. ``24 hours`` or ``30 minutes``."""
+    if minutes % 60 == 0:
+        hours = minutes // 60
+        return "1 hour" if hours == 1 else f"{hours} hours"
+    return "1 minute" if minutes == 1 else f"{minutes} minutes"
+
+
+def _send_window(offset, starts_after, starts_until):
+    """Remind attendees of events and occurrences starting in ``(starts_after, starts_until]``.
+
+    Candidates are ``(event_id, occurrence_start, start_time, user_id, email,
+    first_name)``; a single event's occurrence start is its start time.
+    """
+    candidates = db.session.execute(
+        select(Event.id, Event.start_time, Event.start_time, User.id, User.email, User.first_name)
+        .join(Attendance, Attendance.event_id == Event.id)
+        .join(User, User.id == Attendance.user_id)
+        .outerjoin(
+            ReminderDispatch,
+            and_(
+                ReminderDispatch.event_id == Event.id,
+                ReminderDispatch.occurrence_start == Event.start_time,
+                ReminderDispatch.user_id == Attendance.user_id,
+                ReminderDispatch.offset_minutes == offset,
+            ),
+        )
+        .where(
+            Event.recurrence_rule.is_(None),
+            Event.start_time > starts_after,
+            Event.start_time <= starts_until,
+            Event.is_active == True,  # noqa: E712
+            User.is_active == True,  # noqa: E712
+            ReminderDispatch.id.is_(None),
+        )
+    ).all()
+    series, occurrence_candidates = _series_candidates(starts_after, starts_until)
+    candidates += occurrence_candidates
+    if not candidates:
+        return 0
+
+    claimed = claim(
+        ReminderDispatch,
+        [
+            {
+                "event_id": event_id,
+                "occurrence_start": occurrence_start,
+                "user_id": user_id,
+                "offset_minutes": offset,
+            }
+            for event_id, occurrence_start, _, user_id, _, _ in candidates
+        ],
+        DISPATCH_KEY,
+    )
+    reminders = [row for row in candidates if (row[0], row[1], row[3], offset) in claimed]
+    if not reminders:
+        db.session.commit()
+        return 0
+
+    events = {event.id: event for event in series}
+    singles = {row[0] for row in reminders} - events.keys()
+    if singles:
+        events.update(
+            (event.id, event)
+            for event in db.session.scalars(
+                select(Event).options(joinedload(Event.department)).where(Event.id.in_(singles))
+            )
+        )
+    lead_time = describe_offset(offset)
+
+    notifications = []
+    messages = []
+    for event_id, occurrence_start, start_time, user_id, email, first_name in reminders:
+        event = events[event_id]
+        notifications.append(
+            {
+                "user_id": user_id,
+                "event_id": event_id,
+                "title": f"Reminder: {event.title}",
+                "message": f"{event.title} starts in {lead_time}.",
+                "notification_type": "reminder",
+            }
+        )
+        times = None
+        if event.recurrence_rule:
+            times = (start_time, start_time + (event.end_time - event.start_time))
+        text_parts, html_parts = render_event_email(
+            "event_reminder", event, times=times, lead_time=lead_time
+        )
+        messages.append(
+            (
+                email,
+                f"Reminder: {event.title} starts in {lead_time}",
+                fill_user_fields(text_parts, first_name),
+                fill_user_fields(html_parts, escape(first_name)),
+            )
+        )
+
+    db.session.execute(insert(Notification), notifications)
+    queue_emails(messages)
+    db.session.commit()
+    return len(reminders)
+
+
+def _series_candidates(starts_after, starts_until):
+    """The recurring series touching a window, and reminder candidates for their occurrences.
+
+    Occurrences already reminded of are left for the claim to drop.
+    """
+    window_end = starts_until + timedelta(seconds=1)  # occurrences starting at starts_until
+    series = db.session.scalars(
+        select(Event)
+        .options(joinedload(Event.department))
+        .where(
+            Event.is_active == True,  # noqa: E712
+            *series_conditions(starts_after, window_end),
+        )
+    ).all()
+    occurrences = [
+        occurrence
+        for occurrence in expand(series, starts_after, window_end)
+        if starts_after < occurrence.start_time <= starts_until
+    ]
+    if not occurrences:
+        return series, []
+
+    attendees = defaultdict(list)
+    for event_id, user_id, email, first_name in db.session.execute(
+        select(Attendance.event_id, User.id, User.email, User.first_name)
+        .join(User, User.id == Attendance.user_id)
+        .where(
+            Attendance.event_id.in_({occurrence.event.id for occurrence in occurrences}),
+            User.is_active == True,  # noqa: E712
+        )
+    ):
+        attendees[event_id].append((user_id, email, first_name))
+
+    candidates = [
+        (occurrence.event.id, occurrence.original_start, occurrence.start_time, *attendee)
+        for occurrence in occurrences
+        for attendee in attendees[occurrence.event.id]
+    ]
+    return series, candidates
+
+
+class ReminderScheduler(PeriodicWorker):
+    """Daemon thread that sends due reminders every ``REMINDER_INTERVAL`` seconds."""
+
+    name = "reminder-scheduler"
+    interval_setting = "REMINDER_INTERVAL"
+
+    def tick(self):
+        send_due_reminders()
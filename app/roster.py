@@ -0,0 +1,233 @@
+"""Bulk roster import for onboarding a whole class of students at once."""
+import csv
+import os
+import secrets
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import Department, User
+from app.utils import validate_email
+
+VALID_ROLES = ("student", "department_admin", "admin")
+
+# Accounts imported without a password get a hash that can never match, so they
+# cannot log in until an admin sets one.
+UNUSABLE_PASSWORD_PREFIX = "!"
+
+
+def import_roster(lines, workers=None, batch_size=1000):
+    """Create users from CSV roster lines.
+
+    Expected columns are ``email`` and ``name`` (or ``first_name``/``last_name``),
+    with optional ``password``, ``role`` and ``department`` (name or id). Rows are
+    read lazily, hashed across a process pool and inserted one batch per
+    transaction. Returns a report with the number of created accounts and one
+    error entry per rejected row.
+    """
+    workers = workers or os.cpu_count() or 1
+    reader = csv.DictReader(lines)
+    importer = _RosterImporter(_load_departments())
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        while True:
+            batch = list(islice(_numbered_rows(reader), batch_size))
+            if not batch:
+                break
+            importer.import_batch(batch, pool, workers)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return importer.report()
+
+
+def _numbered_rows(reader):
+    for row in reader:
+        normalized = {
+            (key or "").strip().lower(): (value or "").strip()
+            for key, value in row.items()
+            if key is not None
+        }
+        yield reader.line_num, normalized
+
+
+def _load_departments():
+    """Map department names (case-insensitive) and ids to department ids."""
+    lookup = {}
+    for dept_id, name in db.session.execute(select(Department.id, Department.name)):
+        lookup[str(dept_id)] = dept_id
+        lookup[name.lower()] = dept_id
+    return lookup
+
+
+def _hash_passwords(passwords, pool, workers):
+    if pool is None:
+        return list(map(generate_password_hash, passwords))
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return list(pool.map(generate_password_hash, passwords, chunksize=chunksize))
+
+
+class _RosterImporter:
+    """Holds the state shared between batches of a single import."""
+
+    def __init__(self, departments):
+        self.departments = departments
+        self.seen_emails = set()
+        self.taken_usernames = set()
+        self.checked_usernames = set()
+        self.expanded_usernames = set()
+        self.created = 0
+        self.without_password = 0
+        self.errors = []
+
+    def report(self):
+        return {
+            "created": self.created,
+            "without_password": self.without_password,
+            "failed": len(self.errors),
+            "errors": self.errors,
+        }
+
+    def import_batch(self, batch, pool, workers):
+        rows = [row for row in (self._validate(line, data) for line, data in batch) if row]
+        rows = self._drop_existing_emails(rows)
+        if not rows:
+            return
+
+        self._assign_usernames(rows)
+
+        with_password = [row for row in rows if row["password"]]
+        hashes = _hash_passwords([row["password"] for row in with_password], pool, workers)
+        for row, password_hash in zip(with_password, hashes):
+            row["values"]["password_hash"] = password_hash
+        for row in rows:
+            if not row["password"]:
+                row["values"]["password_hash"] = UNUSABLE_PASSWORD_PREFIX + secrets.token_hex(16)
+
+        self._insert(rows)
+
+    def _error(self, line, email, message):
+        self.errors.append({"line": line, "email": email or None, "error": message})
+
+    def _validate(self, line, data):
+        email = data.get("email", "")
+        if not validate_email(email):
+            self._error(line, email, "Invalid or missing email")
+            return None
+
+        if email.lower() in self.seen_emails:
+            self._error(line, email, "Duplicate email in roster")
+            return None
+        self.seen_emails.add(email.lower())
+
+        if data.get("first_name"):
+            first_name, last_name = data["first_name"], data.get("last_name", "")
+        elif data.get("name"):
+            name_parts = data["name"].split(maxsplit=1)
+            first_name = name_parts[0]
+            last_name = name_parts[1] if len(name_parts) > 1 else ""
+        else:
+            self._error(line, email, "Missing name")
+            return None
+
+        role = data.get("role") or "student"
+        if role not in VALID_ROLES:
+            self._error(line, email, f"Invalid role: {role}")
+            return None
+
+        department_id = None
+        department = data.get("department") or data.get("department_id")
+        if department:
+            department_id = self.departments.get(department.lower())
+            if department_id is None:
+                self._error(line, email, f"Unknown department: {department}")
+                return None
+
+        return {
+            "line": line,
+            "password": data.get("password", ""),
+            "values": {
+                "email": email,
+                "first_name": first_name,
+                "last_name": last_name,
+                "role": role,
+                "department_id": department_id,
+                "is_active": True,
+                "created_at": datetime.utcnow(),
+            },
+        }
+
+    def _drop_existing_emails(self, rows):
+        emails = [row["values"]["email"] for row in rows]
+        existing = set(db.session.scalars(select(User.email).where(User.email.in_(emails))))
+
+        kept = []
+        for row in rows:
+            if row["values"]["email"] in existing:
+                self._error(row["line"], row["values"]["email"], "Email already registered")
+            else:
+                kept.append(row)
+        return kept
+
+    def _assign_usernames(self, rows):
+        """Derive usernames from emails the same way ``auth.register`` does."""
+        bases = Counter(row["values"]["email"].split("@")[0] for row in rows)
+
+        unchecked = set(bases) - self.checked_usernames
+        if unchecked:
+            self.taken_usernames.update(
+                db.session.scalars(select(User.username).where(User.username.in_(unchecked)))
+            )
+            self.checked_usernames |= unchecked
+
+        # Bases that will need a numeric suffix: load their existing variants once
+        expand = {
+            base for base, count in bases.items() if count > 1 or base in self.taken_usernames
+        } - self.expanded_usernames
+        if expand:
+            self.taken_usernames.update(
+                db.session.scalars(
+                    select(User.username).where(
+                        or_(*[User.username.like(f"{base}%") for base in expand])
+                    )
+                )
+            )
+            self.expanded_usernames |= expand
+
+        for row in rows:
+            base_username = username = row["values"]["email"].split("@")[0]
+            counter = 1
+            while username in self.taken_usernames:
+                username = f"{base_username}{counter}"
+                counter += 1
+            self.taken_usernames.add(username)
+            row["values"]["username"] = username
+
+    def _insert(self, rows):
+        try:
+            db.session.execute(insert(User), [row["values"] for row in rows])
+            db.session.commit()
+            inserted = rows
+        except IntegrityError:
+            # Something raced us; retry row by row so only the offenders fail
+            db.session.rollback()
+            inserted = []
+            for row in rows:
+                try:
+                    with db.session.begin_nested():
+                        db.session.execute(insert(User), [row["values"]])
+                    inserted.append(row)
+                except IntegrityError:
+                    self._error(row["line"], row["values"]["email"], "Conflicts with existing user")
+            db.session.commit()
+
+        self.created += len(inserted)
+        self.without_password += sum(1 for row in inserted if not row["password"])
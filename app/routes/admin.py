@@ -1,10 +1,11 @@
+import io
 from datetime import datetime
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from flask_login import current_user, login_required
 from sqlalchemy import func
 
-from app import db
+from app import db, metrics
 from app.models import Attendance, Department, Event, User
 from app.utils import require_role
 
@@ -87,6 +88,14 @@ def get_dashboard_stats():
     return jsonify({"stats": stats}), 200
 
 
+@admin_bp.route("/metrics", methods=["GET"])
+@login_required
+@require_role(["admin"])
+def get_metrics():
+    """Get this worker's application metrics (admin only)."""
+    return jsonify(metrics.registry().snapshot()), 200
+
+
 @admin_bp.route("/users", methods=["GET"])
 @login_required
 @require_role(["admin"])
@@ -136,6 +145,30 @@ def update_user(user_id):
     return jsonify({"message": "User updated successfully", "user": user.to_dict()}), 200
 
 
+@admin_bp.route("/users/import", methods=["POST"])
+@login_required
+@require_role(["admin"])
+def import_users():
+    """Bulk-create users from an uploaded CSV roster (admin only)."""
+    from app.roster import import_roster
+
+    roster = request.files.get("file")
+    if roster:
+        stream = roster.stream
+    elif request.mimetype == "text/csv":
+        stream = io.BufferedReader(request.stream)
+    else:
+        return jsonify({"error": "CSV file required"}), 400
+
+    report = import_roster(
+        io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""),
+        workers=current_app.config["ROSTER_IMPORT_WORKERS"],
+        batch_size=current_app.config["ROSTER_IMPORT_BATCH_SIZE"],
+    )
+
+    return jsonify({"message": "Roster import completed", **report}), 200
+
+
 @admin_bp.route("/departments", methods=["POST"])
 @login_required
 @require_role(["admin"])
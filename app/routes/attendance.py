@@ -1,12 +1,17 @@
 import csv
 import io
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 
-from flask import Blueprint, jsonify, make_response, request
+from flask import Blueprint, current_app, jsonify, make_response, request
 from flask_login import current_user, login_required
+from sqlalchemy.exc import IntegrityError
 
 from app import db
-from app.models import Attendance, Department, Event, User
+from app.localtime import local_now
+from app.models import Attendance, Department, Event, OccurrenceAttendance, User
+from app.recurrence import current_occurrence
+from app.tokens import verify_checkin_token
 
 attendance_bp = Blueprint("attendance", __name__)
 
@@ -183,49 +188,100 @@ def bulk_check_in():
 
 @attendance_bp.route("/check-in-form", methods=["POST"])
 def check_in_form():
-    """Process check-in form submission (public endpoint for QR code check-ins)."""
+    """Process check-in form submission (public endpoint for QR code check-ins).
+
+    QR codes carry a signed ``token`` with the event id and check-in window, so
+    the event is not loaded; only the user lookup and the attendance insert hit
+    the database. A recurring series' token covers the whole series, so the
+    series is loaded to find the occurrence open for check-in, which gets an
+    ``OccurrenceAttendance``. Bare ``event_id`` submissions from older QR codes
+    are still accepted while ``CHECKIN_ALLOW_UNSIGNED`` is set.
+    """
     data = request.get_json()
 
-    required_fields = ["event_id", "full_name", "email", "department_id"]
+    required_fields = ["full_name", "email", "department_id"]
     for field in required_fields:
         if not data.get(field):
             return jsonify({"error": f"{field.replace('_', ' ').title()} is required"}), 400
 
-    event = db.session.get(Event, data["event_id"])
-    if not event:
-        return jsonify({"error": "Event not found"}), 404
-
-    # Check if event is active
-    if not event.is_active:
-        return jsonify({"error": "Event is not active"}), 400
+    if data.get("token"):
+        claims = verify_checkin_token(data["token"])
+        if claims is None:
+            return jsonify({"error": "Invalid check-in code"}), 400
+        now = time.time()
+        if now < claims["nbf"]:
+            return jsonify({"error": "Check-in has not opened yet"}), 400
+        if claims["exp"] is not None and now >= claims["exp"]:
+            return jsonify({"error": "Check-in has closed"}), 400
+        event_id = claims["eid"]
+        occurrence_start = None
+        if claims.get("series"):
+            occurrence, error = open_occurrence(event_id)
+            if error:
+                return jsonify({"error": error}), 400
+            occurrence_start = occurrence.original_start
+    elif not data.get("event_id"):
+        return jsonify({"error": "Event Id is required"}), 400
+    elif not current_app.config["CHECKIN_ALLOW_UNSIGNED"]:
+        return jsonify({"error": "A signed check-in code is required"}), 400
+    else:
+        event = db.session.get(Event, data["event_id"])
+        if not event:
+            return jsonify({"error": "Event not found"}), 404
 
-    # Check if already checked in with this email
-    # For form submissions, we store data differently
-    # We'll create an attendance record and store form data in a separate table
-    # For now, we'll use the existing Attendance model
+        # Check if event is active
+        if not event.is_active:
+            return jsonify({"error": "Event is not active"}), 400
+        event_id = event.id
+        occurrence_start = None
 
     # Try to find user by email
     user = User.query.filter_by(email=data["email"]).first()
-
-    if user:
-        # Existing user - check if already checked in
-        existing = Attendance.query.filter_by(event_id=event.id, user_id=user.id).first()
-        if existing:
-            return jsonify({"error": "You have already checked in to this event"}), 409
-
-        # Create attendance record
-        attendance = Attendance(event_id=event.id, user_id=user.id, check_in_method="qr_form")
-    else:
-        # Guest check-in (no user account) - we'll still record it
-        # For now, we'll skip this and require users to have accounts
+    if not user:
+        # Guest check-in (no user account) is not supported yet
         return jsonify({"error": "Please register for an account first"}), 400
 
+    # The unique constraint catches duplicates without a separate lookup
+    if occurrence_start:
+        attendance = OccurrenceAttendance(
+            event_id=event_id,
+            user_id=user.id,
+            occurrence_start=occurrence_start,
+            check_in_method="qr_form",
+        )
+    else:
+        attendance = Attendance(event_id=event_id, user_id=user.id, check_in_method="qr_form")
     db.session.add(attendance)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": "You have already checked in to this event"}), 409
 
     return jsonify({"message": "Check-in successful", "attendance": attendance.to_dict()}), 201
 
 
+def open_occurrence(event_id):
+    """``(occurrence, None)`` for the occurrence of a series open for check-in now.
+
+    Otherwise ``(None, error message)``.
+    """
+    config = current_app.config
+    event = db.session.get(Event, event_id)
+    if event is None or not event.recurrence_rule:
+        return None, "Invalid check-in code"
+    if not event.is_active:
+        return None, "Event is not active"
+
+    now = local_now()
+    occurrence = current_occurrence(event, now - timedelta(seconds=config["CHECKIN_CLOSES_AFTER"]))
+    if occurrence is None:
+        return None, "Check-in has closed"
+    if now < occurrence.start_time - timedelta(seconds=config["CHECKIN_OPENS_BEFORE"]):
+        return None, "Check-in has not opened yet"
+    return occurrence, None
+
+
 @attendance_bp.route("/export/<int:event_id>", methods=["GET"])
 @login_required
 def export_attendance(event_id):
@@ -1,8 +1,11 @@
-from flask import Blueprint, jsonify, request
+import math
+
+from flask import Blueprint, current_app, jsonify, request
 from flask_login import current_user, login_required, login_user, logout_user
 
-from app import db
+from app import db, metrics
 from app.models import Department, User
+from app.tokens import bearer_token, issue_access_token, revoke_token, verify_access_token
 
 auth_bp = Blueprint("auth", __name__)
 
@@ -54,6 +57,19 @@ def register():
     return jsonify({"message": "User registered successfully", "user": user.to_dict()}), 201
 
 
+def throttle_login(email):
+    """Reject the attempt before any password hashing if a rate limit is hit."""
+    rejected = current_app.extensions["login_throttle"].check(request.remote_addr, email)
+    if rejected is None:
+        return None
+
+    scope, retry_after = rejected
+    metrics.inc("auth_login_throttled_total", scope=scope)
+    response = jsonify({"error": "Too many login attempts. Please try again later."})
+    response.headers["Retry-After"] = str(math.ceil(retry_after))
+    return response, 429
+
+
 @auth_bp.route("/login", methods=["POST"])
 def login():
     """Authenticate user and create session."""
@@ -62,6 +78,10 @@ def login():
     if not data.get("email") or not data.get("password"):
         return jsonify({"error": "Email and password required"}), 400
 
+    throttled = throttle_login(data["email"])
+    if throttled:
+        return throttled
+
     user = User.query.filter_by(email=data["email"]).first()
 
     if not user or not user.check_password(data["password"]):
@@ -75,6 +95,60 @@ def login():
     return jsonify({"message": "Login successful", "user": user.to_dict()}), 200
 
 
+@auth_bp.route("/token", methods=["POST"])
+def issue_token():
+    """Exchange credentials for a signed bearer token (kiosks and API clients)."""
+    data = request.get_json()
+
+    if not data.get("email") or not data.get("password"):
+        return jsonify({"error": "Email and password required"}), 400
+
+    throttled = throttle_login(data["email"])
+    if throttled:
+        return throttled
+
+    user = User.query.filter_by(email=data["email"]).first()
+
+    if not user or not user.check_password(data["password"]):
+        return jsonify({"error": "Invalid email or password"}), 401
+
+    if not user.is_active:
+        return jsonify({"error": "Account is disabled"}), 403
+
+    token, claims = issue_access_token(user)
+
+    return (
+        jsonify(
+            {
+                "access_token": token,
+                "token_type": "Bearer",
+                "expires_at": claims["exp"],
+                "user": user.to_dict(),
+            }
+        ),
+        201,
+    )
+
+
+@auth_bp.route("/token/revoke", methods=["POST"])
+@login_required
+def revoke_access_token():
+    """Revoke a bearer token (defaults to the one authorizing this request)."""
+    data = request.get_json(silent=True) or {}
+    token = data.get("token") or bearer_token(request)
+
+    claims = verify_access_token(token) if token else None
+    if claims is None:
+        return jsonify({"error": "Valid token required"}), 400
+
+    if claims["uid"] != current_user.id and current_user.role != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    revoke_token(claims)
+
+    return jsonify({"message": "Token revoked"}), 200
+
+
 @auth_bp.route("/logout", methods=["POST"])
 @login_required
 def logout():
@@ -1,61 +1,60 @@
-from datetime import datetime, timedelta
+import heapq
+from datetime import datetime, timedelta, timezone
+from itertools import islice
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context, url_for
 from flask_login import current_user, login_required
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.orm import aliased, joinedload
 
 from app import db
-from app.models import Attendance, Event
+from app.calendar_cache import calendar_events, calendar_window, stream_calendar_json
+from app.conflicts import stream_conflict_report
+from app.ical import feed_validators, render_feed
+from app.localtime import campus_time, local_now
+from app.models import Attendance, Department, Event
+from app.recurrence import expand, occurrence_dict, series_conditions
+from app.scheduling import find_free_slots
+from app.tokens import issue_calendar_token, verify_calendar_token
+from app.utils import require_role
 
 calendar_bp = Blueprint("calendar", __name__)
 
 
 @calendar_bp.route("", methods=["GET"])
 def get_calendar_events():
-    """Get events formatted for calendar view."""
+    """Get events formatted for calendar view.
+
+    The window defaults to ``CALENDAR_DEFAULT_DAYS`` from today and is capped
+    at ``CALENDAR_MAX_DAYS``.
+    """
     start_date = request.args.get("start")
     end_date = request.args.get("end")
     department_id = request.args.get("department_id", type=int)
 
-    query = Event.query.filter_by(is_active=True)
+    start = end = None
 
-    # Parse and apply date filters
+    # Parse date filters
     if start_date:
         try:
             start = datetime.fromisoformat(start_date.replace("Z", "+00:00"))
-            query = query.filter(Event.start_time >= start)
         except ValueError:
             return jsonify({"error": "Invalid start date format"}), 400
 
     if end_date:
         try:
             end = datetime.fromisoformat(end_date.replace("Z", "+00:00"))
-            query = query.filter(Event.end_time <= end)
         except ValueError:
             return jsonify({"error": "Invalid end date format"}), 400
 
-    if department_id:
-        query = query.filter_by(department_id=department_id)
-
-    events = query.all()
-
-    # Format for FullCalendar
-    calendar_events = []
-    for event in events:
-        calendar_events.append(
-            {
-                "id": event.id,
-                "title": event.title,
-                "start": event.start_time.isoformat(),
-                "end": event.end_time.isoformat(),
-                "description": event.description,
-                "location": event.location,
-                "department": event.department.name if event.department else None,
-                "backgroundColor": get_department_color(event.department_id),
-                "borderColor": get_department_color(event.department_id),
-            }
-        )
+    try:
+        start, end = calendar_window(start, end)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    return jsonify({"events": calendar_events}), 200
+    # Formatted for FullCalendar, from the month buckets in app.calendar_cache
+    entries = calendar_events(start, end, department_id)
+    return Response(stream_with_context(stream_calendar_json(entries)), mimetype="application/json")
 
 
 @calendar_bp.route("/conflicts", methods=["POST"])
@@ -71,86 +70,198 @@ def check_conflicts():
         end_time = datetime.fromisoformat(data["end_time"].replace("Z", "+00:00"))
     except ValueError:
         return jsonify({"error": "Invalid date format"}), 400
+    start_time, end_time = campus_time(start_time), campus_time(end_time)
 
-    # Find overlapping events
+    # Find overlapping events, and occurrences of recurring series
     conflicts = Event.query.filter(
         Event.is_active == True,  # noqa: E712
+        Event.recurrence_rule.is_(None),
         Event.start_time < end_time,
         Event.end_time > start_time,
     ).all()
+    series = Event.query.filter(
+        Event.is_active == True, *series_conditions(start_time, end_time)  # noqa: E712
+    )
+    occurrences = list(expand(series, start_time, end_time))
 
     # Exclude the event being edited if event_id is provided
     event_id = data.get("event_id")
     if event_id:
         conflicts = [e for e in conflicts if e.id != event_id]
+        occurrences = [o for o in occurrences if o.event.id != event_id]
+
+    conflict_dicts = [event.to_dict() for event in conflicts]
+    conflict_dicts += [occurrence_dict(occurrence) for occurrence in occurrences]
 
     return (
         jsonify(
             {
-                "has_conflicts": len(conflicts) > 0,
-                "conflicts": [event.to_dict() for event in conflicts],
-                "conflict_count": len(conflicts),
+                "has_conflicts": len(conflict_dicts) > 0,
+                "conflicts": conflict_dicts,
+                "conflict_count": len(conflict_dicts),
             }
         ),
         200,
     )
 
 
+@calendar_bp.route("/conflicts/report", methods=["GET"])
+@login_required
+@require_role(["admin", "department_admin"])
+def get_conflict_report():
+    """Stream every overlapping pair of events in a range as JSON lines.
+
+    Same-location pairs come first, then same-department ones;
+    ``include_unrelated=true`` adds the pairs sharing neither. Department
+    admins only see their own department's events.
+    """
+    try:
+        start = request.args.get("start")
+        end = request.args.get("end")
+        start = datetime.fromisoformat(start.replace("Z", "+00:00")) if start else None
+        end = datetime.fromisoformat(end.replace("Z", "+00:00")) if end else None
+        start, end = calendar_window(start, end)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    department_id = request.args.get("department_id", type=int)
+    if current_user.role == "department_admin":
+        department_id = current_user.department_id
+    include_unrelated = request.args.get("include_unrelated", "false").lower() == "true"
+
+    report = stream_conflict_report(start, end, department_id, include_unrelated)
+    return Response(stream_with_context(report), mimetype="application/x-ndjson")
+
+
+@calendar_bp.route("/availability", methods=["GET"])
+@login_required
+@require_role(["admin", "department_admin"])
+def get_availability():
+    """Open slots of at least ``duration`` minutes between ``start`` and ``end``.
+
+    Only events of ``department_id`` or at ``location`` count as busy when
+    either is given; otherwise every event on campus does.
+    """
+    duration = request.args.get("duration", type=int)
+    if not duration or duration <= 0:
+        return jsonify({"error": "duration (minutes) required"}), 400
+
+    try:
+        start = request.args.get("start")
+        end = request.args.get("end")
+        start = datetime.fromisoformat(start.replace("Z", "+00:00")) if start else None
+        end = datetime.fromisoformat(end.replace("Z", "+00:00")) if end else None
+    except ValueError:
+        return jsonify({"error": "Invalid date format"}), 400
+
+    try:
+        start, end = calendar_window(start, end)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if duration > (end - start) / timedelta(minutes=1):
+        return jsonify({"error": "duration is longer than the date range"}), 400
+
+    slots = [
+        {"start": slot_start.isoformat(), "end": slot_end.isoformat()}
+        for slot_start, slot_end in find_free_slots(
+            start,
+            end,
+            timedelta(minutes=duration),
+            department_id=request.args.get("department_id", type=int),
+            location=request.args.get("location"),
+        )
+    ]
+    return jsonify({"slots": slots, "count": len(slots)}), 200
+
+
 @calendar_bp.route("/upcoming", methods=["GET"])
 def get_upcoming_events():
-    """Get upcoming events for the next 7 days."""
+    """Get upcoming events for the next 7 days.
+
+    The landing page asks for this on every visit, so the serialized list is
+    cached per ``(days, department_id)`` (see ``app.cache.FragmentCache``) and
+    dropped whenever an event changes. Registration counts in it may lag by up
+    to ``UPCOMING_CACHE_TTL`` seconds. ``days`` is capped at ``CALENDAR_MAX_DAYS``.
+    """
     days = request.args.get("days", 7, type=int)
-    department_id = request.args.get("department_id", type=int)
+    department_id = request.args.get("department_id", type=int) or None
+    max_days = current_app.config["CALENDAR_MAX_DAYS"]
+    if not 0 < days <= max_days:
+        return jsonify({"error": "Days must be between 1 and %d" % max_days}), 400
+
+    body = current_app.extensions["upcoming_cache"].get_or_compute(
+        (days, department_id),
+        lambda: current_app.json.dumps(upcoming_events(days, department_id)),
+    )
+    return Response(body, mimetype="application/json"), 200
+
 
-    now = datetime.utcnow()
+def upcoming_events(days, department_id=None):
+    """Active events and occurrences starting in the next ``days`` days, by start time."""
+    now = local_now()
     end_date = now + timedelta(days=days)
 
-    query = Event.query.filter(
-        Event.is_active == True,  # noqa: E712
-        Event.start_time >= now,
-        Event.start_time <= end_date,
-    ).order_by(Event.start_time.asc())
+    query = (
+        select(Event, attendee_count())
+        .where(
+            Event.is_active == True,  # noqa: E712
+            Event.recurrence_rule.is_(None),
+            Event.start_time >= now,
+            Event.start_time <= end_date,
+        )
+        .options(joinedload(Event.department), joinedload(Event.creator))
+        .order_by(Event.start_time.asc())
+    )
+    series = Event.query.filter(
+        Event.is_active == True, *series_conditions(now, end_date)  # noqa: E712
+    )
 
     if department_id:
-        query = query.filter_by(department_id=department_id)
-
-    events = query.all()
+        query = query.where(Event.department_id == department_id)
+        series = series.filter_by(department_id=department_id)
 
-    return jsonify({"events": [event.to_dict() for event in events], "count": len(events)}), 200
-
-
-def get_department_color(department_id):
-    """Get a consistent color for a department."""
-    colors = [
-        "#3788d8",  # Blue
-        "#f39c12",  # Orange
-        "#27ae60",  # Green
-        "#e74c3c",  # Red
-        "#9b59b6",  # Purple
-        "#1abc9c",  # Turquoise
-        "#e67e22",  # Carrot
-        "#34495e",  # Dark Gray
+    # Merge single events with the occurrences of recurring series, by start time
+    upcoming = [
+        (event.start_time, event.to_dict(registered_count=count))
+        for event, count in db.session.execute(query)
     ]
-    if department_id:
-        return colors[department_id % len(colors)]
-    return colors[0]
+    upcoming += [
+        (occurrence.start_time, occurrence_dict(occurrence))
+        for occurrence in expand(series, now, end_date)
+        if now <= occurrence.start_time <= end_date
+    ]
+    upcoming.sort(key=lambda item: item[0])
+    events = [data for _, data in upcoming]
+
+    return {"events": events, "count": len(events)}
 
 
 @calendar_bp.route("/events", methods=["GET"])
 @login_required
 def get_my_calendar_events():
     """Get current user's registered events."""
-    # Get all events the user has registered for
-    attendances = Attendance.query.filter_by(user_id=current_user.id).all()
-    event_ids = [a.event_id for a in attendances]
+    events = registered_events(current_user.id)
+    return jsonify({"events": events}), 200
 
-    events = (
-        Event.query.filter(Event.id.in_(event_ids), Event.is_active == True)  # noqa: E712
-        .order_by(Event.start_time.asc())
-        .all()
-    )
 
-    return jsonify({"events": [event.to_dict() for event in events]}), 200
+@calendar_bp.route("/dashboard", methods=["GET"])
+@login_required
+def get_calendar_dashboard():
+    """Get the statistics and next registered events shown on the student dashboard."""
+    limit = request.args.get("limit", 5, type=int)
+    if limit < 1:
+        return jsonify({"error": "Limit must be positive"}), 400
+
+    now = local_now()
+    return (
+        jsonify(
+            {
+                "statistics": calendar_statistics(current_user.id, now),
+                "events": next_registered_events(current_user.id, now, limit),
+            }
+        ),
+        200,
+    )
 
 
 @calendar_bp.route("/events", methods=["POST"])
@@ -203,30 +314,171 @@ def remove_from_calendar(event_id):
 @login_required
 def get_calendar_statistics():
     """Get statistics for user's calendar."""
-    # Get user's attendances
-    attendances = Attendance.query.filter_by(user_id=current_user.id).all()
-    event_ids = [a.event_id for a in attendances]
+    return jsonify(calendar_statistics(current_user.id, local_now())), 200
+
+
+def registered_events(user_id):
+    """Dicts of a user's active registered events by start time, in one joined query."""
+    return [
+        event.to_dict(registered_count=count)
+        for event, count in db.session.execute(_registered(user_id))
+    ]
+
+
+def next_registered_events(user_id, now, limit):
+    """Dicts of a user's next ``limit`` registered events, by start time.
+
+    Registering for a recurring series covers every occurrence, so each
+    registered series contributes its occurrences from ``now`` on rather than
+    only its first.
+    """
+    singles = db.session.execute(
+        _registered(user_id)
+        .where(Event.recurrence_rule.is_(None), Event.start_time >= now)
+        .limit(limit)
+    )
+    series = db.session.scalars(
+        select(Event)
+        .join(Attendance, Attendance.event_id == Event.id)
+        .where(
+            Attendance.user_id == user_id,
+            Event.is_active == True,  # noqa: E712
+            *series_conditions(now, datetime.max),
+        )
+    )
+    upcoming = heapq.merge(
+        (
+            (event.start_time, event.id, event.to_dict(registered_count=count))
+            for event, count in singles
+        ),
+        (
+            (occurrence.start_time, occurrence.event.id, occurrence_dict(occurrence))
+            for occurrence in expand(series, now, datetime.max)
+            if occurrence.start_time >= now
+        ),
+        key=lambda item: item[:2],
+    )
+    return [data for _, _, data in islice(upcoming, limit)]
+
+
+def _registered(user_id):
+    return (
+        select(Event, attendee_count())
+        .join(Attendance, Attendance.event_id == Event.id)
+        .where(Attendance.user_id == user_id, Event.is_active == True)  # noqa: E712
+        .options(joinedload(Event.department), joinedload(Event.creator))
+        .order_by(Event.start_time.asc(), Event.id.asc())
+    )
 
-    total_events = len(event_ids)
 
-    # Get upcoming events
-    now = datetime.utcnow()
-    upcoming_events = Event.query.filter(
-        Event.id.in_(event_ids) if event_ids else Event.id == None,  # noqa: E711
-        Event.start_time >= now,
+def attendee_count():
+    """Correlated subquery counting an event's registrations, selected beside ``Event``."""
+    attendees = aliased(Attendance)
+    return (
+        select(func.count(attendees.id))
+        .where(attendees.event_id == Event.id)
+        .correlate(Event)
+        .scalar_subquery()
+    )
+
+
+def calendar_statistics(user_id, now):
+    """Registration totals for a user, counted in one aggregate query.
+
+    A registered series is upcoming until its last occurrence has ended.
+    """
+    upcoming = and_(
         Event.is_active == True,  # noqa: E712
-    ).count()
+        or_(
+            Event.start_time >= now,
+            and_(
+                Event.recurrence_rule.isnot(None),
+                or_(Event.recurrence_end.is_(None), Event.recurrence_end > now),
+            ),
+        ),
+    )
+    total_events, upcoming_events = db.session.execute(
+        select(func.count(Attendance.id), func.count(case((upcoming, 1))))
+        .select_from(Attendance)
+        .join(Event, Event.id == Attendance.event_id)
+        .where(Attendance.user_id == user_id)
+    ).one()
 
     # Calculate total points (if events have points)
     total_points = 0
 
-    return (
-        jsonify(
-            {
-                "total_events": total_events,
-                "upcoming_events": upcoming_events,
-                "total_points": total_points,
-            }
+    return {
+        "total_events": total_events,
+        "upcoming_events": upcoming_events,
+        "total_points": total_points,
+    }
+
+
+@calendar_bp.route("/feeds", methods=["GET"])
+@login_required
+def get_calendar_feeds():
+    """Subscription URLs for the current user's calendar app."""
+    feeds = {
+        "personal": url_for(
+            "calendar.get_user_feed", token=issue_calendar_token(current_user), _external=True
         ),
-        200,
-    )
+        "campus": url_for("calendar.get_campus_feed", _external=True),
+    }
+    if current_user.department_id:
+        feeds["department"] = url_for(
+            "calendar.get_department_feed",
+            department_id=current_user.department_id,
+            _external=True,
+        )
+    return jsonify({"feeds": feeds}), 200
+
+
+@calendar_bp.route("/feeds/campus.ics", methods=["GET"])
+def get_campus_feed():
+    """Every active event, as an iCalendar feed."""
+    return ics_response("MuleSpace Events")
+
+
+@calendar_bp.route("/feeds/departments/<int:department_id>.ics", methods=["GET"])
+def get_department_feed(department_id):
+    """A department's active events, as an iCalendar feed."""
+    department = db.session.get(Department, department_id)
+    if not department:
+        return jsonify({"error": "Department not found"}), 404
+    return ics_response(f"MuleSpace: {department.name}", department_id=department_id)
+
+
+@calendar_bp.route("/feeds/users/<token>.ics", methods=["GET"])
+def get_user_feed(token):
+    """The events a user registered for; the token in the URL stands in for a login."""
+    user_id = verify_calendar_token(token)
+    if user_id is None:
+        return jsonify({"error": "Feed not found"}), 404
+    return ics_response("My MuleSpace Events", user_id=user_id, private=True)
+
+
+def ics_response(name, department_id=None, user_id=None, private=False):
+    """Answer a feed poll, rendering only when the client's copy is stale."""
+    etag, last_modified = feed_validators(department_id, user_id)
+    if last_modified is not None:
+        last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+
+    if request.if_none_match:
+        fresh = request.if_none_match.contains(etag)
+    else:
+        since = request.if_modified_since
+        fresh = since is not None and last_modified is not None and last_modified <= since
+
+    if fresh:
+        response = Response(status=304)
+    else:
+        response = Response(render_feed(name, department_id, user_id), mimetype="text/calendar")
+
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.max_age = current_app.config["ICAL_MAX_AGE"]
+    if private:
+        response.cache_control.private = True
+    else:
+        response.cache_control.public = True
+    return response
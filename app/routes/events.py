@@ -1,14 +1,46 @@
+import time
 from datetime import datetime
 
-from flask import Blueprint, jsonify, request
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    jsonify,
+    make_response,
+    redirect,
+    request,
+    stream_with_context,
+)
 from flask_login import current_user, login_required
 
 from app import db
-from app.models import Attendance, Department, Event, User
-from app.utils import generate_qr_code, require_role
+from app.fliers import CONTENT_TYPES as FLIER_CONTENT_TYPES
+from app.fliers import FILENAME as FLIER_FILENAME
+from app.fliers import process_flier, save_flier
+from app.fliers import storage_key as flier_storage_key
+from app.localtime import campus_time
+from app.models import AnnouncementJob, Attendance, Department, Event, EventException, User
+from app.qrcodes import FORMATS as QR_FORMATS
+from app.qrcodes import (
+    checkin_payload,
+    find_events,
+    prerender_event_qr_code,
+    qr_code_bytes,
+    qr_code_url,
+    qr_digest,
+)
+from app.qrcodes import storage_key as qr_storage_key
+from app.qrcodes import stream_qr_zip, valid_payloads
+from app.recurrence import is_occurrence, set_recurrence
+from app.storage import IMMUTABLE, storage
+from app.tasks import submit_task
+from app.utils import require_role
 
 events_bp = Blueprint("events", __name__)
 
+# Column length of AnnouncementJob.title (and of the Notification titles it creates)
+ANNOUNCEMENT_TITLE_MAX = AnnouncementJob.title.type.length
+
 
 @events_bp.route("", methods=["GET"])
 def get_events():
@@ -84,10 +116,6 @@ def get_event(event_id):
 @require_role(["admin", "department_admin"])
 def create_event():
     """Create a new event."""
-    import os
-
-    from werkzeug.utils import secure_filename
-
     # Handle both JSON and FormData
     if request.is_json:
         data = request.get_json()
@@ -117,22 +145,14 @@ def create_event():
     if not department:
         return jsonify({"error": "Department not found"}), 404
 
-    # Handle flier upload
-    flier_path = None
+    # Validate the flier now; its resized variants are rendered in the background
+    flier_data = flier_hash = flier_path = None
     if flier_file and flier_file.filename:
-        # Create uploads directory if it doesn't exist
-        upload_dir = os.path.join("app", "static", "uploads", "fliers")
-        os.makedirs(upload_dir, exist_ok=True)
-
-        # Secure filename and save
-        filename = secure_filename(flier_file.filename)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{timestamp}_{filename}"
-        file_path = os.path.join(upload_dir, filename)
-        flier_file.save(file_path)
-
-        # Store relative path for web access
-        flier_path = f"/static/uploads/fliers/{filename}"
+        flier_data = flier_file.read()
+        try:
+            flier_hash, flier_path = save_flier(flier_data)
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
 
     # Create event
     event = Event(
@@ -145,15 +165,24 @@ def create_event():
         department_id=data["department_id"],
         created_by=current_user.id,
         flier_path=flier_path,
+        flier_hash=flier_hash,
     )
 
+    # A recurring series is one row; its occurrences are expanded when listed
+    try:
+        set_recurrence(event, data.get("recurrence_rule"))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
     db.session.add(event)
-    db.session.commit()
+    db.session.flush()
 
-    # Generate QR code
-    qr_path = generate_qr_code(event.id)
-    event.qr_code_path = qr_path
+    # The QR code's URL is known up front; the image is rendered in the background
+    event.qr_code_path = qr_code_url(event.id, checkin_payload(event))
     db.session.commit()
+    submit_task(prerender_event_qr_code, event.id)
+    if flier_data is not None:
+        submit_task(process_flier, flier_path, flier_data)
 
     return jsonify({"message": "Event created successfully", "event": event.to_dict()}), 201
 
@@ -201,7 +230,24 @@ def update_event(event_id):
     if event.start_time >= event.end_time:
         return jsonify({"error": "Start time must be before end time"}), 400
 
+    # The rule is checked against the (possibly new) first occurrence. Exceptions
+    # name occurrences by their original start, so they do not survive a change.
+    retimed = "start_time" in data or "end_time" in data
+    recurs = "recurrence_rule" in data
+    if recurs or (retimed and event.recurrence_rule):
+        try:
+            set_recurrence(event, data.get("recurrence_rule", event.recurrence_rule))
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        EventException.query.filter_by(event_id=event.id).delete()
+
+    # The signed check-in token covers the event's times and recurrence, so its
+    # QR code changes with them
+    if retimed or recurs:
+        event.qr_code_path = qr_code_url(event.id, checkin_payload(event))
     db.session.commit()
+    if retimed or recurs:
+        submit_task(prerender_event_qr_code, event.id)
 
     return jsonify({"message": "Event updated successfully", "event": event.to_dict()}), 200
 
@@ -228,6 +274,63 @@ def delete_event(event_id):
     return jsonify({"message": "Event deleted successfully"}), 200
 
 
+@events_bp.route("/<int:event_id>/occurrences/<original_start>", methods=["PUT"])
+@events_bp.route("/<int:event_id>/occurrences/<original_start>", methods=["DELETE"])
+@login_required
+@require_role(["admin", "department_admin"])
+def update_occurrence(event_id, original_start):
+    """Move (PUT) or cancel (DELETE) one occurrence of a recurring event.
+
+    The occurrence is named by its original start; only the exception is
+    stored, the rest of the series is untouched.
+    """
+    event = db.session.get(Event, event_id)
+    if not event:
+        return jsonify({"error": "Event not found"}), 404
+    if not event.recurrence_rule:
+        return jsonify({"error": "Event is not recurring"}), 400
+
+    if (
+        current_user.role == "department_admin"
+        and event.department_id != current_user.department_id
+    ):
+        return jsonify({"error": "Unauthorized to edit this event"}), 403
+
+    try:
+        original_start = campus_time(datetime.fromisoformat(original_start.replace("Z", "+00:00")))
+    except ValueError:
+        return jsonify({"error": "Invalid occurrence date format"}), 400
+    if not is_occurrence(event, original_start):
+        return jsonify({"error": "No occurrence starts at that time"}), 404
+
+    exception = EventException.query.filter_by(
+        event_id=event.id, original_start=original_start
+    ).first() or EventException(event_id=event.id, original_start=original_start)
+
+    if request.method == "DELETE":
+        exception.is_cancelled = True
+        exception.start_time = exception.end_time = None
+    else:
+        data = request.get_json() or {}
+        try:
+            start_time = campus_time(
+                datetime.fromisoformat(data["start_time"].replace("Z", "+00:00"))
+            )
+            end_time = campus_time(datetime.fromisoformat(data["end_time"].replace("Z", "+00:00")))
+        except (KeyError, AttributeError, ValueError):
+            return jsonify({"error": "start_time and end_time required"}), 400
+        if start_time >= end_time:
+            return jsonify({"error": "Start time must be before end time"}), 400
+        exception.is_cancelled = False
+        exception.start_time, exception.end_time = start_time, end_time
+
+    db.session.add(exception)
+    event.updated_at = datetime.utcnow()  # the series changed (refreshes feeds and emails)
+    db.session.commit()
+
+    return jsonify({"message": "Occurrence updated", "exception": exception.to_dict()}), 200
+
+
 @events_bp.route("/<int:event_id>/registrations", methods=["GET"])
 @login_required
 def get_event_registrations(event_id):
@@ -278,7 +381,7 @@ def get_event_registrations(event_id):
 @login_required
 def register_for_event(event_id):
     """Register current user for an event."""
-    from app.email import send_registration_confirmation
+    from app.email import queue_registration_confirmation
 
     event = db.session.get(Event, event_id)
     if not event:
@@ -298,19 +401,13 @@ def register_for_event(event_id):
     if event.max_capacity and registered_count >= event.max_capacity:
         return jsonify({"error": "Event is full"}), 400
 
-    # Create attendance record
+    # Create attendance record and queue the confirmation email in the same commit
     attendance = Attendance(event_id=event_id, user_id=current_user.id)
 
     db.session.add(attendance)
+    queue_registration_confirmation(current_user, event)
     db.session.commit()
 
-    # Send confirmation email
-    try:
-        send_registration_confirmation(current_user, event)
-    except Exception as e:
-        # Log the error but don't fail the registration
-        print(f"Failed to send confirmation email: {str(e)}")
-
     return (
         jsonify(
             {"message": "Successfully registered for event", "attendance": attendance.to_dict()}
@@ -319,6 +416,65 @@ def register_for_event(event_id):
     )
 
 
+@events_bp.route("/<int:event_id>/announcements", methods=["POST"])
+@login_required
+@require_role(["admin", "department_admin"])
+def announce_event(event_id):
+    """Notify and email every member of a department about an event."""
+    from app.announcements import start_announcement
+
+    event = db.session.get(Event, event_id)
+    if not event:
+        return jsonify({"error": "Event not found"}), 404
+
+    if (
+        current_user.role == "department_admin"
+        and event.department_id != current_user.department_id
+    ):
+        return jsonify({"error": "Unauthorized to announce this event"}), 403
+
+    data = request.get_json()
+    if not data.get("message") or not isinstance(data["message"], str):
+        return jsonify({"error": "Message is required"}), 400
+
+    title = data.get("title")
+    if title is not None and not isinstance(title, str):
+        return jsonify({"error": "Title must be a string"}), 400
+    if title and len(title) > ANNOUNCEMENT_TITLE_MAX:
+        return (
+            jsonify({"error": f"Title must be at most {ANNOUNCEMENT_TITLE_MAX} characters"}),
+            400,
+        )
+    title = title or f"Announcement: {event.title}"[:ANNOUNCEMENT_TITLE_MAX]
+
+    department_id = event.department_id
+    if current_user.role == "admin" and data.get("department_id") is not None:
+        department_id = data["department_id"]
+        if not isinstance(department_id, int) or isinstance(department_id, bool):
+            return jsonify({"error": "Department ID must be an integer"}), 400
+        if not db.session.get(Department, department_id):
+            return jsonify({"error": "Department not found"}), 404
+
+    job = start_announcement(event, department_id, current_user.id, title, data["message"])
+
+    return jsonify({"message": "Announcement queued", "job": job.to_dict()}), 202
+
+
+@events_bp.route("/<int:event_id>/announcements/<int:job_id>", methods=["GET"])
+@login_required
+@require_role(["admin", "department_admin"])
+def get_announcement_status(event_id, job_id):
+    """Get the progress of an announcement job."""
+    job = db.session.get(AnnouncementJob, job_id)
+    if not job or job.event_id != event_id:
+        return jsonify({"error": "Announcement not found"}), 404
+
+    if current_user.role == "department_admin" and job.department_id != current_user.department_id:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    return jsonify({"job": job.to_dict()}), 200
+
+
 @events_bp.route("/<int:event_id>/attendees", methods=["GET"])
 @login_required
 def get_event_attendees(event_id):
@@ -356,11 +512,135 @@ def get_event_qr_code(event_id):
     ):
         return jsonify({"error": "Unauthorized to generate QR code for this event"}), 403
 
-    # Generate QR code with event information
-    qr_data = f"MULESPACE:EVENT:{event_id}"
-    qr_code_base64 = generate_qr_code(qr_data)
+    result = {"event_id": event_id, "event_title": event.title}
+    rotation = current_app.config["CHECKIN_TOKEN_ROTATION"]
+    if rotation and request.args.get("rotating", "").lower() == "true":
+        # Short-lived code for on-screen display; poll again after refresh_in seconds
+        now = time.time()
+        payload = checkin_payload(event, rotation=rotation, now=now)
+        result["refresh_in"] = rotation - int(now) % rotation
+    else:
+        payload = checkin_payload(event)
+    result["qr_code"] = qr_code_url(event_id, payload, "png")
+    result["qr_code_svg"] = qr_code_url(event_id, payload, "svg")
+    return jsonify(result), 200
 
-    return (
-        jsonify({"qr_code": qr_code_base64, "event_id": event_id, "event_title": event.title}),
-        200,
+
+@events_bp.route("/qr-codes", methods=["GET"])
+@login_required
+@require_role(["admin", "department_admin"])
+def export_qr_codes():
+    """Download the check-in QR codes of many events as one ZIP.
+
+    Select events with ``ids`` (comma-separated) and/or ``department_id``,
+    ``start_date`` and ``end_date``; ``format`` is ``png`` (default) or ``svg``.
+    The archive is streamed as the images are rendered.
+    """
+    fmt = request.args.get("format", "png")
+    if fmt not in QR_FORMATS:
+        return jsonify({"error": "Unsupported format"}), 400
+
+    try:
+        event_ids = [int(i) for i in request.args.get("ids", "").split(",") if i.strip()]
+        start = request.args.get("start_date")
+        end = request.args.get("end_date")
+        start = datetime.fromisoformat(start.replace("Z", "+00:00")) if start else None
+        end = datetime.fromisoformat(end.replace("Z", "+00:00")) if end else None
+    except ValueError:
+        return jsonify({"error": "Invalid ids or date format"}), 400
+
+    department_id = request.args.get("department_id", type=int)
+    if current_user.role == "department_admin":
+        if department_id and department_id != current_user.department_id:
+            return jsonify({"error": "Unauthorized to export QR codes for this department"}), 403
+        department_id = current_user.department_id
+
+    if not (event_ids or department_id or start or end):
+        return jsonify({"error": "Select events by ids, department or date range"}), 400
+
+    events = find_events(event_ids, department_id, start, end)
+    if not events:
+        return jsonify({"error": "No matching events"}), 404
+    if len(events) > current_app.config["QR_BATCH_MAX_EVENTS"]:
+        return jsonify({"error": "Too many events; narrow the selection"}), 400
+
+    stream = stream_qr_zip(events, fmt, workers=current_app.config["QR_BATCH_WORKERS"])
+    return Response(
+        stream_with_context(stream),
+        mimetype="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=qr-codes-{fmt}.zip"},
     )
+
+
+@events_bp.route("/fliers/<filename>", methods=["GET"])
+def get_flier(filename):
+    """Serve a processed flier variant; names are content hashes, so cache forever.
+
+    With S3 storage this redirects to a signed URL instead of proxying the bytes.
+    """
+    if not FLIER_FILENAME.match(filename):
+        return jsonify({"error": "Flier not found"}), 404
+
+    key = flier_storage_key(filename)
+    signed_url = storage().url(key)
+    if signed_url:
+        return _media_redirect(signed_url)
+
+    try:
+        chunks = storage().open(key)
+    except FileNotFoundError:
+        return jsonify({"error": "Flier not found"}), 404
+
+    response = Response(chunks, mimetype=FLIER_CONTENT_TYPES[filename.rpartition(".")[2]])
+    response.headers["Cache-Control"] = IMMUTABLE
+    return response
+
+
+@events_bp.route("/<int:event_id>/qr-code/<digest>.<fmt>", methods=["GET"])
+def get_event_qr_image(event_id, digest, fmt):
+    """Serve a check-in QR code image (PNG or SVG).
+
+    URLs are content-addressed, so responses are cacheable forever; a digest
+    that no longer matches one of the event's payloads is a 404. Rotating
+    codes are only valid for a couple of slots and are kept in memory only.
+    Stored codes redirect to a signed URL when storage provides one.
+    """
+    event = db.session.get(Event, event_id)
+    if not event or fmt not in QR_FORMATS:
+        return jsonify({"error": "QR code not found"}), 404
+
+    payloads = valid_payloads(event)
+    digests = [qr_digest(payload, fmt) for payload in payloads]
+    if digest not in digests:
+        return jsonify({"error": "QR code not found"}), 404
+    rotating = digests.index(digest) > 0
+
+    if not rotating:
+        signed_url = storage().url(qr_storage_key(digest, fmt))
+        if signed_url:
+            qr_code_bytes(payloads[0], fmt)  # make sure it has been rendered and stored
+            return _media_redirect(signed_url)
+
+    if digest in request.if_none_match:
+        response = make_response("", 304)
+    else:
+        _, data = qr_code_bytes(payloads[digests.index(digest)], fmt, persist=not rotating)
+        response = make_response(data)
+        response.content_type = QR_FORMATS[fmt]
+
+    response.set_etag(digest)
+    response.cache_control.public = True
+    if rotating:
+        response.cache_control.max_age = 2 * current_app.config["CHECKIN_TOKEN_ROTATION"]
+    else:
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    return response
+
+
+def _media_redirect(signed_url):
+    """Send the client to storage; the redirect is cached for half the URL's lifetime."""
+    response = redirect(signed_url)
+    response.cache_control.private = True
+    response.cache_control.max_age = current_app.config["MEDIA_URL_EXPIRES"] // 2
+    return response
@@ -0,0 +1,110 @@
+from datetime import datetime
+
+from flask import Blueprint, jsonify, request
+from flask_login import current_user, login_required
+from sqlalchemy import and_, func, or_, select, update
+
+from app import db
+from app.models import Notification
+
+notifications_bp = Blueprint("notifications", __name__)
+
+MAX_PAGE_SIZE = 100
+
+
+def unread_count(user_id):
+    """Count a user's unread notifications (served by the partial index)."""
+    return db.session.scalar(
+        select(func.count())
+        .select_from(Notification)
+        .where(Notification.user_id == user_id, Notification.is_read == False)  # noqa: E712
+    )
+
+
+def encode_cursor(notification):
+    return f"{notification.sent_at.isoformat()}_{notification.id}"
+
+
+def decode_cursor(cursor):
+    """Parse a cursor from ``encode_cursor``; raises ``ValueError`` if malformed."""
+    sent_at, _, notification_id = cursor.rpartition("_")
+    return datetime.fromisoformat(sent_at), int(notification_id)
+
+
+@notifications_bp.route("", methods=["GET"])
+@login_required
+def list_notifications():
+    """List the current user's notifications, newest first.
+
+    Pages are keyset-paginated on ``(sent_at, id)``: pass the ``next_cursor`` of
+    one page as ``before`` to get the next, so deep pages cost the same as the
+    first.
+    """
+    limit = min(max(request.args.get("limit", 20, type=int), 1), MAX_PAGE_SIZE)
+    unread_only = request.args.get("unread", "false").lower() == "true"
+    before = request.args.get("before")
+
+    query = select(Notification).where(Notification.user_id == current_user.id)
+    if unread_only:
+        query = query.where(Notification.is_read == False)  # noqa: E712
+
+    if before:
+        try:
+            sent_at, notification_id = decode_cursor(before)
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+        query = query.where(
+            or_(
+                Notification.sent_at < sent_at,
+                and_(Notification.sent_at == sent_at, Notification.id < notification_id),
+            )
+        )
+
+    notifications = db.session.scalars(
+        query.order_by(Notification.sent_at.desc(), Notification.id.desc()).limit(limit + 1)
+    ).all()
+    has_more = len(notifications) > limit
+    notifications = notifications[:limit]
+
+    return (
+        jsonify(
+            {
+                "notifications": [n.to_dict() for n in notifications],
+                "next_cursor": encode_cursor(notifications[-1]) if has_more else None,
+                "unread_count": unread_count(current_user.id),
+            }
+        ),
+        200,
+    )
+
+
+@notifications_bp.route("/unread-count", methods=["GET"])
+@login_required
+def get_unread_count():
+    """Get the number of unread notifications for the navbar badge."""
+    return jsonify({"unread_count": unread_count(current_user.id)}), 200
+
+
+@notifications_bp.route("/read", methods=["POST"])
+@login_required
+def mark_read():
+    """Mark notifications as read.
+
+    Send ``{"ids": [...]}`` for specific notifications or ``{"all": true}`` to
+    clear the whole inbox. Ids belonging to other users are ignored.
+    """
+    data = request.get_json(silent=True) or {}
+    ids = data.get("ids")
+
+    stmt = update(Notification).where(
+        Notification.user_id == current_user.id, Notification.is_read == False  # noqa: E712
+    )
+    if not data.get("all"):
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            return jsonify({"error": "Provide a list of notification ids or all: true"}), 400
+        stmt = stmt.where(Notification.id.in_(ids))
+
+    updated = db.session.execute(stmt.values(is_read=True)).rowcount
+    db.session.commit()
+
+    return jsonify({"updated": updated, "unread_count": unread_count(current_user.id)}), 200
@@ -7,6 +7,17 @@ from flask_login import current_user, login_required
 views_bp = Blueprint("views", __name__)
 
 
+@views_bp.app_context_processor
+def inject_unread_notifications():
+    """Expose the unread notification count to the navbar badge."""
+    if not current_user.is_authenticated:
+        return {}
+
+    from app.routes.notifications import unread_count
+
+    return {"unread_notifications": unread_count(current_user.id)}
+
+
 @views_bp.route("/")
 def index():
     """Homepage - redirects based on user role."""
@@ -0,0 +1,80 @@
+"""Finding open slots for new events.
+
+The busy intervals in a range (single events and occurrences of recurring
+series, plus the hours outside ``SCHEDULING_DAY_START``-``SCHEDULING_DAY_END``
+each day) are produced already sorted by start and swept once: a cursor
+tracks the end of everything seen so far, and each gap between the cursor and
+the next busy interval that is long enough is an open slot. Nothing is
+sorted or compared pairwise, so a semester costs one indexed range query and
+a linear pass.
+"""
+import heapq
+from datetime import datetime, time, timedelta
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from app import db
+from app.models import Event
+from app.recurrence import expand, series_conditions
+
+
+def busy_intervals(start, end, department_id=None, location=None):
+    """Yield ``(start_time, end_time)`` of the events overlapping a range, by start time."""
+    conditions = [Event.is_active == True]  # noqa: E712
+    if department_id:
+        conditions.append(Event.department_id == department_id)
+    if location:
+        conditions.append(func.lower(func.trim(Event.location)) == location.strip().lower())
+
+    singles = db.session.execute(
+        select(Event.start_time, Event.end_time)
+        .where(
+            *conditions,
+            Event.recurrence_rule.is_(None),
+            Event.start_time < end,
+            Event.end_time > start,
+        )
+        .order_by(Event.start_time)
+    )
+    series = db.session.scalars(select(Event).where(*conditions, *series_conditions(start, end)))
+    occurrences = (
+        (occurrence.start_time, occurrence.end_time) for occurrence in expand(series, start, end)
+    )
+    return heapq.merge(((row.start_time, row.end_time) for row in singles), occurrences)
+
+
+def closed_hours(start, end, day_start, day_end):
+    """Yield the nightly ``(day_end, next day_start)`` intervals covering a range."""
+    day = start.date() - timedelta(days=1)
+    while datetime.combine(day, day_end) < end:
+        yield datetime.combine(day, day_end), datetime.combine(day + timedelta(days=1), day_start)
+        day += timedelta(days=1)
+
+
+def free_slots(busy, start, end, duration):
+    """Yield ``(slot_start, slot_end)`` gaps of at least ``duration`` in ``[start, end)``.
+
+    ``busy`` must be sorted by start time; intervals may overlap.
+    """
+    cursor = start
+    for busy_start, busy_end in busy:
+        if busy_start >= end:
+            break
+        if busy_start - cursor >= duration:
+            yield cursor, busy_start
+        cursor = max(cursor, busy_end)
+    if end - cursor >= duration:
+        yield cursor, end
+
+
+def find_free_slots(start, end, duration, department_id=None, location=None):
+    """Open slots of at least ``duration`` within opening hours, in order."""
+    config = current_app.config
+    day_start = time(config["SCHEDULING_DAY_START"])
+    day_end = time(config["SCHEDULING_DAY_END"])
+    busy = heapq.merge(
+        busy_intervals(start, end, department_id, location),
+        closed_hours(start, end, day_start, day_end),
+    )
+    return free_slots(busy, start, end, duration)
@@ -0,0 +1,179 @@
+"""Where QR codes and flier images are kept.
+
+``LocalStorage`` keeps objects under ``MEDIA_ROOT``, an absolute path, so it
+does not depend on the worker's working directory. Deployments running several
+nodes point ``MEDIA_STORAGE_URL`` at an S3-compatible bucket instead, so every
+node sees the same files. Both backends move data in ``CHUNK_SIZE`` pieces.
+S3 objects are handed out as signed URLs, so app nodes redirect to the bucket
+rather than proxying the bytes; local files are streamed by the app.
+"""
+import io
+import os
+import shutil
+import tempfile
+from urllib.parse import urlparse
+
+from flask import current_app
+from werkzeug.security import safe_join
+
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+class LocalStorage:
+    """Objects stored as files under ``root``."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def save(self, key, data, content_type=None, cache_control=None):
+        """Store bytes or a binary stream, copied in chunks.
+
+        Written via a temp file so concurrent readers never see a partial object.
+        """
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                _copy(data, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def open(self, key):
+        """Return an iterator over the object's chunks; ``FileNotFoundError`` if missing."""
+        return _iter_chunks(open(self._path(key), "rb"))
+
+    def read(self, key):
+        """The whole object, or ``None`` if it does not exist."""
+        try:
+            return b"".join(self.open(key))
+        except FileNotFoundError:
+            return None
+
+    def url(self, key, expires_in=None):
+        """Local files have no URL of their own; the app serves them."""
+        return None
+
+    def delete(self, key):
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _path(self, key):
+        path = safe_join(self.root, key)
+        if path is None:
+            raise ValueError(f"Invalid storage key: {key!r}")
+        return path
+
+
+class S3Storage:
+    """Objects in an S3-compatible bucket, under an optional key prefix."""
+
+    def __init__(self, client, bucket, prefix=""):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+        except Exception as exc:
+            if _is_not_found(exc):
+                return False
+            raise
+        return True
+
+    def save(self, key, data, content_type=None, cache_control=None):
+        """Upload bytes or a binary stream (multipart, in chunks, for large objects)."""
+        extra = {}
+        if content_type:
+            extra["ContentType"] = content_type
+        if cache_control:
+            extra["CacheControl"] = cache_control
+        stream = io.BytesIO(data) if isinstance(data, bytes) else data
+        self.client.upload_fileobj(stream, self.bucket, self.prefix + key, ExtraArgs=extra)
+
+    def open(self, key):
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)
+        except Exception as exc:
+            if _is_not_found(exc):
+                raise FileNotFoundError(key) from exc
+            raise
+        return response["Body"].iter_chunks(CHUNK_SIZE)
+
+    def read(self, key):
+        try:
+            return b"".join(self.open(key))
+        except FileNotFoundError:
+            return None
+
+    def url(self, key, expires_in=None):
+        """A signed GET URL clients can fetch the object from directly."""
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self.prefix + key},
+            ExpiresIn=expires_in or current_app.config["MEDIA_URL_EXPIRES"],
+        )
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+
+def storage_from_config(config):
+    """Build the backend named by ``MEDIA_STORAGE_URL`` (``MEDIA_ROOT`` if unset)."""
+    url = config["MEDIA_STORAGE_URL"]
+    if not url:
+        return LocalStorage(config["MEDIA_ROOT"])
+
+    parsed = urlparse(url)
+    if parsed.scheme == "file":
+        return LocalStorage(parsed.path)
+    if parsed.scheme != "s3":
+        raise ValueError(f"Unsupported MEDIA_STORAGE_URL: {url}")
+
+    try:
+        import boto3
+    except ImportError as exc:  # pragma: no cover - depends on the environment
+        raise RuntimeError("The boto3 package is required for S3 media storage") from exc
+
+    client = boto3.client(
+        "s3", endpoint_url=config["S3_ENDPOINT_URL"], region_name=config["S3_REGION"]
+    )
+    prefix = parsed.path.lstrip("/")
+    return S3Storage(client, parsed.netloc, prefix + "/" if prefix else "")
+
+
+def storage():
+    """The current app's media storage."""
+    return current_app.extensions["storage"]
+
+
+def _copy(data, f):
+    if isinstance(data, bytes):
+        f.write(data)
+    else:
+        shutil.copyfileobj(data, f, CHUNK_SIZE)
+
+
+def _iter_chunks(f):
+    with f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def _is_not_found(exc):
+    """Whether a botocore ``ClientError`` (or look-alike) means the key is missing."""
+    error = getattr(exc, "response", {}).get("Error", {})
+    return str(error.get("Code")) in ("404", "NoSuchKey", "NotFound")
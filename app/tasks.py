@@ -0,0 +1,106 @@
+"""Background work that should not tie up a request worker.
+
+One-off tasks run on a small thread pool inside the worker process, each with
+its own app context and database session (``TASKS_EAGER`` runs them inline
+instead, which the test suite relies on). Recurring jobs such as the outbox and
+the reminder scheduler subclass ``PeriodicWorker``.
+"""
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from app import db
+
+
+class TaskRunner:
+    """Thread pool bound to one Flask app."""
+
+    def __init__(self, app):
+        self.app = app
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` in the background; return its future (or None)."""
+        if self.app.config["TASKS_EAGER"]:
+            self._run(fn, args, kwargs)
+            return None
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.app.config["TASK_WORKERS"], thread_name_prefix="task"
+                )
+        return self._executor.submit(self._run, fn, args, kwargs)
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+    def _run(self, fn, args, kwargs):
+        with self.app.app_context():
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                self.app.logger.exception("Background task %s failed", fn.__name__)
+                db.session.rollback()
+            finally:
+                db.session.remove()
+
+
+def submit_task(fn, *args, **kwargs):
+    """Submit a task on the current app's runner."""
+    return current_app.extensions["tasks"].submit(fn, *args, **kwargs)
+
+
+class PeriodicWorker(ABC):
+    """Daemon thread calling ``tick()`` in an app context until stopped.
+
+    ``tick`` returns a truthy value when it did work, in which case it is called
+    again straight away; otherwise the thread sleeps for the configured interval.
+    """
+
+    name = "periodic-worker"
+    interval_setting = None
+
+    def __init__(self, app):
+        self.app = app
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    @abstractmethod
+    def tick(self):
+        """Do one round of work; return a truthy value if there may be more."""
+
+    def ensure_started(self):
+        """Start the thread on first use (cheap to call on every request)."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        interval = self.app.config[self.interval_setting]
+        while not self._stop.is_set():
+            with self.app.app_context():
+                try:
+                    busy = self.tick()
+                except Exception:  # pragma: no cover - keep the worker alive
+                    self.app.logger.exception("%s failed", self.name)
+                    db.session.rollback()
+                    busy = False
+                finally:
+                    db.session.remove()
+
+            if not busy:
+                self._stop.wait(interval)
@@ -0,0 +1,183 @@
+"""Signed, stateless tokens for kiosks, API clients and event check-in.
+
+Tokens are HMAC-signed with ``SECRET_KEY`` (via itsdangerous) and carry
+everything ``require_role`` needs, so authorizing a request does not touch the
+database. Requests that write also check the token has not been revoked and
+that its user has not been deactivated or had their role or department
+changed since it was issued.
+
+Check-in tokens are printed in event QR codes. They carry the event id,
+department and check-in window, so a check-in can be validated without
+loading the event. A recurring series gets one token valid from its first
+occurrence to its last; the occurrence is picked when the code is used.
+Calendar feed tokens stand in for a login in the .ics URLs that calendar apps
+poll.
+"""
+import math
+import secrets
+import time
+from datetime import datetime, timezone
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+
+from app import db, login_manager
+from app.localtime import timestamp
+from app.models import RevokedToken, User, UserPrincipal
+
+ACCESS_TOKEN_SALT = "mulespace.access-token"
+CHECKIN_TOKEN_SALT = "mulespace.checkin"
+CALENDAR_FEED_SALT = "mulespace.calendar-feed"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def _serializer(salt):
+    return URLSafeSerializer(current_app.config["SECRET_KEY"], salt=salt)
+
+
+def issue_access_token(user, expires_in=None):
+    """Return ``(token, claims)`` for ``user``."""
+    expires_in = expires_in or current_app.config["ACCESS_TOKEN_TTL"]
+    claims = {
+        "uid": user.id,
+        "role": user.role,
+        "dept": user.department_id,
+        "iat": time.time(),
+        "exp": int(time.time()) + expires_in,
+        "jti": secrets.token_urlsafe(16),
+    }
+    return _serializer(ACCESS_TOKEN_SALT).dumps(claims), claims
+
+
+def verify_access_token(token):
+    """Return the claims of a valid, unexpired token or None."""
+    try:
+        claims = _serializer(ACCESS_TOKEN_SALT).loads(token)
+    except BadSignature:
+        return None
+
+    if not isinstance(claims, dict) or claims.get("exp", 0) <= time.time():
+        return None
+    return claims
+
+
+def issue_checkin_token(event, rotation=None, now=None):
+    """Return the check-in token for ``event``.
+
+    Without ``rotation`` the token is deterministic (no nonce or issue time),
+    so the event's QR code stays the same until the event's times change. With
+    ``rotation`` seconds it also expires at the end of the next rotation slot,
+    which makes a screenshot of an on-screen code useless a minute later.
+
+    A series' token is marked ``series`` and runs until its last occurrence's
+    check-in closes (``exp`` is ``None`` for a series without an end); the
+    check-in picks the occurrence.
+    """
+    config = current_app.config
+    end_time = event.recurrence_end if event.recurrence_rule else event.end_time
+    claims = {
+        "eid": event.id,
+        "dept": event.department_id,
+        "nbf": timestamp(event.start_time) - config["CHECKIN_OPENS_BEFORE"],
+        "exp": timestamp(end_time) + config["CHECKIN_CLOSES_AFTER"] if end_time else None,
+    }
+    if event.recurrence_rule:
+        claims["series"] = True
+    if rotation:
+        slot = int((now or time.time()) // rotation)
+        claims["slot"] = slot
+        claims["exp"] = min(claims["exp"] or math.inf, (slot + 2) * rotation)
+    return _serializer(CHECKIN_TOKEN_SALT).dumps(claims)
+
+
+def verify_checkin_token(token):
+    """Return the claims of a genuine check-in token or None.
+
+    The validity window is left to the caller so it can say whether check-in
+    has not opened yet or has closed.
+    """
+    try:
+        claims = _serializer(CHECKIN_TOKEN_SALT).loads(token)
+    except BadSignature:
+        return None
+
+    if not isinstance(claims, dict) or not {"eid", "nbf", "exp"} <= claims.keys():
+        return None
+    return claims
+
+
+def issue_calendar_token(user):
+    """Return the secret in ``user``'s personal calendar feed URL.
+
+    Deterministic, so the subscription URL stays the same across sessions; it
+    only grants read access to the user's registered events.
+    """
+    return _serializer(CALENDAR_FEED_SALT).dumps({"uid": user.id})
+
+
+def verify_calendar_token(token):
+    """Return the user id of a genuine calendar feed token or None."""
+    try:
+        claims = _serializer(CALENDAR_FEED_SALT).loads(token)
+    except BadSignature:
+        return None
+    return claims.get("uid") if isinstance(claims, dict) else None
+
+
+def bearer_token(request):
+    """Extract the token from an ``Authorization: Bearer`` header."""
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    return token.strip()
+
+
+def is_token_revoked(jti):
+    return db.session.get(RevokedToken, jti) is not None
+
+
+def is_token_outdated(claims):
+    """Whether the token's user is gone, inactive, or changed since it was issued."""
+    user = db.session.execute(
+        db.select(User.is_active, User.tokens_valid_after).filter_by(id=claims["uid"])
+    ).first()
+    if user is None or not user.is_active:
+        return True
+    if user.tokens_valid_after is None:
+        return False
+    valid_after = user.tokens_valid_after.replace(tzinfo=timezone.utc).timestamp()
+    return claims.get("iat", 0) < valid_after
+
+
+def revoke_token(claims):
+    """Add a token to the revocation list, pruning entries that have expired."""
+    now = datetime.utcnow()
+    RevokedToken.query.filter(RevokedToken.expires_at < now).delete()
+    if not is_token_revoked(claims["jti"]):
+        db.session.add(
+            RevokedToken(
+                jti=claims["jti"],
+                user_id=claims["uid"],
+                expires_at=datetime.utcfromtimestamp(claims["exp"]),
+            )
+        )
+    db.session.commit()
+
+
+@login_manager.request_loader
+def load_user_from_request(request):
+    """Authenticate requests carrying a bearer token instead of a session."""
+    token = bearer_token(request)
+    if token is None:
+        return None
+
+    claims = verify_access_token(token)
+    if claims is None:
+        return None
+
+    if request.method not in SAFE_METHODS and (
+        is_token_revoked(claims["jti"]) or is_token_outdated(claims)
+    ):
+        return None
+
+    return UserPrincipal(claims["uid"], claims["role"], claims["dept"], True)
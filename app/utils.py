@@ -1,32 +1,16 @@
-import os
 from functools import wraps
 
-import qrcode
 from flask import jsonify
 from flask_login import current_user
 
+from app.qrcodes import checkin_payload, qr_code_bytes, qr_code_url
 
-def generate_qr_code(event_id, base_url="http://127.0.0.1:5001"):
-    """Generate QR code for event check-in form."""
-    qr_dir = os.path.join("app", "static", "qrcodes")
-    os.makedirs(qr_dir, exist_ok=True)
 
-    # Generate QR code data (URL to check-in form)
-    qr_data = f"{base_url}/check-in?event={event_id}"
-
-    # Create QR code
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(qr_data)
-    qr.make(fit=True)
-
-    img = qr.make_image(fill_color="black", back_color="white")
-
-    # Save QR code
-    filename = f"event_{event_id}.png"
-    filepath = os.path.join(qr_dir, filename)
-    img.save(filepath)
-
-    return f"/static/qrcodes/{filename}"
+def generate_qr_code(event, base_url=None):
+    """Render the check-in QR code for an event and return its URL."""
+    payload = checkin_payload(event, base_url)
+    qr_code_bytes(payload)
+    return qr_code_url(event.id, payload)
 
 
 def require_role(roles):
@@ -15,8 +15,76 @@ class Config:
     # Pagination
     ITEMS_PER_PAGE = 20
 
+    # Authenticated principal cache used by the Flask-Login user loader
+    PRINCIPAL_CACHE_SIZE = 4096
+    PRINCIPAL_CACHE_TTL = 30  # seconds
+
+    # Signed bearer tokens for kiosks and API clients
+    ACCESS_TOKEN_TTL = 12 * 60 * 60  # seconds
+
+    # Event times are stored as naive wall-clock times on the campus clock (see app.localtime)
+    EVENT_TIMEZONE = os.environ.get("EVENT_TIMEZONE") or "America/New_York"
+
+    # Signed check-in tokens carried in event QR codes
+    CHECKIN_OPENS_BEFORE = 60 * 60  # seconds before Event.start_time
+    CHECKIN_CLOSES_AFTER = 60 * 60  # seconds after Event.end_time
+    CHECKIN_TOKEN_ROTATION = 60  # lifetime slot of rotating (on-screen) tokens
+    CHECKIN_ALLOW_UNSIGNED = False  # set to accept bare event ids from pre-token QR codes
+
+    # Login throttling (sliding window; set the storage URL to share it across nodes)
+    LOGIN_RATE_LIMIT_WINDOW = 300  # seconds
+    LOGIN_RATE_LIMIT_PER_IP = 100
+    LOGIN_RATE_LIMIT_PER_ACCOUNT = 10
+    LOGIN_RATE_LIMIT_STORAGE_URL = os.environ.get("LOGIN_RATE_LIMIT_STORAGE_URL")
+
+    # Reverse proxies in front of the app whose X-Forwarded-* headers are trusted;
+    # the per-IP limit and request.remote_addr depend on it
+    TRUSTED_PROXY_COUNT = int(os.environ.get("TRUSTED_PROXY_COUNT", 0))
+
+    # Bulk roster import (None means one hashing process per CPU)
+    ROSTER_IMPORT_WORKERS = None
+    ROSTER_IMPORT_BATCH_SIZE = 1000
+
+    # Media storage for QR codes and fliers: MEDIA_ROOT on local disk, or a shared
+    # S3-compatible bucket as s3://bucket/prefix (needs boto3; S3_ENDPOINT_URL for MinIO)
+    MEDIA_ROOT = os.environ.get("MEDIA_ROOT") or os.path.join(basedir, "media")
+    MEDIA_STORAGE_URL = os.environ.get("MEDIA_STORAGE_URL")
+    MEDIA_URL_EXPIRES = 3600  # lifetime of signed S3 URLs, in seconds
+    S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL")
+    S3_REGION = os.environ.get("S3_REGION")
+
     # QR Code Settings
-    QR_CODE_DIR = os.path.join(basedir, "app", "static", "qrcodes")
+    QR_CODE_BASE_URL = os.environ.get("QR_CODE_BASE_URL") or "http://127.0.0.1:5001"
+    QR_CODE_CACHE_SIZE = 512  # rendered images kept in memory per worker
+    QR_BATCH_WORKERS = None  # processes for batch exports; None means one per CPU
+    QR_BATCH_MAX_EVENTS = 1000
+
+    # iCalendar feeds
+    ICAL_CACHE_SIZE = 4096  # rendered VEVENTs kept in memory per worker
+    ICAL_PAST_DAYS = 90  # events that ended longer ago drop out of the feeds
+    ICAL_MAX_AGE = 300  # seconds clients may reuse a feed before revalidating
+
+    # Calendar view (FullCalendar payload cached in per-month, per-department buckets)
+    CALENDAR_CACHE_SIZE = 512  # buckets kept in memory per worker
+    CALENDAR_CACHE_TTL = 60  # seconds; bounds staleness from writes in other workers
+    CALENDAR_BUCKET_MAX_EVENTS = 2000  # busier months are streamed, not cached
+    CALENDAR_STREAM_BATCH = 500  # rows fetched per round trip
+    CALENDAR_DEFAULT_DAYS = 42  # window when a request omits start or end
+    CALENDAR_MAX_DAYS = 366
+    # Upcoming-events list on the landing page, cached per (days, department)
+    UPCOMING_CACHE_SIZE = 64
+    UPCOMING_CACHE_TTL = 30  # seconds a list is served before it is recomputed
+    UPCOMING_CACHE_STALE = 300  # seconds an expired list is served while it is refreshed
+
+    # Free-slot finder: hours of the day (0-23) new events may be scheduled in
+    SCHEDULING_DAY_START = 8
+    SCHEDULING_DAY_END = 22
+
+    # Event fliers (variants are rendered in the background, named by content hash)
+    FLIER_MAX_BYTES = 10 * 1024 * 1024
+    FLIER_MAX_PIXELS = 40_000_000  # rejects decompression bombs before decoding
+    # Largest request body accepted (a flier or roster CSV plus form fields); bigger ones get 413
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024
     
     # Flask-Mail Settings
     MAIL_SERVER = os.environ.get('MAIL_SERVER') or 'smtp.gmail.com'
@@ -28,6 +96,49 @@ class Config:
     MAIL_MAX_EMAILS = None
     MAIL_ASCII_ATTACHMENTS = False
 
+    # Rendered per-event email bodies (keyed on Event.updated_at)
+    EMAIL_TEMPLATE_CACHE_SIZE = 256
+    EMAIL_TEMPLATE_CACHE_TTL = 3600  # seconds
+
+    # Email outbox, delivered by a background thread in each worker
+    OUTBOX_WORKER_ENABLED = os.environ.get("OUTBOX_WORKER_ENABLED", "true").lower() in [
+        "true",
+        "on",
+        "1",
+    ]
+    OUTBOX_POLL_INTERVAL = 5  # seconds
+    OUTBOX_BATCH_SIZE = 100
+    OUTBOX_MAX_ATTEMPTS = 5
+    OUTBOX_RETRY_BASE_DELAY = 30  # seconds, doubled after each failure
+    OUTBOX_RETRY_MAX_DELAY = 3600
+
+    # Background tasks (announcements etc.) run on a per-worker thread pool
+    TASK_WORKERS = 4
+    TASKS_EAGER = False
+
+    # Event announcements
+    ANNOUNCEMENT_BATCH_SIZE = 100
+    ANNOUNCEMENT_MAX_EMAILS_PER_SECOND = 20
+    ANNOUNCEMENT_SWEEPER_ENABLED = os.environ.get(
+        "ANNOUNCEMENT_SWEEPER_ENABLED", "true"
+    ).lower() in ["true", "on", "1"]
+    ANNOUNCEMENT_SWEEP_INTERVAL = 60  # seconds between looks for stalled jobs
+    ANNOUNCEMENT_STALL_AFTER = 15 * 60  # seconds without progress before a job is requeued
+
+    # Event reminders, sent this many minutes before Event.start_time
+    REMINDER_OFFSETS = [24 * 60, 60]
+    REMINDER_LATE_GRACE = 60  # minutes after its moment a reminder may still go out
+    REMINDER_SCHEDULER_ENABLED = os.environ.get("REMINDER_SCHEDULER_ENABLED", "true").lower() in [
+        "true",
+        "on",
+        "1",
+    ]
+    REMINDER_INTERVAL = 60  # seconds between scans
+
+    # Weekly digest (flask digest send)
+    DIGEST_WINDOW_DAYS = 7
+    DIGEST_BATCH_SIZE = 500
+
 
 class DevelopmentConfig(Config):
     """Development configuration."""
@@ -47,6 +158,11 @@ class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
     WTF_CSRF_ENABLED = False
     LOGIN_DISABLED = False
+    OUTBOX_WORKER_ENABLED = False
+    REMINDER_SCHEDULER_ENABLED = False
+    ANNOUNCEMENT_SWEEPER_ENABLED = False
+    TASKS_EAGER = True
+    EVENT_TIMEZONE = "UTC"  # the suite builds event times from datetime.utcnow()
 
 
 class ProductionConfig(Config):
@@ -55,6 +171,7 @@ class ProductionConfig(Config):
     DEBUG = False
     TESTING = False
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL")
+    TRUSTED_PROXY_COUNT = int(os.environ.get("TRUSTED_PROXY_COUNT", 1))  # the Heroku router
 
     # Heroku Postgres fix for SQLAlchemy
     if SQLALCHEMY_DATABASE_URI and SQLALCHEMY_DATABASE_URI.startswith("postgres://"):
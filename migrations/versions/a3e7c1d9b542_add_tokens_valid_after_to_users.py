@@ -0,0 +1,26 @@
+"""Add tokens_valid_after to users
+
+Revision ID: a3e7c1d9b542
+Revises: f2c6a9d4b158
+Create Date: 2026-10-21 10:12:48.305117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3e7c1d9b542'
+down_revision = 'f2c6a9d4b158'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('tokens_valid_after', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('tokens_valid_after')
@@ -0,0 +1,46 @@
+"""Add recurring events and event_exceptions table
+
+Revision ID: a4c81e6f3d52
+Revises: f2c7a9d41b68
+Create Date: 2026-10-19 19:12:40.527311
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c81e6f3d52'
+down_revision = 'f2c7a9d41b68'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('recurrence_rule', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('recurrence_end', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_events_recurrence_end'), ['recurrence_end'], unique=False)
+
+    op.create_table(
+        'event_exceptions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('original_start', sa.DateTime(), nullable=False),
+        sa.Column('start_time', sa.DateTime(), nullable=True),
+        sa.Column('end_time', sa.DateTime(), nullable=True),
+        sa.Column('is_cancelled', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['event_id'], ['events.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('event_id', 'original_start', name='unique_event_exception')
+    )
+
+
+def downgrade():
+    op.drop_table('event_exceptions')
+
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_events_recurrence_end'))
+        batch_op.drop_column('recurrence_end')
+        batch_op.drop_column('recurrence_rule')
@@ -0,0 +1,28 @@
+"""Add resume point and heartbeat to announcement_jobs
+
+Revision ID: c5e19b7f2a04
+Revises: a4c81e6f3d52
+Create Date: 2026-10-20 09:41:12.204877
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e19b7f2a04'
+down_revision = 'a4c81e6f3d52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('announcement_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_recipient_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('announcement_jobs', schema=None) as batch_op:
+        batch_op.drop_column('heartbeat_at')
+        batch_op.drop_column('last_recipient_id')
@@ -0,0 +1,35 @@
+"""Add reminder_dispatches table
+
+Revision ID: d3a8f61c2e97
+Revises: b7d2e5a1c830
+Create Date: 2026-10-19 14:05:12.318270
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a8f61c2e97'
+down_revision = 'b7d2e5a1c830'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'reminder_dispatches',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('offset_minutes', sa.Integer(), nullable=False),
+        sa.Column('sent_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['event_id'], ['events.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('event_id', 'user_id', 'offset_minutes', name='unique_reminder_dispatch')
+    )
+
+
+def downgrade():
+    op.drop_table('reminder_dispatches')
@@ -0,0 +1,34 @@
+"""Add notification inbox indexes
+
+Revision ID: e61b0d4a9f35
+Revises: d3a8f61c2e97
+Create Date: 2026-10-19 15:32:48.904113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e61b0d4a9f35'
+down_revision = 'd3a8f61c2e97'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.create_index('ix_notifications_user_sent', ['user_id', 'sent_at', 'id'], unique=False)
+        batch_op.create_index(
+            'ix_notifications_unread',
+            ['user_id'],
+            unique=False,
+            postgresql_where=sa.text('is_read = false'),
+            sqlite_where=sa.text('is_read = 0')
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('ix_notifications_unread')
+        batch_op.drop_index('ix_notifications_user_sent')
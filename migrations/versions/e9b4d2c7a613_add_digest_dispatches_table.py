@@ -0,0 +1,33 @@
+"""Add digest_dispatches table
+
+Revision ID: e9b4d2c7a613
+Revises: c5e19b7f2a04
+Create Date: 2026-10-20 10:26:48.913402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9b4d2c7a613'
+down_revision = 'c5e19b7f2a04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'digest_dispatches',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('week_start', sa.Date(), nullable=False),
+        sa.Column('sent_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'week_start', name='unique_digest_dispatch')
+    )
+
+
+def downgrade():
+    op.drop_table('digest_dispatches')
@@ -0,0 +1,60 @@
+"""Add occurrence_attendance and key reminder_dispatches on the occurrence
+
+Revision ID: f2c6a9d4b158
+Revises: e9b4d2c7a613
+Create Date: 2026-10-20 14:05:37.618240
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c6a9d4b158'
+down_revision = 'e9b4d2c7a613'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'occurrence_attendance',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('occurrence_start', sa.DateTime(), nullable=False),
+        sa.Column('checked_in_at', sa.DateTime(), nullable=False),
+        sa.Column('check_in_method', sa.String(length=20), nullable=True),
+        sa.ForeignKeyConstraint(['event_id'], ['events.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint(
+            'event_id', 'user_id', 'occurrence_start', name='unique_occurrence_attendance'
+        )
+    )
+
+    # Existing reminders were all for single events (or a series' first occurrence)
+    with op.batch_alter_table('reminder_dispatches', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('occurrence_start', sa.DateTime(), nullable=True))
+    op.execute(
+        'UPDATE reminder_dispatches SET occurrence_start = '
+        '(SELECT start_time FROM events WHERE events.id = reminder_dispatches.event_id)'
+    )
+    with op.batch_alter_table('reminder_dispatches', schema=None) as batch_op:
+        batch_op.alter_column('occurrence_start', existing_type=sa.DateTime(), nullable=False)
+        batch_op.drop_constraint('unique_reminder_dispatch', type_='unique')
+        batch_op.create_unique_constraint(
+            'unique_reminder_dispatch',
+            ['event_id', 'occurrence_start', 'user_id', 'offset_minutes'],
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('reminder_dispatches', schema=None) as batch_op:
+        batch_op.drop_constraint('unique_reminder_dispatch', type_='unique')
+        batch_op.create_unique_constraint(
+            'unique_reminder_dispatch', ['event_id', 'user_id', 'offset_minutes']
+        )
+        batch_op.drop_column('occurrence_start')
+
+    op.drop_table('occurrence_attendance')
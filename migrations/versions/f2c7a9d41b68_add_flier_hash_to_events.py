@@ -0,0 +1,26 @@
+"""Add flier_hash to events
+
+Revision ID: f2c7a9d41b68
+Revises: e61b0d4a9f35
+Create Date: 2026-10-19 17:05:12.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c7a9d41b68'
+down_revision = 'e61b0d4a9f35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('flier_hash', sa.String(length=32), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_column('flier_hash')
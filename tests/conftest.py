@@ -1,15 +1,21 @@
+import socketserver
+import threading
 from datetime import datetime, timedelta
 
 import pytest
 
-from app import create_app, db
+from app import create_app, db, mail
 from app.models import Department, Event, User
+from app.recurrence import set_recurrence
+from app.storage import LocalStorage
 
 
 @pytest.fixture
-def app():
+def app(tmp_path):
     """Create application for testing."""
     app = create_app("testing")
+    app.config["MEDIA_ROOT"] = str(tmp_path / "media")
+    app.extensions["storage"] = LocalStorage(app.config["MEDIA_ROOT"])
     with app.app_context():
         db.create_all()
         yield app
@@ -107,6 +113,40 @@ def event(app, department, admin_user):
     return event
 
 
+@pytest.fixture
+def make_event(department, admin_user):
+    """Return a factory for one-hour events in the test department.
+
+    Events start tomorrow unless given a ``start`` or a ``starts_in`` offset
+    from now; a ``rule`` makes the event a recurring series.
+    """
+
+    def make_event(
+        title="Test Event",
+        start=None,
+        starts_in=timedelta(days=1),
+        hours=1,
+        rule=None,
+        department=department,
+        **fields,
+    ):
+        start = start or datetime.utcnow() + starts_in
+        event = Event(
+            title=title,
+            start_time=start,
+            end_time=start + timedelta(hours=hours),
+            department_id=department.id,
+            created_by=admin_user.id,
+            **fields,
+        )
+        set_recurrence(event, rule)
+        db.session.add(event)
+        db.session.commit()
+        return event
+
+    return make_event
+
+
 @pytest.fixture
 def authenticated_client(client, student_user):
     """Create authenticated client."""
@@ -138,3 +178,86 @@ def dept_admin_client(client, dept_admin_user):
             json={"email": "deptadmin@test.com", "password": "deptadmin123"},
         )
         yield client
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """Minimal in-process SMTP server standing in for the mail relay."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), LocalSMTPHandler)
+        self.messages = []
+        self.connections = 0
+        self.reject_recipients = set()
+
+
+class LocalSMTPHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough SMTP for smtplib."""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 localhost SMTP stand-in")
+        recipients = []
+
+        for raw in self.rfile:
+            command = raw.decode().strip()
+            verb = command[:4].upper()
+
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 localhost")
+            elif verb == "MAIL":
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                address = command.split(":", 1)[1].strip(" <>")
+                if address in self.server.reject_recipients:
+                    self.reply("550 Mailbox unavailable")
+                else:
+                    recipients.append(address)
+                    self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                for data_line in self.rfile:
+                    if data_line == b".\r\n":
+                        break
+                    lines.append(data_line)
+                self.server.messages.append(
+                    {"recipients": recipients, "data": b"".join(lines).decode()}
+                )
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+@pytest.fixture
+def smtp_server(app):
+    """Point Flask-Mail at a local SMTP stand-in."""
+    server = LocalSMTPServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    app.config.update(
+        MAIL_SERVER="127.0.0.1",
+        MAIL_PORT=server.server_address[1],
+        MAIL_USE_TLS=False,
+        MAIL_USE_SSL=False,
+        MAIL_USERNAME=None,
+        MAIL_PASSWORD=None,
+        MAIL_DEFAULT_SENDER="mulespace@test.com",
+        MAIL_SUPPRESS_SEND=False,
+    )
+    mail.init_app(app)
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
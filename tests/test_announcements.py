@@ -0,0 +1,338 @@
+"""Tests for department-wide event announcements."""
+
+from app import db
+from app.models import AnnouncementJob, Department, Notification, OutboxEmail, User
+
+
+def add_students(department, count, active=True):
+    db.session.add_all(
+        User(
+            email=f"member{i}@test.com",
+            username=f"member{i}",
+            first_name=f"Member{i}",
+            last_name="Student",
+            password_hash="x",
+            department_id=department.id,
+            is_active=active,
+        )
+        for i in range(count)
+    )
+    db.session.commit()
+
+
+class TestAnnouncements:
+    """Test the announcement endpoint and job."""
+
+    def test_announce_to_department(self, app, admin_client, event, department, smtp_server):
+        """Test every active member gets a notification and an email."""
+        app.config["ANNOUNCEMENT_BATCH_SIZE"] = 2
+        app.config["ANNOUNCEMENT_MAX_EMAILS_PER_SECOND"] = None
+        add_students(department, 3)
+        db.session.add(
+            User(
+                email="inactive@test.com",
+                username="inactive",
+                first_name="In",
+                last_name="Active",
+                password_hash="x",
+                department_id=department.id,
+                is_active=False,
+            )
+        )
+        db.session.commit()
+
+        response = admin_client.post(
+            f"/api/events/{event.id}/announcements",
+            json={"title": "Doors open early", "message": "Come at 5pm."},
+        )
+
+        assert response.status_code == 202
+        job_id = response.get_json()["job"]["id"]
+
+        status = admin_client.get(f"/api/events/{event.id}/announcements/{job_id}").get_json()
+        job = status["job"]
+        # admin_user plus three students; the inactive member is skipped
+        assert job["status"] == "completed"
+        assert job["total_recipients"] == 4
+        assert job["emails_sent"] == 4
+        assert job["emails_failed"] == 0
+        assert job["finished_at"] is not None
+
+        assert Notification.query.count() == 4
+        notification = Notification.query.filter_by(
+            user_id=User.query.filter_by(email="member0@test.com").one().id
+        ).one()
+        assert notification.title == "Doors open early"
+        assert notification.event_id == event.id
+        assert notification.notification_type == "event_alert"
+
+        assert smtp_server.connections == 2
+        assert len(smtp_server.messages) == 4
+        assert "Come at 5pm." in smtp_server.messages[0]["data"]
+
+    def test_refused_emails_go_to_outbox(self, app, admin_client, event, department, smtp_server):
+        """Test messages the relay refuses are queued for retry."""
+        app.config["ANNOUNCEMENT_MAX_EMAILS_PER_SECOND"] = None
+        add_students(department, 1)
+        smtp_server.reject_recipients.add("member0@test.com")
+
+        response = admin_client.post(
+            f"/api/events/{event.id}/announcements", json={"message": "Hello"}
+        )
+
+        job = db.session.get(AnnouncementJob, response.get_json()["job"]["id"])
+        assert job.title == "Announcement: Test Event"
+        assert (job.emails_sent, job.emails_failed) == (1, 1)
+        assert OutboxEmail.query.one().recipient == "member0@test.com"
+        registry = app.extensions["metrics"]
+        assert registry.value("email_sent_total", source="announcement") == 1
+        assert (
+            registry.value(
+                "email_send_failures_total",
+                source="announcement",
+                stage="send",
+                exception="SMTPRecipientsRefused",
+            )
+            == 1
+        )
+
+    def test_unreachable_relay_defers_whole_batch(self, app, admin_client, event, smtp_server):
+        """Test a connection failure queues the batch in the outbox."""
+        from app import mail
+
+        app.config["MAIL_PORT"] = 1
+        mail.init_app(app)
+
+        response = admin_client.post(
+            f"/api/events/{event.id}/announcements", json={"message": "Hello"}
+        )
+
+        job = response.get_json()["job"]
+        assert db.session.get(AnnouncementJob, job["id"]).emails_failed == 1
+        assert OutboxEmail.query.count() == 1
+        failures = app.extensions["metrics"].snapshot()["counters"]["email_send_failures_total"]
+        assert [(f["labels"]["source"], f["labels"]["stage"]) for f in failures] == [
+            ("announcement", "connect")
+        ]
+
+    def test_throttle_paces_batches(self, app, admin_client, event, smtp_server, monkeypatch):
+        """Test batches are paced to the configured send rate."""
+        import app.announcements as announcements
+
+        pauses = []
+        monkeypatch.setattr(announcements.time, "sleep", pauses.append)
+        app.config["ANNOUNCEMENT_MAX_EMAILS_PER_SECOND"] = 0.5
+
+        admin_client.post(f"/api/events/{event.id}/announcements", json={"message": "Hi"})
+
+        assert len(pauses) == 1
+        assert 1 < pauses[0] <= 2
+
+    def test_failed_job_records_error(self, app, admin_client, event, monkeypatch):
+        """Test an unexpected error marks the job failed."""
+        import app.announcements as announcements
+
+        def broken(*args, **kwargs):
+            raise RuntimeError("template missing")
+
+        monkeypatch.setattr(announcements, "render_event_email", broken)
+
+        response = admin_client.post(
+            f"/api/events/{event.id}/announcements", json={"message": "Hi"}
+        )
+
+        job = db.session.get(AnnouncementJob, response.get_json()["job"]["id"])
+        assert job.status == "failed"
+        assert job.error == "RuntimeError: template missing"
+
+    def test_admin_can_target_other_department(self, admin_client, event):
+        """Test admins may announce to another department."""
+        other = Department(name="Biology")
+        db.session.add(other)
+        db.session.commit()
+
+        response = admin_client.post(
+            f"/api/events/{event.id}/announcements",
+            json={"message": "Hi", "department_id": other.id},
+        )
+
+        job = response.get_json()["job"]
+        assert job["department_id"] == other.id
+        assert db.session.get(AnnouncementJob, job["id"]).total_recipients == 0
+
+    def test_announce_validation(self, admin_client, event):
+        """Test missing messages and unknown targets are rejected."""
+        assert (
+            admin_client.post(f"/api/events/{event.id}/announcements", json={}).status_code == 400
+        )
+        assert (
+            admin_client.post("/api/events/99999/announcements", json={"message": "x"}).status_code
+            == 404
+        )
+        response = admin_client.post(
+            f"/api/events/{event.id}/announcements",
+            json={"message": "x", "department_id": 99999},
+        )
+        assert response.status_code == 404
+
+    def test_title_and_department_validated(self, admin_client, event):
+        """Test oversized titles and non-integer departments are rejected up front."""
+        url = f"/api/events/{event.id}/announcements"
+
+        assert admin_client.post(url, json={"message": "x", "title": "t" * 201}).status_code == 400
+        assert admin_client.post(url, json={"message": "x", "title": ["t"]}).status_code == 400
+        assert admin_client.post(url, json={"message": ["x"]}).status_code == 400
+        response = admin_client.post(url, json={"message": "x", "department_id": "1"})
+        assert response.status_code == 400
+        assert AnnouncementJob.query.count() == 0
+
+    def test_default_title_fits_column(self, admin_client, event):
+        """Test the title made from a long event title is cut to the column length."""
+        event.title = "E" * 200
+        db.session.commit()
+
+        response = admin_client.post(f"/api/events/{event.id}/announcements", json={"message": "x"})
+
+        assert response.status_code == 202
+        assert len(response.get_json()["job"]["title"]) == 200
+
+    def test_dept_admin_other_department_forbidden(self, dept_admin_client, event):
+        """Test department admins can only announce their own events."""
+        other = Department(name="Physics")
+        db.session.add(other)
+        db.session.commit()
+        event.department_id = other.id
+        db.session.commit()
+
+        response = dept_admin_client.post(
+            f"/api/events/{event.id}/announcements", json={"message": "x"}
+        )
+        assert response.status_code == 403
+
+    def test_status_not_found_and_forbidden(self, dept_admin_client, event, admin_user):
+        """Test job lookups are scoped to the event and department."""
+        other = Department(name="Chemistry")
+        db.session.add(other)
+        db.session.commit()
+        job = AnnouncementJob(
+            event_id=event.id,
+            department_id=other.id,
+            created_by=admin_user.id,
+            title="t",
+            message="m",
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        assert dept_admin_client.get(f"/api/events/{event.id}/announcements/999").status_code == 404
+        assert dept_admin_client.get(f"/api/events/999/announcements/{job.id}").status_code == 404
+        response = dept_admin_client.get(f"/api/events/{event.id}/announcements/{job.id}")
+        assert response.status_code == 403
+
+    def test_students_cannot_announce(self, authenticated_client, event):
+        """Test students are rejected."""
+        response = authenticated_client.post(
+            f"/api/events/{event.id}/announcements", json={"message": "x"}
+        )
+        assert response.status_code == 403
+
+
+class TestStalledAnnouncements:
+    """Test jobs lost with their worker are requeued and resumed."""
+
+    def make_job(self, event, admin_user, **fields):
+        job = AnnouncementJob(
+            event_id=event.id,
+            department_id=event.department_id,
+            created_by=admin_user.id,
+            title="Doors open early",
+            message="Come at 5pm.",
+            **fields,
+        )
+        db.session.add(job)
+        db.session.commit()
+        return job
+
+    def test_running_job_resumes_after_last_recipient(
+        self, app, event, department, admin_user, smtp_server
+    ):
+        """Test a requeued job skips the notifications and emails it already sent."""
+        from datetime import datetime, timedelta
+
+        from app.announcements import requeue_stalled_announcements, run_announcement
+
+        app.config["ANNOUNCEMENT_MAX_EMAILS_PER_SECOND"] = None
+        add_students(department, 3)
+        members = User.query.order_by(User.id).all()  # admin_user, member0..member2
+        stale = datetime.utcnow() - timedelta(hours=1)
+        job = self.make_job(
+            event,
+            admin_user,
+            status="running",
+            total_recipients=4,
+            emails_sent=2,
+            last_recipient_id=members[1].id,
+            heartbeat_at=stale,
+        )
+
+        assert requeue_stalled_announcements() == 1
+
+        db.session.refresh(job)
+        assert job.status == "completed"
+        assert (job.emails_sent, job.total_recipients) == (4, 4)
+        assert Notification.query.count() == 0
+        assert sorted(m["recipients"] for m in smtp_server.messages) == [
+            ["member1@test.com"],
+            ["member2@test.com"],
+        ]
+        run_announcement(job.id)  # a duplicate submission of a finished job
+        assert len(smtp_server.messages) == 2
+
+    def test_live_job_not_run_twice(self, app, event, admin_user, smtp_server):
+        """Test a duplicate run of a job another worker is sending returns at once."""
+        from datetime import datetime
+
+        from app.announcements import run_announcement
+
+        job = self.make_job(event, admin_user, status="running", heartbeat_at=datetime.utcnow())
+
+        run_announcement(job.id)
+        run_announcement(9999)
+
+        db.session.refresh(job)
+        assert job.status == "running"
+        assert job.started_at is None
+        assert smtp_server.messages == []
+
+    def test_only_stale_unfinished_jobs_requeued(self, app, event, admin_user, monkeypatch):
+        """Test live and finished jobs are left alone, and each stalled job is claimed once."""
+        from datetime import datetime, timedelta
+
+        import app.announcements as announcements
+
+        submitted = []
+        monkeypatch.setattr(
+            announcements, "submit_task", lambda fn, job_id: submitted.append(job_id)
+        )
+        stale = datetime.utcnow() - timedelta(hours=1)
+        queued = self.make_job(event, admin_user, heartbeat_at=stale)
+        self.make_job(event, admin_user, status="running")  # fresh heartbeat
+        self.make_job(event, admin_user, status="completed", heartbeat_at=stale)
+        legacy = self.make_job(event, admin_user, status="running")
+        legacy.heartbeat_at, legacy.created_at = None, stale  # from before heartbeats
+        db.session.commit()
+
+        assert announcements.requeue_stalled_announcements() == 2
+        assert announcements.requeue_stalled_announcements() == 0
+        assert submitted == [queued.id, legacy.id]
+
+    def test_sweeper_tick(self, app, event, admin_user, monkeypatch):
+        """Test the periodic worker runs the sweep."""
+        import app.announcements as announcements
+
+        calls = []
+        monkeypatch.setattr(announcements, "requeue_stalled_announcements", lambda: calls.append(1))
+
+        announcements.AnnouncementSweeper(app).tick()
+
+        assert calls == [1]
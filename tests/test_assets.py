@@ -0,0 +1,139 @@
+"""Tests for fingerprinted, precompressed static assets."""
+
+import gzip
+import os
+import re
+
+import brotli
+import pytest
+from flask import url_for
+
+from app.assets import build_assets
+
+CSS = b"body { color: #333; }\n" * 200
+
+
+@pytest.fixture
+def static_dir(app, tmp_path):
+    """Point the app at a throwaway static folder holding one stylesheet."""
+    folder = tmp_path / "static"
+    (folder / "css").mkdir(parents=True)
+    (folder / "css" / "style.css").write_bytes(CSS)
+    (folder / "logo.png").write_bytes(b"\x89PNG fake")
+    app.static_folder = str(folder)
+    return folder
+
+
+def static_url(app, filename):
+    with app.test_request_context():
+        return url_for("static", filename=filename)
+
+
+class TestFingerprints:
+    """Test URL rewriting and caching headers."""
+
+    def test_url_carries_content_digest(self, app, static_dir):
+        """Test url_for('static') inserts a digest that follows the content."""
+        url = static_url(app, "css/style.css")
+        assert re.fullmatch(r"/static/css/style\.[0-9a-f]{12}\.css", url)
+
+        (static_dir / "css" / "style.css").write_bytes(CSS + b"p {}\n")
+        os.utime(static_dir / "css" / "style.css", ns=(1, 1))
+        assert static_url(app, "css/style.css") != url
+
+    def test_missing_file_left_alone(self, app, static_dir):
+        """Test unknown files keep their plain URL."""
+        assert static_url(app, "js/missing.js") == "/static/js/missing.js"
+
+    def test_fingerprinted_url_is_immutable(self, app, client, static_dir):
+        """Test the current fingerprint is cached forever."""
+        response = client.get(static_url(app, "css/style.css"))
+
+        assert response.status_code == 200
+        assert response.data == CSS
+        assert response.mimetype == "text/css"
+        assert "immutable" in response.headers["Cache-Control"]
+        assert response.cache_control.max_age == 31536000
+
+    def test_plain_and_stale_urls_revalidate(self, client, static_dir):
+        """Test unversioned and outdated URLs still work but are not immutable."""
+        plain = client.get("/static/css/style.css")
+        stale = client.get("/static/css/style.0123456789ab.css")
+
+        for response in (plain, stale):
+            assert response.status_code == 200
+            assert response.data == CSS
+            assert "immutable" not in response.headers.get("Cache-Control", "")
+
+    def test_missing_file_not_found(self, client, static_dir):
+        """Test missing files are 404s, fingerprinted or not."""
+        assert client.get("/static/css/nope.css").status_code == 404
+        assert client.get("/static/css/nope.0123456789ab.css").status_code == 404
+
+    def test_templates_use_fingerprints(self, client):
+        """Test the real pages link the fingerprinted stylesheet and script."""
+        html = client.get("/").get_data(as_text=True)
+
+        assert re.search(r'href="/static/css/style\.[0-9a-f]{12}\.css"', html)
+        assert re.search(r'src="/static/js/main\.[0-9a-f]{12}\.js"', html)
+
+
+class TestPrecompression:
+    """Test build-time variants and content negotiation."""
+
+    def test_build_writes_smaller_variants(self, static_dir):
+        """Test text assets get brotli and gzip copies and binaries are skipped."""
+        assert build_assets(str(static_dir)) == 1
+
+        assert brotli.decompress((static_dir / "css" / "style.css.br").read_bytes()) == CSS
+        assert gzip.decompress((static_dir / "css" / "style.css.gz").read_bytes()) == CSS
+        assert not (static_dir / "logo.png.gz").exists()
+        assert not (static_dir / "logo.png.br").exists()
+
+    def test_incompressible_variant_dropped(self, static_dir):
+        """Test a variant that would be larger than the original is not kept."""
+        (static_dir / "tiny.js").write_bytes(b"x")
+        (static_dir / "tiny.js.gz").write_bytes(b"stale")
+
+        build_assets(str(static_dir))
+
+        assert not (static_dir / "tiny.js.gz").exists()
+
+    def test_negotiated_by_accept_encoding(self, app, client, static_dir):
+        """Test brotli is preferred, then gzip, then identity."""
+        build_assets(str(static_dir))
+        url = static_url(app, "css/style.css")
+
+        compressed = client.get(url, headers={"Accept-Encoding": "br, gzip"})
+        gzipped = client.get(url, headers={"Accept-Encoding": "gzip"})
+        identity = client.get(url)
+
+        assert compressed.headers["Content-Encoding"] == "br"
+        assert compressed.mimetype == "text/css"
+        assert "immutable" in compressed.headers["Cache-Control"]
+        assert brotli.decompress(compressed.data) == CSS
+        assert gzipped.headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(gzipped.data) == CSS
+        assert "Content-Encoding" not in identity.headers
+        assert identity.data == CSS
+        for response in (compressed, gzipped, identity):
+            assert "Accept-Encoding" in response.headers["Vary"]
+
+    def test_stale_variant_ignored(self, client, static_dir):
+        """Test a variant older than its source is not served."""
+        build_assets(str(static_dir))
+        source = static_dir / "css" / "style.css"
+        gz = os.stat(str(source) + ".gz").st_mtime_ns
+        os.utime(source, ns=(gz + 10**9, gz + 10**9))
+
+        response = client.get("/static/css/style.css", headers={"Accept-Encoding": "gzip"})
+
+        assert "Content-Encoding" not in response.headers
+        assert response.data == CSS
+
+    def test_cli_build(self, app, runner, static_dir):
+        """Test the assets build command."""
+        result = runner.invoke(args=["assets", "build"])
+
+        assert result.exit_code == 0
+        assert "Compressed 1 assets." in result.output
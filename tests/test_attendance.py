@@ -235,8 +235,9 @@ class TestAttendanceRoutes:
         )
         assert response.status_code == 200
 
-    def test_check_in_form_public_endpoint(self, client, event, department, student_user):
+    def test_check_in_form_public_endpoint(self, app, client, event, department, student_user):
         """Test public check-in form endpoint - requires existing user."""
+        app.config["CHECKIN_ALLOW_UNSIGNED"] = True
         response = client.post(
             "/api/attendance/check-in-form",
             json={
@@ -315,8 +316,9 @@ class TestAttendanceRoutes:
         )
         assert response.status_code == 200
 
-    def test_check_in_form_with_existing_user(self, client, event, student_user, department):
+    def test_check_in_form_with_existing_user(self, app, client, event, student_user, department):
         """Test check-in form with existing user."""
+        app.config["CHECKIN_ALLOW_UNSIGNED"] = True
         response = client.post(
             "/api/attendance/check-in-form",
             json={
@@ -328,8 +330,9 @@ class TestAttendanceRoutes:
         )
         assert response.status_code in [200, 201]
 
-    def test_check_in_form_duplicate_checkin(self, client, event, student_user, department):
+    def test_check_in_form_duplicate_checkin(self, app, client, event, student_user, department):
         """Test check-in form with duplicate check-in."""
+        app.config["CHECKIN_ALLOW_UNSIGNED"] = True
         # First check-in
         client.post(
             "/api/attendance/check-in-form",
@@ -353,8 +356,9 @@ class TestAttendanceRoutes:
         )
         assert response.status_code in [400, 409]
 
-    def test_check_in_form_inactive_event(self, client, event, department):
+    def test_check_in_form_inactive_event(self, app, client, event, department):
         """Test check-in form with inactive event."""
+        app.config["CHECKIN_ALLOW_UNSIGNED"] = True
         from app import db
 
         event.is_active = False
@@ -371,8 +375,9 @@ class TestAttendanceRoutes:
         )
         assert response.status_code == 400
 
-    def test_check_in_form_nonexistent_event(self, client, department):
+    def test_check_in_form_nonexistent_event(self, app, client, department):
         """Test check-in form with non-existent event."""
+        app.config["CHECKIN_ALLOW_UNSIGNED"] = True
         response = client.post(
             "/api/attendance/check-in-form",
             json={
@@ -413,3 +418,187 @@ class TestAttendanceRoutes:
 
         response = dept_admin_client.get(f"/api/attendance/export/{other_event.id}")
         assert response.status_code == 403
+
+
+class TestSignedCheckIn:
+    """Test check-in form submissions carrying a signed QR code token."""
+
+    @staticmethod
+    def open_event(department, admin_user, starts_in=timedelta(minutes=-10)):
+        from app.models import Event
+
+        start = datetime.utcnow() + starts_in
+        event = Event(
+            title="Open Event",
+            start_time=start,
+            end_time=start + timedelta(hours=1),
+            department_id=department.id,
+            created_by=admin_user.id,
+        )
+        db.session.add(event)
+        db.session.commit()
+        return event
+
+    @staticmethod
+    def submit(client, department, **fields):
+        return client.post(
+            "/api/attendance/check-in-form",
+            json={
+                "full_name": "Test Student",
+                "email": "student@test.com",
+                "department_id": department.id,
+                **fields,
+            },
+        )
+
+    def test_checks_in_without_loading_the_event(
+        self, app, client, department, admin_user, student_user
+    ):
+        """Test a valid token is enough; the event is not loaded to validate it."""
+        from sqlalchemy import event as sa_event
+
+        from app.tokens import issue_checkin_token
+
+        event = self.open_event(department, admin_user)
+        token = issue_checkin_token(event)
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        sa_event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            response = self.submit(client, department, token=token)
+        finally:
+            sa_event.remove(db.engine, "before_cursor_execute", record)
+
+        assert response.status_code == 201
+        assert response.get_json()["attendance"]["event_id"] == event.id
+        insert = next(i for i, sql in enumerate(statements) if sql.startswith("INSERT"))
+        assert not any("FROM events" in sql for sql in statements[:insert])
+
+    def test_duplicate_rejected_by_constraint(self, client, department, admin_user, student_user):
+        """Test a second check-in with the same token is a conflict."""
+        from app.tokens import issue_checkin_token
+
+        token = issue_checkin_token(self.open_event(department, admin_user))
+
+        assert self.submit(client, department, token=token).status_code == 201
+        response = self.submit(client, department, token=token)
+        assert response.status_code == 409
+        assert Attendance.query.count() == 1
+
+    def test_window_enforced(self, client, department, admin_user, student_user):
+        """Test tokens are refused before check-in opens and after it closes."""
+        from app.tokens import issue_checkin_token
+
+        early = self.open_event(department, admin_user, starts_in=timedelta(days=1))
+        late = self.open_event(department, admin_user, starts_in=timedelta(hours=-4))
+
+        response = self.submit(client, department, token=issue_checkin_token(early))
+        assert response.status_code == 400
+        assert response.get_json()["error"] == "Check-in has not opened yet"
+        response = self.submit(client, department, token=issue_checkin_token(late))
+        assert response.status_code == 400
+        assert response.get_json()["error"] == "Check-in has closed"
+
+    def test_window_follows_campus_clock(self, app, client, department, admin_user, student_user):
+        """Test an event running now on a UTC-4 campus clock is open for check-in."""
+        from zoneinfo import ZoneInfo
+
+        from app.models import Event
+        from app.tokens import issue_checkin_token
+
+        app.config["EVENT_TIMEZONE"] = "Etc/GMT+4"  # UTC-4, without daylight saving
+        local_now = datetime.now(ZoneInfo("Etc/GMT+4")).replace(tzinfo=None)
+        running = Event(
+            title="Running Now",
+            start_time=local_now - timedelta(minutes=30),
+            end_time=local_now + timedelta(minutes=90),
+            department_id=department.id,
+            created_by=admin_user.id,
+        )
+        db.session.add(running)
+        db.session.commit()
+
+        response = self.submit(client, department, token=issue_checkin_token(running))
+
+        assert response.status_code == 201
+
+    def test_series_checked_in_per_occurrence(
+        self, app, client, department, admin_user, student_user
+    ):
+        """Test a weekly series' code checks in to the occurrence running now."""
+        from urllib.parse import parse_qs, urlsplit
+
+        from app.models import OccurrenceAttendance
+        from app.qrcodes import checkin_payload
+        from app.recurrence import set_recurrence
+
+        series = self.open_event(department, admin_user, starts_in=timedelta(days=-7, minutes=-10))
+        set_recurrence(series, "FREQ=WEEKLY")
+        db.session.commit()
+        token = parse_qs(urlsplit(checkin_payload(series)).query)["token"][0]
+
+        response = self.submit(client, department, token=token)
+
+        assert response.status_code == 201
+        attendance = response.get_json()["attendance"]
+        this_week = series.start_time + timedelta(weeks=1)
+        assert attendance["occurrence_start"] == this_week.isoformat()
+        assert self.submit(client, department, token=token).status_code == 409
+        assert OccurrenceAttendance.query.count() == 1
+        assert Attendance.query.count() == 0
+
+    def test_series_code_between_occurrences(self, client, department, admin_user, student_user):
+        """Test a series' code is refused between occurrences and after the last."""
+        from app.recurrence import set_recurrence
+        from app.tokens import issue_checkin_token
+
+        series = self.open_event(department, admin_user, starts_in=timedelta(days=-3))
+        set_recurrence(series, "FREQ=WEEKLY")
+        db.session.commit()
+        token = issue_checkin_token(series)
+
+        response = self.submit(client, department, token=token)
+        assert response.get_json()["error"] == "Check-in has not opened yet"
+
+        set_recurrence(series, "FREQ=WEEKLY;COUNT=1")
+        db.session.commit()
+        response = self.submit(client, department, token=token)
+        assert response.get_json()["error"] == "Check-in has closed"
+
+        series.is_active = False
+        db.session.commit()
+        response = self.submit(client, department, token=token)
+        assert response.get_json()["error"] == "Event is not active"
+
+        set_recurrence(series, None)
+        db.session.commit()
+        response = self.submit(client, department, token=token)
+        assert response.get_json()["error"] == "Invalid check-in code"
+
+    def test_expired_rotating_token_rejected(self, client, department, admin_user, student_user):
+        """Test a screenshot of a rotating code stops working after its slot."""
+        import time
+
+        from app.tokens import issue_checkin_token
+
+        event = self.open_event(department, admin_user)
+        stale = issue_checkin_token(event, rotation=60, now=time.time() - 180)
+        fresh = issue_checkin_token(event, rotation=60)
+
+        assert self.submit(client, department, token=stale).status_code == 400
+        assert self.submit(client, department, token=fresh).status_code == 201
+
+    def test_invalid_token_rejected(self, client, department, student_user):
+        """Test tampered tokens are rejected."""
+        response = self.submit(client, department, token="not-a-token")
+
+        assert response.status_code == 400
+        assert response.get_json()["error"] == "Invalid check-in code"
+
+    def test_unsigned_check_in_refused_by_default(self, client, event, department):
+        """Test bare event ids are refused unless older QR codes are allowed."""
+        assert self.submit(client, department, event_id=event.id).status_code == 400
+        assert self.submit(client, department).status_code == 400
@@ -0,0 +1,182 @@
+"""Tests for the in-process caches."""
+
+import threading
+
+import pytest
+
+from app.cache import FragmentCache, TTLCache
+
+
+class FakeTimer:
+    """Controllable clock for expiry tests."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache:
+    """Test the LRU/TTL cache."""
+
+    def test_get_missing_returns_default(self):
+        """Test missing keys return the default."""
+        cache = TTLCache()
+        assert cache.get("missing") is None
+        assert cache.get("missing", "fallback") == "fallback"
+
+    def test_set_and_get(self):
+        """Test stored values are returned."""
+        cache = TTLCache()
+        cache.set("key", "value")
+        assert cache.get("key") == "value"
+        assert "key" in cache
+        assert len(cache) == 1
+
+    def test_entries_expire(self):
+        """Test entries disappear after their TTL."""
+        timer = FakeTimer()
+        cache = TTLCache(ttl=10, timer=timer)
+        cache.set("key", "value")
+
+        timer.now = 9
+        assert cache.get("key") == "value"
+
+        timer.now = 10
+        assert cache.get("key") is None
+        assert len(cache) == 0
+
+    def test_per_entry_ttl_override(self):
+        """Test a per-entry TTL overrides the default."""
+        timer = FakeTimer()
+        cache = TTLCache(ttl=100, timer=timer)
+        cache.set("short", 1, ttl=1)
+
+        timer.now = 2
+        assert "short" not in cache
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted first."""
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_invalidate_and_clear(self):
+        """Test explicit invalidation."""
+        cache = TTLCache()
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        cache.invalidate("a")
+        cache.invalidate("never-set")
+        assert "a" not in cache
+        assert "b" in cache
+
+        cache.clear()
+        assert len(cache) == 0
+
+
+class TestFragmentCache:
+    """Test single-flight refreshes and stale-while-revalidate."""
+
+    def test_fresh_then_stale_then_expired(self):
+        """Test a value is reused while fresh and recomputed once it goes stale."""
+        timer = FakeTimer()
+        cache = FragmentCache(ttl=10, stale_ttl=20, timer=timer)
+        values = iter(["first", "second", "third"])
+
+        def compute():
+            return next(values)
+
+        assert cache.get_or_compute("key", compute) == "first"
+        timer.now = 9
+        assert cache.get_or_compute("key", compute) == "first"
+        assert "key" in cache
+
+        timer.now = 10
+        assert "key" not in cache
+        assert cache.get_or_compute("key", compute) == "second"
+
+        timer.now = 50  # past the stale window too
+        assert cache.get_or_compute("key", compute) == "third"
+
+    def test_stale_value_served_during_refresh(self):
+        """Test callers arriving mid-refresh get the stale value without computing."""
+        timer = FakeTimer()
+        cache = FragmentCache(ttl=10, timer=timer)
+        cache.get_or_compute("key", lambda: "old")
+        timer.now = 11
+        seen = []
+
+        def refresh():
+            seen.append(cache.get_or_compute("key", lambda: "never"))
+            return "new"
+
+        assert cache.get_or_compute("key", refresh) == "new"
+        assert seen == ["old"]
+        assert cache.get_or_compute("key", lambda: "never") == "new"
+
+    def test_concurrent_misses_compute_once(self):
+        """Test callers with nothing to serve wait for the one computation."""
+        cache = FragmentCache()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "value"
+
+        def get():
+            results.append(cache.get_or_compute("key", compute))
+
+        leader = threading.Thread(target=get)
+        leader.start()
+        started.wait(5)
+        waiters = [threading.Thread(target=get) for _ in range(4)]
+        for waiter in waiters:
+            waiter.start()
+        release.set()
+        for thread in [leader, *waiters]:
+            thread.join(5)
+
+        assert calls == [1]
+        assert results == ["value"] * 5
+
+    def test_failed_computation_is_retried(self):
+        """Test an error reaches its caller and the next caller computes again."""
+        cache = FragmentCache()
+
+        def fail():
+            raise RuntimeError("database down")
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_compute("key", fail)
+        assert cache.get_or_compute("key", lambda: "value") == "value"
+
+    def test_invalidation_during_computation(self):
+        """Test a value computed across an invalidation is not stored."""
+        cache = FragmentCache(maxsize=1)
+
+        def compute():
+            cache.invalidate("key")
+            return "outdated"
+
+        assert cache.get_or_compute("key", compute) == "outdated"
+        assert len(cache) == 0
+
+        cache.get_or_compute("a", lambda: 1)
+        cache.get_or_compute("b", lambda: 2)
+        assert "a" not in cache and "b" in cache
+        cache.clear()
+        assert len(cache) == 0
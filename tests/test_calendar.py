@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta
 
 from app import db
-from app.models import Event
+from app.models import Attendance, Event
 
 
 class TestCalendarRoutes:
@@ -122,6 +122,14 @@ class TestCalendarRoutes:
         data = response.get_json()
         assert "events" in data
 
+    def test_get_upcoming_events_days_out_of_range(self, client):
+        """Test a window that is empty or too far out to compute is rejected."""
+        for days in (0, -1, 367, 10**12):
+            response = client.get(f"/api/calendar/upcoming?days={days}")
+
+            assert response.status_code == 400
+            assert response.get_json()["error"] == "Days must be between 1 and 366"
+
     def test_get_upcoming_events_with_department_filter(self, client, event, department):
         """Test upcoming events filtered by department."""
         response = client.get(f"/api/calendar/upcoming?department_id={department.id}")
@@ -230,3 +238,646 @@ class TestCalendarRoutes:
         """Test removing event not in calendar."""
         response = authenticated_client.delete(f"/api/calendar/events/{event.id}")
         assert response.status_code == 404
+
+
+class TestICalFeeds:
+    """Test the .ics subscription feeds."""
+
+    def test_campus_feed(self, client, event):
+        """Test the feed is valid iCalendar with validators and caching headers."""
+        response = client.get("/api/calendar/feeds/campus.ics")
+
+        assert response.status_code == 200
+        assert response.mimetype == "text/calendar"
+        body = response.get_data(as_text=True)
+        assert body.startswith("BEGIN:VCALENDAR\r\nVERSION:2.0\r\n")
+        assert body.endswith("END:VCALENDAR\r\n")
+        assert f"UID:event-{event.id}@mulespace\r\n" in body
+        assert "SUMMARY:Test Event\r\n" in body
+        assert f"DTSTART:{event.start_time.strftime('%Y%m%dT%H%M%S')}\r\n" in body
+        assert "X-WR-TIMEZONE:UTC\r\n" in body
+        assert response.headers["ETag"]
+        assert response.headers["Last-Modified"]
+        assert response.cache_control.max_age == 300
+
+    def test_times_on_campus_clock(self, app, client, make_event):
+        """Test event times are floating wall-clock times in the campus zone."""
+        app.config["EVENT_TIMEZONE"] = "America/New_York"
+        event = make_event("Evening Talk")
+        event.start_time = datetime(2031, 7, 1, 18, 30)
+        event.end_time = datetime(2031, 7, 1, 20, 0)
+        db.session.commit()
+
+        body = client.get("/api/calendar/feeds/campus.ics").get_data(as_text=True)
+
+        assert "X-WR-TIMEZONE:America/New_York\r\n" in body
+        assert "DTSTART:20310701T183000\r\nDTEND:20310701T200000\r\n" in body
+        stamp = event.updated_at.strftime("%Y%m%dT%H%M%SZ")
+        assert f"DTSTAMP:{stamp}\r\n" in body
+
+    def test_series_with_rrule_and_exceptions(self, app, client, admin_client, make_event):
+        """Test a series is one VEVENT with its rule, EXDATEs and moved overrides."""
+        series = make_event(
+            "Lab", start=datetime(2031, 3, 3, 14), rule="FREQ=WEEKLY;UNTIL=20310331T235959Z"
+        )
+        url = f"/api/events/{series.id}/occurrences"
+
+        first = client.get("/api/calendar/feeds/campus.ics")
+        admin_client.delete(f"{url}/2031-03-10T14:00:00")
+        admin_client.put(
+            f"{url}/2031-03-17T14:00:00",
+            json={"start_time": "2031-03-18T09:00:00", "end_time": "2031-03-18T10:00:00"},
+        )
+        second = client.get("/api/calendar/feeds/campus.ics")
+
+        assert second.headers["ETag"] != first.headers["ETag"]
+        body = second.get_data(as_text=True)
+        assert body.count(f"UID:event-{series.id}@mulespace") == 2
+        assert "RRULE:FREQ=WEEKLY;UNTIL=20310331T235959\r\n" in body
+        assert "EXDATE:20310310T140000\r\n" in body
+        assert (
+            "RECURRENCE-ID:20310317T140000\r\n"
+            "DTSTART:20310318T090000\r\nDTEND:20310318T100000\r\n"
+        ) in body
+
+    def test_running_series_stays_in_feed(self, app, client, make_event):
+        """Test a series that began long ago is listed while it still has occurrences."""
+        make_event("Ongoing", starts_in=timedelta(days=-400), rule="FREQ=WEEKLY")
+        make_event("Ended", starts_in=timedelta(days=-400), rule="FREQ=WEEKLY;COUNT=3")
+
+        body = client.get("/api/calendar/feeds/campus.ics").get_data(as_text=True)
+
+        assert "SUMMARY:Ongoing" in body
+        assert "SUMMARY:Ended" not in body
+
+    def test_unchanged_poll_is_not_rendered(self, app, client, event, monkeypatch):
+        """Test a matching If-None-Match gets a 304 without loading any event."""
+        import app.routes.calendar as calendar_routes
+
+        etag = client.get("/api/calendar/feeds/campus.ics").headers["ETag"]
+        monkeypatch.setattr(calendar_routes, "render_feed", None)  # would fail if called
+
+        response = client.get("/api/calendar/feeds/campus.ics", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.data == b""
+        assert response.headers["ETag"] == etag
+
+    def test_if_modified_since(self, client, event):
+        """Test clients that only send If-Modified-Since are answered too."""
+        last_modified = client.get("/api/calendar/feeds/campus.ics").headers["Last-Modified"]
+
+        fresh = client.get(
+            "/api/calendar/feeds/campus.ics", headers={"If-Modified-Since": last_modified}
+        )
+        stale = client.get(
+            "/api/calendar/feeds/campus.ics",
+            headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"},
+        )
+
+        assert fresh.status_code == 304
+        assert stale.status_code == 200
+
+    def test_edits_and_cancellations_change_etag(self, client, event):
+        """Test editing or cancelling an event invalidates every poll."""
+        first = client.get("/api/calendar/feeds/campus.ics").headers["ETag"]
+
+        event.title = "Renamed Event"
+        db.session.commit()
+        renamed = client.get("/api/calendar/feeds/campus.ics")
+        assert renamed.headers["ETag"] != first
+        assert "SUMMARY:Renamed Event" in renamed.get_data(as_text=True)
+
+        event.is_active = False
+        db.session.commit()
+        cancelled = client.get("/api/calendar/feeds/campus.ics")
+        assert cancelled.headers["ETag"] != renamed.headers["ETag"]
+        assert "VEVENT" not in cancelled.get_data(as_text=True)
+
+    def test_vevents_cached_per_event(self, app, client, event, monkeypatch, make_event):
+        """Test only the edited event is rendered again."""
+        import app.ical as ical
+
+        other = make_event("Other Event")
+        client.get("/api/calendar/feeds/campus.ics")
+        assert len(app.extensions["ical_cache"]) == 2
+
+        rendered = []
+        real_line = ical._line
+        monkeypatch.setattr(
+            ical, "_line", lambda name, value: rendered.append(name) or real_line(name, value)
+        )
+        other.location = "Lovejoy 100"
+        db.session.commit()
+
+        body = client.get("/api/calendar/feeds/campus.ics").get_data(as_text=True)
+
+        assert rendered == ["X-WR-CALNAME", "SUMMARY", "LOCATION"]
+        assert "LOCATION:Lovejoy 100" in body
+
+    def test_department_feed(self, client, event, make_event):
+        """Test a department feed only lists that department's events."""
+        from app.models import Department
+
+        other = Department(name="Biology")
+        db.session.add(other)
+        db.session.commit()
+        make_event("Field Trip", department=other)
+
+        body = client.get(f"/api/calendar/feeds/departments/{other.id}.ics").get_data(as_text=True)
+
+        assert "SUMMARY:Field Trip" in body
+        assert "Test Event" not in body
+        assert "X-WR-CALNAME:MuleSpace: Biology" in body
+        assert client.get("/api/calendar/feeds/departments/9999.ics").status_code == 404
+
+    def test_personal_feed(self, app, authenticated_client, client, event, department, admin_user):
+        """Test the token URL lists registrations and changes as they do."""
+        from app.models import Attendance
+
+        feeds = authenticated_client.get("/api/calendar/feeds").get_json()["feeds"]
+        assert feeds["department"].endswith(f"/api/calendar/feeds/departments/{department.id}.ics")
+        path = feeds["personal"].replace("http://localhost", "")
+
+        empty = client.get(path)
+        assert empty.status_code == 200
+        assert "VEVENT" not in empty.get_data(as_text=True)
+        assert "private" in empty.headers["Cache-Control"]
+
+        authenticated_client.post("/api/calendar/events", json={"event_id": event.id})
+        registered = client.get(path, headers={"If-None-Match": empty.headers["ETag"]})
+        assert registered.status_code == 200
+        assert "SUMMARY:Test Event" in registered.get_data(as_text=True)
+
+        Attendance.query.delete()
+        db.session.commit()
+        removed = client.get(path, headers={"If-None-Match": registered.headers["ETag"]})
+        assert removed.status_code == 200
+        assert "VEVENT" not in removed.get_data(as_text=True)
+
+    def test_bad_token_not_found(self, client):
+        """Test tampered feed tokens are rejected."""
+        assert client.get("/api/calendar/feeds/users/forged.ics").status_code == 404
+
+    def test_old_events_drop_out(self, client, make_event):
+        """Test events that ended long ago are not in the feed."""
+        make_event("Last Year", starts_in=timedelta(days=-365))
+
+        body = client.get("/api/calendar/feeds/campus.ics").get_data(as_text=True)
+
+        assert "Last Year" not in body
+
+    def test_text_escaped_and_folded(self):
+        """Test RFC 5545 escaping and 75-octet folding, including multibyte text."""
+        from app.ical import _line
+
+        line = _line("DESCRIPTION", "Bring snacks; drinks, and\\or games\nSee you" + " é" * 60)
+
+        assert line.startswith(r"DESCRIPTION:Bring snacks\; drinks\, and\\or games\nSee you")
+        physical = line[:-2].split("\r\n")
+        assert len(physical) > 1
+        assert all(len(part.encode()) <= 75 for part in physical)
+        assert all(part.startswith(" ") for part in physical[1:])
+        assert "".join(part[1:] if i else part for i, part in enumerate(physical)).endswith(" é")
+
+
+def calendar_titles(client, query="start=2031-03-01T00:00:00Z&end=2031-05-01T00:00:00Z"):
+    response = client.get(f"/api/calendar?{query}")
+    assert response.status_code == 200
+    return [entry["title"] for entry in response.get_json()["events"]]
+
+
+class TestCalendarCache:
+    """Test the month-bucketed FullCalendar payload."""
+
+    def test_range_assembled_from_month_buckets(self, app, client, make_event):
+        """Test a range spanning months is filtered to its bounds from whole-month buckets."""
+        make_event("Before", start=datetime(2031, 3, 1, 9))
+        make_event("March", start=datetime(2031, 3, 20, 9))
+        make_event("April", start=datetime(2031, 4, 2, 9))
+        make_event("Overruns", start=datetime(2031, 4, 10, 23), hours=3)
+
+        titles = calendar_titles(client, "start=2031-03-10T00:00:00Z&end=2031-04-11T00:00:00Z")
+
+        assert titles == ["March", "April"]
+        cache = app.extensions["calendar_cache"]
+        assert (2031, 3, None) in cache and (2031, 4, None) in cache
+        assert [entry["title"] for _, _, entry in cache.get((2031, 3, None))] == [
+            "Before",
+            "March",
+        ]
+
+    def test_cached_months_served_without_queries(self, client, make_event):
+        """Test a repeat request does not touch the database."""
+        from sqlalchemy import event as sa_event
+
+        make_event("March", start=datetime(2031, 3, 20, 9))
+        first = client.get(
+            "/api/calendar?start=2031-03-01T00:00:00Z&end=2031-05-01T00:00:00Z"
+        ).get_json()
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        sa_event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            second = client.get(
+                "/api/calendar?start=2031-03-01T00:00:00Z&end=2031-05-01T00:00:00Z"
+            ).get_json()
+        finally:
+            sa_event.remove(db.engine, "before_cursor_execute", record)
+
+        assert second == first
+        assert not any("FROM events" in sql for sql in statements)
+
+    def test_bucket_loaded_in_one_query(self, client, department, make_event):
+        """Test department names are joined rather than loaded per event."""
+        from sqlalchemy import event as sa_event
+
+        for day in range(1, 6):
+            make_event(f"Day {day}", start=datetime(2031, 3, day, 9))
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        sa_event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            entries = client.get(
+                "/api/calendar?start=2031-03-01T00:00:00Z&end=2031-04-01T00:00:00Z"
+            ).get_json()["events"]
+        finally:
+            sa_event.remove(db.engine, "before_cursor_execute", record)
+
+        assert len(entries) == 5
+        assert {entry["department"] for entry in entries} == {"Computer Science"}
+        # Two months, each with one query for single events and one for series
+        assert len([sql for sql in statements if "FROM events" in sql]) == 4
+        assert not any("FROM departments" in sql and "JOIN" not in sql for sql in statements)
+
+    def test_create_update_delete_invalidate(self, client, make_event):
+        """Test every write to an event is visible on the next request."""
+        assert calendar_titles(client) == []
+
+        event = make_event("March", start=datetime(2031, 3, 20, 9))
+        assert calendar_titles(client) == ["March"]
+
+        event.title = "Renamed"
+        db.session.commit()
+        assert calendar_titles(client) == ["Renamed"]
+
+        event.is_active = False
+        db.session.commit()
+        assert calendar_titles(client) == []
+
+        event.is_active = True
+        db.session.commit()
+        db.session.delete(event)
+        db.session.commit()
+        assert calendar_titles(client) == []
+
+    def test_moving_event_invalidates_old_and_new_month(self, app, client, department, make_event):
+        """Test an event moved to another month leaves its old bucket."""
+        event = make_event("Moving", start=datetime(2031, 3, 20, 9))
+        query = f"start=2031-03-01T00:00:00Z&end=2031-05-01T00:00:00Z&department_id={department.id}"
+        assert calendar_titles(client, query) == ["Moving"]
+        assert calendar_titles(client) == ["Moving"]
+
+        event.start_time = datetime(2031, 4, 20, 9)
+        event.end_time = datetime(2031, 4, 20, 10)
+        db.session.commit()
+
+        cache = app.extensions["calendar_cache"]
+        assert (2031, 3, None) not in cache and (2031, 3, department.id) not in cache
+        response = client.get(f"/api/calendar?{query}")
+        assert [entry["start"] for entry in response.get_json()["events"]] == [
+            "2031-04-20T09:00:00"
+        ]
+
+    def test_department_buckets(self, app, client, department, make_event):
+        """Test department views only hold their own events and follow renames."""
+        from app.models import Department
+
+        other = Department(name="Biology")
+        db.session.add(other)
+        db.session.commit()
+        make_event("CS Talk", start=datetime(2031, 3, 20, 9))
+        make_event("Bio Talk", start=datetime(2031, 3, 21, 9), department=other)
+        query = "start=2031-03-01T00:00:00Z&end=2031-04-01T00:00:00Z"
+
+        assert calendar_titles(client, f"{query}&department_id={other.id}") == ["Bio Talk"]
+        assert calendar_titles(client, query) == ["CS Talk", "Bio Talk"]
+
+        other.name = "Life Sciences"
+        db.session.commit()
+        assert len(app.extensions["calendar_cache"]) == 0
+        response = client.get(f"/api/calendar?{query}&department_id={other.id}")
+        assert response.get_json()["events"][0]["department"] == "Life Sciences"
+
+    def test_rolled_back_changes_not_queued(self, app, department, make_event):
+        """Test a rollback discards the evictions queued by its flush."""
+        event = make_event("March", start=datetime(2031, 3, 20, 9))
+        event.title = "Draft"
+        db.session.flush()
+        assert db.session.info["stale_calendar_buckets"] == {
+            (2031, 3, None),
+            (2031, 3, department.id),
+        }
+
+        db.session.rollback()
+
+        assert "stale_calendar_buckets" not in db.session.info
+
+    def test_default_window(self, client, event, make_event):
+        """Test a request without dates covers the coming weeks rather than all time."""
+        make_event("Long Ago", start=datetime(2001, 3, 20, 9))
+        make_event("Far Off", start=datetime.utcnow() + timedelta(days=90))
+
+        assert calendar_titles(client, "") == ["Test Event"]
+        assert calendar_titles(client, "end=2001-04-01T00:00:00Z") == ["Long Ago"]
+        assert calendar_titles(client, "start=2001-03-01T00:00:00Z") == ["Long Ago"]
+
+    def test_window_limits(self, client):
+        """Test inverted and overlong ranges are rejected."""
+        inverted = client.get("/api/calendar?start=2031-04-01T00:00:00&end=2031-03-01T00:00:00")
+        overlong = client.get("/api/calendar?start=2031-01-01T00:00:00&end=2033-01-01T00:00:00")
+
+        assert inverted.status_code == 400
+        assert overlong.status_code == 400
+        assert "366 days" in overlong.get_json()["error"]
+
+    def test_busy_months_not_cached(self, app, client, make_event):
+        """Test a month over CALENDAR_BUCKET_MAX_EVENTS is streamed but not kept."""
+        app.config["CALENDAR_BUCKET_MAX_EVENTS"] = 2
+        for day in (1, 2, 3):
+            make_event(f"March {day}", start=datetime(2031, 3, day, 9))
+        make_event("April", start=datetime(2031, 4, 2, 9))
+
+        assert len(calendar_titles(client)) == 4
+        cache = app.extensions["calendar_cache"]
+        assert (2031, 3, None) not in cache and (2031, 4, None) in cache
+
+    def test_response_streamed_with_flat_memory(self, app, client, department, admin_user):
+        """Test peak memory does not grow with the number of events in the range."""
+        import tracemalloc
+
+        from sqlalchemy import insert
+
+        first = datetime(2031, 1, 1)
+        db.session.execute(
+            insert(Event),
+            [
+                {
+                    "title": f"Event {i}",
+                    "start_time": first + timedelta(minutes=10 * i),
+                    "end_time": first + timedelta(minutes=10 * i + 5),
+                    "department_id": department.id,
+                    "created_by": admin_user.id,
+                }
+                for i in range(50_000)
+            ],
+        )
+        db.session.commit()
+        db.session.expunge_all()
+
+        def peak_while_streaming(end):
+            tracemalloc.start()
+            try:
+                response = client.get(
+                    f"/api/calendar?start=2031-01-01T00:00:00&end={end}", buffered=False
+                )
+                size = sum(len(chunk) for chunk in response.response)
+                response.close()
+                return size, tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        small_size, small_peak = peak_while_streaming("2031-01-02T00:00:00")  # 144 events
+        large_size, large_peak = peak_while_streaming("2031-12-31T00:00:00")  # 50,000 events
+
+        assert large_size > 100 * small_size
+        assert large_peak < 2 * small_peak + 512 * 1024
+        assert (2031, 1, None) not in app.extensions["calendar_cache"]
+
+
+class TestRecurringEvents:
+    """Test recurring series in the calendar, upcoming and conflict views."""
+
+    def test_calendar_expands_series(self, app, client, department, make_event):
+        """Test occurrences are listed within the window, merged with single events."""
+        series = make_event(
+            "Office Hours", start=datetime(2031, 3, 3, 15), rule="FREQ=WEEKLY;BYDAY=MO"
+        )
+        make_event("Talk", start=datetime(2031, 3, 4, 12))
+
+        response = client.get("/api/calendar?start=2031-03-01T00:00:00&end=2031-03-15T00:00:00")
+        entries = response.get_json()["events"]
+
+        assert [(entry["title"], entry["start"]) for entry in entries] == [
+            ("Office Hours", "2031-03-03T15:00:00"),
+            ("Talk", "2031-03-04T12:00:00"),
+            ("Office Hours", "2031-03-10T15:00:00"),
+        ]
+        assert entries[0]["groupId"] == series.id and "groupId" not in entries[1]
+        assert entries[0]["department"] == "Computer Science"
+
+    def test_exceptions_change_cached_buckets(self, admin_client, make_event):
+        """Test cancelling or moving an occurrence shows on the next calendar request."""
+        series = make_event("Office Hours", start=datetime(2031, 3, 3, 15), rule="FREQ=WEEKLY")
+        url = "/api/calendar?start=2031-03-01T00:00:00&end=2031-04-01T00:00:00"
+        assert len(admin_client.get(url).get_json()["events"]) == 5
+
+        admin_client.delete(f"/api/events/{series.id}/occurrences/2031-03-10T15:00:00")
+        admin_client.put(
+            f"/api/events/{series.id}/occurrences/2031-03-17T15:00:00",
+            json={"start_time": "2031-03-18T09:00:00", "end_time": "2031-03-18T10:00:00"},
+        )
+
+        starts = [entry["start"] for entry in admin_client.get(url).get_json()["events"]]
+        assert starts == [
+            "2031-03-03T15:00:00",
+            "2031-03-18T09:00:00",
+            "2031-03-24T15:00:00",
+            "2031-03-31T15:00:00",
+        ]
+
+    def test_series_edit_clears_buckets(self, app, client, make_event):
+        """Test a series change drops every month it may appear in."""
+        series = make_event("Office Hours", start=datetime(2031, 3, 3, 15), rule="FREQ=DAILY")
+        client.get("/api/calendar?start=2031-05-01T00:00:00&end=2031-06-01T00:00:00").get_json()
+        assert len(app.extensions["calendar_cache"]) == 2
+
+        series.title = "Moved Office Hours"
+        db.session.commit()
+
+        assert len(app.extensions["calendar_cache"]) == 0
+
+    def test_upcoming_includes_occurrences(self, client, make_event):
+        """Test the next occurrences of a series that started long ago are upcoming."""
+        now = datetime.utcnow().replace(microsecond=0)
+        make_event("Office Hours", start=now - timedelta(days=400, hours=1), rule="FREQ=DAILY")
+        make_event("Talk", start=now + timedelta(days=1, minutes=30))
+
+        data = client.get("/api/calendar/upcoming?days=3").get_json()
+
+        assert data["count"] == 4
+        assert [event["title"] for event in data["events"]] == [
+            "Office Hours",  # one started an hour ago, so the next is in 23 hours
+            "Talk",
+            "Office Hours",
+            "Office Hours",
+        ]
+        assert data["events"][0]["occurrence_start"]
+        assert data["events"][0]["recurrence_rule"] == "FREQ=DAILY"
+
+    def test_conflicts_with_occurrences(self, client, make_event):
+        """Test an occurrence conflicts, but not with the series itself."""
+        series = make_event("Office Hours", start=datetime(2031, 3, 3, 15), rule="FREQ=WEEKLY")
+        payload = {"start_time": "2031-04-14T15:30:00Z", "end_time": "2031-04-14T16:30:00Z"}
+
+        data = client.post("/api/calendar/conflicts", json=payload).get_json()
+        edited = client.post(
+            "/api/calendar/conflicts", json={**payload, "event_id": series.id}
+        ).get_json()
+
+        assert data["conflict_count"] == 1
+        assert data["conflicts"][0]["date"] == "2031-04-14"
+        assert data["conflicts"][0]["start_time"] == "15:00:00"
+        assert edited["has_conflicts"] is False
+
+
+class TestMyCalendar:
+    """Test the registered-events listing, statistics and dashboard."""
+
+    def register(self, user, *events):
+        db.session.add_all([Attendance(event_id=event.id, user_id=user.id) for event in events])
+        db.session.commit()
+
+    def test_events_and_statistics(
+        self, authenticated_client, admin_user, student_user, make_event
+    ):
+        """Test inactive events are hidden but counted, and past events are not upcoming."""
+        later = make_event("Later", starts_in=timedelta(days=3))
+        sooner = make_event("Sooner", starts_in=timedelta(days=1))
+        past = make_event("Past", starts_in=timedelta(days=-2))
+        hidden = make_event("Hidden", is_active=False)
+        make_event("Unregistered")
+        self.register(student_user, later, sooner, past, hidden)
+        self.register(admin_user, later)
+
+        events = authenticated_client.get("/api/calendar/events").get_json()["events"]
+        statistics = authenticated_client.get("/api/calendar/statistics").get_json()
+
+        assert [event["title"] for event in events] == ["Past", "Sooner", "Later"]
+        assert events[2] == later.to_dict()
+        assert events[2]["registered_count"] == 2
+        assert events[2]["department_name"] == "Computer Science"
+        assert statistics == {"total_events": 4, "upcoming_events": 2, "total_points": 0}
+
+    def test_dashboard_in_three_queries(self, authenticated_client, student_user, make_event):
+        """Test the dashboard reads statistics, events and series with one query each."""
+        from sqlalchemy import event as sa_event
+
+        events = [make_event(f"Event {i}", starts_in=timedelta(days=i)) for i in range(-1, 8)]
+        self.register(student_user, *events)
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        sa_event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            response = authenticated_client.get("/api/calendar/dashboard?limit=3")
+            data = response.get_json()
+        finally:
+            sa_event.remove(db.engine, "before_cursor_execute", record)
+
+        assert response.status_code == 200
+        assert data["statistics"]["total_events"] == 9
+        assert data["statistics"]["upcoming_events"] == 7  # "Event 0" started as it was made
+        assert [event["title"] for event in data["events"]] == ["Event 1", "Event 2", "Event 3"]
+        assert len([sql for sql in statements if "attendance" in sql.lower()]) == 3
+
+    def test_dashboard_lists_series_occurrences(
+        self, authenticated_client, student_user, make_event
+    ):
+        """Test a weekly series stays on the dashboard after its first occurrence."""
+        weekly = make_event("Weekly", starts_in=timedelta(days=-8), rule="FREQ=WEEKLY")
+        finished = make_event("Finished", starts_in=timedelta(days=-15), rule="FREQ=DAILY;COUNT=2")
+        single = make_event("Single", starts_in=timedelta(days=2))
+        self.register(student_user, weekly, finished, single)
+
+        data = authenticated_client.get("/api/calendar/dashboard?limit=3").get_json()
+
+        assert [event["title"] for event in data["events"]] == ["Single", "Weekly", "Weekly"]
+        next_start = weekly.start_time + timedelta(weeks=2)
+        assert data["events"][1]["occurrence_start"] == next_start.isoformat()
+        assert data["statistics"]["upcoming_events"] == 2
+
+    def test_dashboard_on_campus_clock(self, app, authenticated_client, student_user, make_event):
+        """Test "upcoming" is judged against the campus wall clock, not UTC."""
+        app.config["EVENT_TIMEZONE"] = "Etc/GMT+4"  # UTC-4, no daylight saving
+        soon = make_event("Soon", starts_in=timedelta(hours=-2))
+        gone = make_event("Gone", starts_in=timedelta(hours=-5))
+        self.register(student_user, soon, gone)
+
+        data = authenticated_client.get("/api/calendar/dashboard").get_json()
+
+        assert [event["title"] for event in data["events"]] == ["Soon"]
+        assert data["statistics"]["upcoming_events"] == 1
+
+    def test_dashboard_limit(self, authenticated_client):
+        """Test the dashboard limit must be positive."""
+        assert authenticated_client.get("/api/calendar/dashboard?limit=0").status_code == 400
+
+
+class TestUpcomingCache:
+    """Test the landing page's upcoming-events list is cached and invalidated."""
+
+    def upcoming_titles(self, client, query="days=14"):
+        response = client.get(f"/api/calendar/upcoming?{query}")
+        assert response.status_code == 200
+        return [event["title"] for event in response.get_json()["events"]]
+
+    def test_cached_per_days_and_department(self, app, client, department, make_event):
+        """Test repeat requests are served without querying, keyed on their filters."""
+        from sqlalchemy import event as sa_event
+
+        make_event("Soon", starts_in=timedelta(days=2))
+        make_event("Later", starts_in=timedelta(days=10))
+        assert self.upcoming_titles(client) == ["Soon", "Later"]
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        sa_event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            assert self.upcoming_titles(client) == ["Soon", "Later"]
+        finally:
+            sa_event.remove(db.engine, "before_cursor_execute", record)
+
+        assert statements == []
+        assert self.upcoming_titles(client, "days=5") == ["Soon"]
+        assert self.upcoming_titles(client, f"days=5&department_id={department.id + 1}") == []
+        cache = app.extensions["upcoming_cache"]
+        assert (14, None) in cache and (5, None) in cache and (5, department.id + 1) in cache
+
+    def test_event_writes_invalidate(self, client, department, make_event):
+        """Test creating, moving and deleting events drop the cached lists."""
+        soon = make_event("Soon", starts_in=timedelta(days=2))
+        assert self.upcoming_titles(client) == ["Soon"]
+
+        make_event("New", starts_in=timedelta(days=1))
+        assert self.upcoming_titles(client) == ["New", "Soon"]
+
+        soon.start_time += timedelta(days=30)
+        soon.end_time += timedelta(days=30)
+        db.session.commit()
+        assert self.upcoming_titles(client) == ["New"]
+
+        department.name = "Renamed"
+        db.session.commit()
+        response = client.get("/api/calendar/upcoming?days=14")
+        assert response.get_json()["events"][0]["department_name"] == "Renamed"
@@ -23,10 +23,10 @@ class TestBaseConfig:
         assert hasattr(Config, "ITEMS_PER_PAGE")
         assert Config.ITEMS_PER_PAGE == 20
 
-    def test_base_config_qr_code_dir(self):
-        """Test base config QR code directory."""
-        assert hasattr(Config, "QR_CODE_DIR")
-        assert "qrcodes" in Config.QR_CODE_DIR
+    def test_base_config_media_root(self):
+        """Test base config media storage directory is absolute."""
+        assert hasattr(Config, "MEDIA_ROOT")
+        assert os.path.isabs(Config.MEDIA_ROOT)
 
     def test_base_config_mail_settings(self):
         """Test base config mail settings."""
@@ -0,0 +1,183 @@
+import json
+import random
+from datetime import datetime, timedelta
+
+from app import db
+from app.conflicts import Interval, conflict_report, overlapping_pairs
+from app.models import Department
+
+
+def interval(event_id, start_hour, hours=1, location=None, department_id=1):
+    start = datetime(2031, 3, 3) + timedelta(hours=start_hour)
+    return Interval(
+        event_id,
+        f"Event {event_id}",
+        location,
+        department_id,
+        start,
+        start + timedelta(hours=hours),
+    )
+
+
+def brute_force(intervals):
+    return {
+        (a.event_id, b.event_id)
+        for i, a in enumerate(intervals)
+        for b in intervals[i + 1 :]
+        if a.start_time < b.end_time and b.start_time < a.end_time
+    }
+
+
+def report_lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+class TestOverlappingPairs:
+    """Test the sort-and-sweep pair finder."""
+
+    def test_matches_brute_force(self):
+        """Test random intervals give exactly the pairs an all-pairs check does."""
+        rng = random.Random(48)
+        intervals = sorted(
+            (interval(i, rng.randrange(0, 200), rng.choice([1, 2, 5, 12])) for i in range(300)),
+            key=lambda iv: (iv.start_time, iv.event_id),
+        )
+
+        pairs = {(a.event_id, b.event_id) for a, b in overlapping_pairs(intervals)}
+
+        assert pairs == brute_force(intervals)
+
+    def test_touching_intervals_do_not_overlap(self):
+        """Test an event ending as another starts is not a conflict."""
+        intervals = [interval(1, 9), interval(2, 10), interval(3, 10, hours=2), interval(4, 11)]
+
+        pairs = [(a.event_id, b.event_id) for a, b in overlapping_pairs(intervals)]
+
+        assert pairs == [(2, 3), (3, 4)]
+
+    def test_numpy_matches_python(self, monkeypatch):
+        """Test the vectorized sweep finds the same pairs, in the same order."""
+        import app.conflicts as conflicts
+
+        rng = random.Random(7)
+        intervals = sorted(
+            (interval(i, rng.randrange(0, 2000), rng.choice([1, 3, 8])) for i in range(3000)),
+            key=lambda iv: (iv.start_time, iv.event_id),
+        )
+        monkeypatch.setattr(conflicts, "CHUNK_SIZE", 500)
+
+        assert list(conflicts._pair_indexes_numpy(intervals)) == list(
+            conflicts._pair_indexes(intervals)
+        )
+
+    def test_large_sets_vectorized(self, monkeypatch):
+        """Test sets at the threshold go through NumPy and match brute force."""
+        import app.conflicts as conflicts
+
+        rng = random.Random(11)
+        intervals = sorted(
+            (interval(i, rng.randrange(0, 100), rng.choice([1, 4])) for i in range(200)),
+            key=lambda iv: (iv.start_time, iv.event_id),
+        )
+        monkeypatch.setattr(conflicts, "VECTORIZE_THRESHOLD", 200)
+        monkeypatch.setattr(conflicts, "_pair_indexes", None)  # would fail if called
+
+        pairs = {(a.event_id, b.event_id) for a, b in overlapping_pairs(intervals)}
+
+        assert pairs == brute_force(intervals)
+
+
+class TestConflictReport:
+    """Test pairs are grouped by location, then department."""
+
+    def test_groups(self):
+        """Test each pair is reported once, under the closest shared group."""
+        intervals = [
+            interval(1, 9, hours=3, location="Lovejoy 100", department_id=1),
+            interval(2, 10, location="lovejoy 100 ", department_id=2),
+            interval(3, 10, location="Olin 1", department_id=1),
+            interval(4, 11, location=None, department_id=3),
+        ]
+
+        report = [
+            (group, key, a.event_id, b.event_id) for group, key, a, b in conflict_report(intervals)
+        ]
+        everything = list(conflict_report(intervals, include_unrelated=True))
+
+        assert report == [("location", "Lovejoy 100", 1, 2), ("department", 1, 1, 3)]
+        assert [(group, a.event_id, b.event_id) for group, _, a, b in everything[2:]] == [
+            ("campus", 1, 4),
+            ("campus", 2, 3),
+        ]
+
+
+class TestConflictReportRoute:
+    """Test the streamed report endpoint and CLI."""
+
+    url = "/api/calendar/conflicts/report?start=2031-03-01T00:00:00&end=2031-04-01T00:00:00"
+
+    def test_report_streamed_as_json_lines(self, admin_client, department, make_event):
+        """Test pairs, including recurring occurrences, are streamed with a summary."""
+        make_event("Talk", start=datetime(2031, 3, 3, 9), hours=2, location="Lovejoy 100")
+        make_event(
+            "Club", start=datetime(2031, 3, 3, 10), location="Lovejoy 100", rule="FREQ=DAILY"
+        )
+        make_event("Lab", start=datetime(2031, 3, 4, 10), location="Olin 1")
+
+        response = admin_client.get(self.url)
+        lines = report_lines(response)
+
+        assert response.mimetype == "application/x-ndjson"
+        assert lines[0]["group"] == "location"
+        assert lines[0]["key"] == "Lovejoy 100"
+        assert [event["title"] for event in lines[0]["events"]] == ["Talk", "Club"]
+        assert lines[0]["overlap_start"] == "2031-03-03T10:00:00"
+        assert lines[0]["overlap_end"] == "2031-03-03T11:00:00"
+        assert lines[1]["group"] == "department"
+        assert lines[1]["key"] == "Computer Science"
+        assert [event["title"] for event in lines[1]["events"]] == ["Club", "Lab"]
+        assert lines[-1]["summary"] == {
+            "events": 31,
+            "conflicts": {"location": 1, "department": 1, "campus": 0},
+        }
+
+    def test_department_admin_sees_own_department(self, dept_admin_client, department, make_event):
+        """Test a department admin's report is limited to their department."""
+        other = Department(name="Biology")
+        db.session.add(other)
+        db.session.commit()
+        make_event("Bio 1", start=datetime(2031, 3, 3, 9), location="Olin 1", department=other)
+        make_event("Bio 2", start=datetime(2031, 3, 3, 9), location="Olin 1", department=other)
+
+        response = dept_admin_client.get(f"{self.url}&department_id={other.id}")
+
+        assert report_lines(response) == [
+            {"summary": {"events": 0, "conflicts": {"location": 0, "department": 0, "campus": 0}}}
+        ]
+
+    def test_report_errors(self, admin_client):
+        """Test bad ranges are rejected."""
+        base = "/api/calendar/conflicts/report"
+        assert admin_client.get(f"{base}?start=tomorrow").status_code == 400
+        assert admin_client.get(f"{base}?start=2031-03-01&end=2030-01-01").status_code == 400
+
+    def test_students_refused(self, authenticated_client):
+        """Test students cannot run the report."""
+        assert authenticated_client.get(self.url).status_code == 403
+
+    def test_cli(self, app, runner, department, make_event):
+        """Test the CLI writes the same report."""
+        make_event("Talk", start=datetime(2031, 3, 3, 9), location="Lovejoy 100")
+        make_event("Other Talk", start=datetime(2031, 3, 3, 9), location="Olin 1")
+
+        result = runner.invoke(
+            args=["calendar", "conflicts", "--start", "2031-03-01", "--end", "2031-04-01", "--all"]
+        )
+        bad = runner.invoke(
+            args=["calendar", "conflicts", "--start", "2031-03-01", "--end", "2030-01-01"]
+        )
+
+        assert result.exit_code == 0
+        lines = [json.loads(line) for line in result.output.splitlines()]
+        assert [line.get("group") for line in lines] == ["department", None]
+        assert bad.exit_code != 0
@@ -76,7 +76,7 @@ class TestAdditionalCoverage:
 
     def test_calendar_get_department_color_edge_case(self, client, app):
         """Test department color function with large department ID."""
-        from app.routes.calendar import get_department_color
+        from app.calendar_cache import get_department_color
 
         with app.app_context():
             # Test wrapping behavior
@@ -268,7 +268,7 @@ class TestAdditionalCoverage:
         )
         assert response.status_code == 200
 
-    def test_utils_generate_qr_code_creates_dir(self, app):
+    def test_utils_generate_qr_code_creates_dir(self, app, event):
         """Test QR code generation creates directory if needed."""
         import os
         import shutil
@@ -277,12 +277,12 @@ class TestAdditionalCoverage:
 
         with app.app_context():
             # Remove qrcodes directory if exists
-            qr_dir = os.path.join("app", "static", "qrcodes")
+            qr_dir = os.path.join(app.config["MEDIA_ROOT"], "qrcodes")
             if os.path.exists(qr_dir):
                 shutil.rmtree(qr_dir)
 
             # Generate QR code (should create directory)
-            result = generate_qr_code(999)
+            result = generate_qr_code(event)
             assert result is not None
             assert os.path.exists(qr_dir)
 
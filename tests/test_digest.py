@@ -0,0 +1,232 @@
+"""Tests for the weekly digest email."""
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event as sa_event
+from sqlalchemy import insert
+
+from app import db
+from app.digest import send_weekly_digest
+from app.models import Attendance, Department, DigestDispatch, Event, OutboxEmail, User
+
+
+class TestWeeklyDigest:
+    """Test digest contents and delivery."""
+
+    def test_lists_department_and_registered_events(
+        self, app, department, student_user, make_event
+    ):
+        """Test a student sees department events plus registrations elsewhere."""
+        other = Department(name="Biology")
+        db.session.add(other)
+        db.session.commit()
+        talk = make_event("CS Talk", starts_in=timedelta(days=2), location="Diamond 142")
+        make_event("Hackathon", starts_in=timedelta(days=1))
+        field_trip = make_event("Field Trip", starts_in=timedelta(days=3), department=other)
+        make_event("Lab Night", starts_in=timedelta(days=4), department=other)
+        make_event("Next Month", starts_in=timedelta(days=30))
+        make_event("Cancelled", starts_in=timedelta(days=2), is_active=False)
+        db.session.add_all(
+            [
+                Attendance(event_id=talk.id, user_id=student_user.id),
+                Attendance(event_id=field_trip.id, user_id=student_user.id),
+            ]
+        )
+        db.session.commit()
+
+        assert send_weekly_digest() == 1
+
+        email = OutboxEmail.query.one()
+        assert email.recipient == "student@test.com"
+        assert email.subject == "Your week on MuleSpace"
+        body = email.text_body
+        assert body.startswith("Hi Test,")
+        assert body.index("Hackathon") < body.index("CS Talk") < body.index("Field Trip")
+        assert "CS Talk (you're registered)" in body
+        assert "    Diamond 142 · Computer Science\n" in body
+        assert "Hackathon (you're registered)" not in body
+        for absent in ("Lab Night", "Next Month", "Cancelled"):
+            assert absent not in body
+        assert "Field Trip" in email.html_body
+
+    def test_skips_students_with_nothing_upcoming(self, app, department, make_event):
+        """Test students without department events or registrations get no email."""
+        elsewhere = Department(name="Music")
+        db.session.add(elsewhere)
+        db.session.commit()
+        db.session.add(
+            User(
+                email="music@test.com",
+                username="music",
+                first_name="Mu",
+                last_name="Sic",
+                password_hash="x",
+                department_id=elsewhere.id,
+            )
+        )
+        db.session.commit()
+        make_event("CS Only", starts_in=timedelta(days=1))
+
+        assert send_weekly_digest() == 0
+        assert OutboxEmail.query.count() == 0
+
+    def test_no_events_is_a_no_op(self, app, student_user):
+        """Test a quiet week queues nothing."""
+        assert send_weekly_digest() == 0
+
+    def test_escapes_names_in_html(self, app, student_user, make_event):
+        """Test first names are escaped in the HTML body only."""
+        student_user.first_name = "<Ann>"
+        db.session.commit()
+        make_event("Demo", starts_in=timedelta(days=1))
+
+        send_weekly_digest()
+
+        email = OutboxEmail.query.one()
+        assert "Hi <Ann>," in email.text_body
+        assert "Hi &lt;Ann&gt;," in email.html_body
+
+    def test_event_without_location(self, app, department, student_user, make_event):
+        """Test an event with no location lists just its department."""
+        make_event("Pop-up", starts_in=timedelta(days=1), location=None)
+
+        send_weekly_digest()
+
+        email = OutboxEmail.query.one()
+        assert "None" not in email.text_body
+        assert "None" not in email.html_body
+        assert "    Computer Science\n" in email.text_body
+
+    def test_lists_occurrences_of_series(self, app, department, student_user, make_event):
+        """Test a recurring series is listed once per occurrence in the window."""
+        other = Department(name="Biology")
+        db.session.add(other)
+        db.session.commit()
+        make_event("Daily Standup", starts_in=timedelta(days=-3), rule="FREQ=DAILY;INTERVAL=3")
+        seminar = make_event(
+            "Seminar", starts_in=timedelta(days=-5), rule="FREQ=WEEKLY", department=other
+        )
+        db.session.add(Attendance(event_id=seminar.id, user_id=student_user.id))
+        db.session.commit()
+
+        assert send_weekly_digest() == 1
+
+        body = OutboxEmail.query.one().text_body
+        assert body.count("Daily Standup") == 2  # in 3 and 6 days
+        assert body.count("Seminar (you're registered)") == 1  # in 2 days
+        assert body.index("Seminar") < body.index("Daily Standup")
+        in_two_days = (seminar.start_time + timedelta(weeks=1)).strftime("%A, %B %d, %Y")
+        assert in_two_days in body
+
+    def test_second_run_same_week_sends_nothing(self, app, student_user, make_event):
+        """Test a retried run for the same week does not queue the digest again."""
+        make_event("Demo", starts_in=timedelta(days=1))
+        now = datetime.utcnow()
+
+        assert send_weekly_digest(now=now) == 1
+        assert send_weekly_digest(now=now + timedelta(minutes=5)) == 0
+
+        assert OutboxEmail.query.count() == 1
+        dispatch = DigestDispatch.query.one()
+        assert dispatch.user_id == student_user.id
+        assert dispatch.week_start == now.date() - timedelta(days=now.weekday())
+        assert dispatch.week_start.weekday() == 0
+
+    def test_skips_students_already_sent_this_week(self, app, department, admin_user, student_user):
+        """Test a dispatch row from another worker keeps that student out of the run."""
+        db.session.add(
+            User(
+                email="second@test.com",
+                username="second",
+                first_name="Sec",
+                last_name="Ond",
+                password_hash="x",
+                department_id=department.id,
+            )
+        )
+        start = datetime(2031, 3, 6, 10, 0)
+        db.session.add(
+            Event(
+                title="Demo",
+                location="Diamond 142",
+                start_time=start,
+                end_time=start + timedelta(hours=1),
+                department_id=department.id,
+                created_by=admin_user.id,
+            )
+        )
+        db.session.add(DigestDispatch(user_id=student_user.id, week_start=date(2031, 3, 3)))
+        db.session.commit()
+
+        assert send_weekly_digest(now=datetime(2031, 3, 5, 9, 0)) == 1  # a Wednesday
+
+        assert [email.recipient for email in OutboxEmail.query] == ["second@test.com"]
+
+    def test_cli_send(self, app, runner, student_user, make_event):
+        """Test the digest send command."""
+        make_event("Demo", starts_in=timedelta(days=1))
+
+        result = runner.invoke(args=["digest", "send", "--batch-size", "10"])
+
+        assert result.exit_code == 0
+        assert "Queued 1 digests." in result.output
+
+
+class TestDigestBenchmark:
+    """Benchmark the digest run for a whole campus."""
+
+    STUDENTS = 20_000
+
+    def test_twenty_thousand_students(self, app, department, make_event):
+        """Test 20k digests take a handful of SELECTs."""
+        departments = [department] + [Department(name=f"Dept {i}") for i in range(9)]
+        db.session.add_all(departments[1:])
+        db.session.commit()
+
+        db.session.execute(
+            insert(User),
+            [
+                {
+                    "email": f"s{i}@test.com",
+                    "username": f"s{i}",
+                    "first_name": f"S{i}",
+                    "last_name": "Student",
+                    "password_hash": "x",
+                    "role": "student",
+                    "department_id": departments[i % 10].id,
+                    "is_active": True,
+                    "created_at": datetime.utcnow(),
+                }
+                for i in range(self.STUDENTS)
+            ],
+        )
+        events = [
+            make_event(f"{dept.name} #{n}", starts_in=timedelta(days=1 + n), department=dept)
+            for dept in departments
+            for n in range(3)
+        ]
+        user_ids = db.session.scalars(db.select(User.id).where(User.role == "student")).all()
+        db.session.execute(
+            insert(Attendance),
+            [
+                {"event_id": events[i % len(events)].id, "user_id": user_id}
+                for i, user_id in enumerate(user_ids[::4])
+            ],
+        )
+        db.session.commit()
+
+        selects = []
+
+        def record(conn, cursor, statement, *args):
+            if statement.lstrip().upper().startswith("SELECT"):
+                selects.append(statement)
+
+        sa_event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            queued = send_weekly_digest(batch_size=1000)
+        finally:
+            sa_event.remove(db.engine, "before_cursor_execute", record)
+
+        assert queued == self.STUDENTS
+        assert OutboxEmail.query.count() == self.STUDENTS
+        assert len(selects) <= 3
@@ -69,3 +69,120 @@ class TestEmailFunctions:
                 subject="Test", recipients=recipients, text_body="Body", html_body="<p>HTML</p>"
             )
             assert mock_mail.send.called
+
+
+class TestEmailInstrumentation:
+    """Test send latency and failure metrics."""
+
+    @patch("app.email.mail")
+    def test_direct_send_recorded(self, mock_mail, app):
+        """Test a successful send is timed and counted."""
+        from app.email import send_email
+
+        send_email("Subject", ["a@test.com"], "Body", "<p>Body</p>")
+
+        registry = app.extensions["metrics"]
+        assert registry.value("email_sent_total", source="direct") == 1
+        assert registry.histogram("email_send_seconds", source="direct").count == 1
+
+    @patch("app.email.mail")
+    def test_failure_counted_by_exception_type(self, mock_mail, app):
+        """Test a failed send is counted with its exception type and re-raised."""
+        import smtplib
+
+        import pytest
+
+        from app.email import send_email
+
+        mock_mail.send.side_effect = smtplib.SMTPServerDisconnected("gone")
+
+        with pytest.raises(smtplib.SMTPServerDisconnected):
+            send_email("Subject", ["a@test.com"], "Body", "<p>Body</p>")
+
+        registry = app.extensions["metrics"]
+        assert (
+            registry.value(
+                "email_send_failures_total",
+                source="direct",
+                stage="send",
+                exception="SMTPServerDisconnected",
+            )
+            == 1
+        )
+        assert registry.value("email_sent_total", source="direct") == 0
+        assert registry.histogram("email_send_seconds", source="direct").count == 1
+
+
+class TestEmailTemplates:
+    """Test the precompiled, cached email bodies."""
+
+    def test_confirmation_bodies(self, app, student_user, event):
+        """Test the rendered bodies carry the event and recipient fields."""
+        from app.email import build_registration_confirmation
+
+        subject, recipients, text_body, html_body = build_registration_confirmation(
+            student_user, event
+        )
+
+        assert subject == "Confirmed: You're registered for Test Event"
+        assert recipients == ["student@test.com"]
+        assert "Hi Test," in text_body
+        assert "Department: Computer Science" in text_body
+        assert "<p>Hi Test,</p>" in html_body
+        assert "Test Location" in html_body
+        assert "Test Description" in html_body
+        assert "<style>" not in html_body
+        assert "\x00" not in text_body + html_body
+
+    def test_first_name_escaped_in_html(self, app, student_user, event):
+        """Test per-user fields are HTML-escaped."""
+        from app.email import build_registration_confirmation
+
+        student_user.first_name = "<b>Eve</b>"
+        _, _, text_body, html_body = build_registration_confirmation(student_user, event)
+
+        assert "Hi <b>Eve</b>," in text_body
+        assert "Hi &lt;b&gt;Eve&lt;/b&gt;," in html_body
+
+    def test_event_part_rendered_once(self, app, student_user, admin_user, event, monkeypatch):
+        """Test recipients of the same event reuse the cached render."""
+        from app.email import build_registration_confirmation
+
+        calls = []
+        get_template = app.jinja_env.get_template
+
+        def counting_get_template(name, *args, **kwargs):
+            calls.append(name)
+            return get_template(name, *args, **kwargs)
+
+        monkeypatch.setattr(app.jinja_env, "get_template", counting_get_template)
+
+        first = build_registration_confirmation(student_user, event)
+        second = build_registration_confirmation(admin_user, event)
+
+        assert len(calls) == 2  # one text and one HTML template, rendered once
+        assert "Hi Test," in second[2]
+        assert first[3] == second[3]
+
+    def test_event_update_invalidates_cached_part(self, app, student_user, event):
+        """Test editing the event produces a fresh render."""
+        from datetime import datetime, timedelta
+
+        from app import db
+        from app.email import build_registration_confirmation
+
+        build_registration_confirmation(student_user, event)
+        event.location = "New Hall"
+        event.updated_at = datetime.utcnow() + timedelta(seconds=1)
+        db.session.commit()
+
+        _, _, text_body, _ = build_registration_confirmation(student_user, event)
+        assert "Location: New Hall" in text_body
+
+    def test_event_without_description(self, app, student_user, event):
+        """Test the description block is omitted when empty."""
+        from app.email import build_registration_confirmation
+
+        event.description = None
+        _, _, _, html_body = build_registration_confirmation(student_user, event)
+        assert "line-height: 1.8" not in html_body
@@ -570,13 +570,17 @@ class TestEventRoutes:
         start_time = (datetime.utcnow() + timedelta(days=2)).isoformat()
         end_time = (datetime.utcnow() + timedelta(days=2, hours=2)).isoformat()
 
-        # Create a fake image file
+        from PIL import Image
+
+        image = BytesIO()
+        Image.new("RGB", (64, 48), "navy").save(image, "PNG")
+        image.seek(0)
         data = {
             "title": "Event with File",
             "start_time": start_time,
             "end_time": end_time,
             "department_id": str(department.id),
-            "flier": (BytesIO(b"fake image content"), "test_flier.png"),
+            "flier": (image, "test_flier.png"),
         }
 
         response = admin_client.post(
@@ -604,3 +608,140 @@ class TestEventRoutes:
         assert response.status_code == 201
         data = response.get_json()
         assert data["message"] == "Successfully registered for event"
+
+
+class TestRecurringEventRoutes:
+    """Test creating recurring events and editing single occurrences."""
+
+    def create_series(self, client, department, rule="FREQ=WEEKLY;BYDAY=MO,WE"):
+        return client.post(
+            "/api/events",
+            json={
+                "title": "Office Hours",
+                "start_time": "2031-03-03T15:00:00",
+                "end_time": "2031-03-03T16:00:00",
+                "department_id": department.id,
+                "recurrence_rule": rule,
+            },
+        )
+
+    def test_create_series(self, admin_client, department):
+        """Test a series is one row with its normalized rule."""
+        response = self.create_series(admin_client, department, "freq=weekly;byday=we,mo")
+
+        assert response.status_code == 201
+        assert response.get_json()["event"]["recurrence_rule"] == "FREQ=WEEKLY;BYDAY=MO,WE"
+        assert Event.query.count() == 1
+
+    def test_create_series_invalid_rule(self, admin_client, department):
+        """Test an unsupported rule is rejected."""
+        response = self.create_series(admin_client, department, "FREQ=YEARLY")
+
+        assert response.status_code == 400
+        assert "FREQ" in response.get_json()["error"]
+        assert Event.query.count() == 0
+
+    def test_update_series(self, admin_client, department):
+        """Test retiming a series revalidates its rule and drops its exceptions."""
+        from app.models import EventException
+
+        event_id = self.create_series(admin_client, department).get_json()["event"]["id"]
+        admin_client.delete(f"/api/events/{event_id}/occurrences/2031-03-05T15:00:00")
+        assert EventException.query.count() == 1
+
+        rejected = admin_client.put(
+            f"/api/events/{event_id}",
+            json={"start_time": "2031-03-04T15:00:00", "end_time": "2031-03-04T16:00:00"},
+        )
+        assert rejected.status_code == 400  # a Tuesday is not in BYDAY=MO,WE
+
+        response = admin_client.put(
+            f"/api/events/{event_id}",
+            json={
+                "start_time": "2031-03-04T15:00:00",
+                "end_time": "2031-03-04T16:00:00",
+                "recurrence_rule": "FREQ=WEEKLY;COUNT=4",
+            },
+        )
+        assert response.status_code == 200
+        event = db.session.get(Event, event_id)
+        assert event.recurrence_end == datetime(2031, 3, 25, 16)
+        assert EventException.query.count() == 0
+
+        response = admin_client.put(f"/api/events/{event_id}", json={"recurrence_rule": None})
+        assert response.get_json()["event"]["recurrence_rule"] is None
+
+    def test_cancel_and_move_occurrence(self, admin_client, department):
+        """Test one occurrence is cancelled or moved with a single sparse row."""
+        from app.models import EventException
+
+        event_id = self.create_series(admin_client, department).get_json()["event"]["id"]
+        url = f"/api/events/{event_id}/occurrences/2031-03-05T15:00:00Z"
+
+        cancelled = admin_client.delete(url)
+        moved = admin_client.put(
+            url, json={"start_time": "2031-03-06T15:00:00", "end_time": "2031-03-06T16:00:00"}
+        )
+
+        assert cancelled.status_code == 200
+        assert cancelled.get_json()["exception"]["is_cancelled"] is True
+        assert moved.status_code == 200
+        assert moved.get_json()["exception"]["start_time"] == "2031-03-06T15:00:00"
+        assert EventException.query.count() == 1
+
+    def test_occurrence_times_with_offset_on_campus_clock(self, app, admin_client, department):
+        """Test times with an offset are converted to the campus clock, not to UTC."""
+        event_id = self.create_series(admin_client, department).get_json()["event"]["id"]
+        app.config["EVENT_TIMEZONE"] = "Etc/GMT+4"  # UTC-4, no daylight saving
+
+        moved = admin_client.put(
+            f"/api/events/{event_id}/occurrences/2031-03-05T19:00:00Z",
+            json={"start_time": "2031-03-06T19:00:00Z", "end_time": "2031-03-06T16:00:00-04:00"},
+        )
+
+        assert moved.status_code == 200
+        assert moved.get_json()["exception"]["original_start"] == "2031-03-05T15:00:00"
+        assert moved.get_json()["exception"]["start_time"] == "2031-03-06T15:00:00"
+
+    def test_occurrence_errors(self, admin_client, department, event):
+        """Test occurrence edits are validated."""
+        event_id = self.create_series(admin_client, department).get_json()["event"]["id"]
+        base = f"/api/events/{event_id}/occurrences"
+
+        assert (
+            admin_client.delete("/api/events/9999/occurrences/2031-03-05T15:00:00").status_code
+            == 404
+        )
+        assert (
+            admin_client.delete(f"/api/events/{event.id}/occurrences/2031-03-05").status_code == 400
+        )
+        assert admin_client.delete(f"{base}/not-a-date").status_code == 400
+        assert admin_client.delete(f"{base}/2031-03-04T15:00:00").status_code == 404
+        assert admin_client.put(f"{base}/2031-03-05T15:00:00", json={}).status_code == 400
+        backwards = {"start_time": "2031-03-06T16:00:00", "end_time": "2031-03-06T15:00:00"}
+        assert admin_client.put(f"{base}/2031-03-05T15:00:00", json=backwards).status_code == 400
+
+    def test_occurrence_other_department(self, app, dept_admin_client, admin_user):
+        """Test department admins cannot edit other departments' series."""
+        from app.models import Department
+        from app.recurrence import set_recurrence
+
+        other = Department(name="Biology")
+        db.session.add(other)
+        db.session.commit()
+        event = Event(
+            title="Lab Hours",
+            start_time=datetime(2031, 3, 3, 15),
+            end_time=datetime(2031, 3, 3, 16),
+            department_id=other.id,
+            created_by=admin_user.id,
+        )
+        set_recurrence(event, "FREQ=DAILY")
+        db.session.add(event)
+        db.session.commit()
+
+        response = dept_admin_client.delete(
+            f"/api/events/{event.id}/occurrences/2031-03-04T15:00:00"
+        )
+
+        assert response.status_code == 403
@@ -0,0 +1,198 @@
+"""Tests for flier validation, variants and serving."""
+
+import io
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from PIL import Image
+
+from app.fliers import render_variants, save_flier, variant_urls
+
+
+def image_bytes(size=(2400, 1800), fmt="JPEG", mode="RGB", color="teal", **save_options):
+    buffer = io.BytesIO()
+    Image.new(mode, size, color).save(buffer, fmt, **save_options)
+    return buffer.getvalue()
+
+
+def photo_with_exif(size=(2400, 1800), orientation=None):
+    """A JPEG carrying GPS and camera EXIF, as phones produce."""
+    exif = Image.Exif()
+    exif[0x010F] = "PhoneMaker"  # Make
+    exif[0x8825] = {1: "N", 2: (44.0, 33.0, 0.0)}  # GPS IFD
+    if orientation:
+        exif[0x0112] = orientation
+    return image_bytes(size, exif=exif.tobytes())
+
+
+def post_event(client, department, flier):
+    start = datetime.utcnow() + timedelta(days=2)
+    return client.post(
+        "/api/events",
+        data={
+            "title": "Poster Session",
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(hours=2)).isoformat(),
+            "department_id": str(department.id),
+            "flier": (io.BytesIO(flier), "poster.jpg"),
+        },
+        content_type="multipart/form-data",
+    )
+
+
+class TestFlierProcessing:
+    """Test validation and rendering."""
+
+    def test_variants_are_resized_and_stripped(self):
+        """Test every variant is bounded, in its format, and carries no EXIF."""
+        variants = render_variants(photo_with_exif())
+
+        assert {name: ext for name, (ext, _) in variants.items()} == {
+            "full": "jpg",
+            "full_webp": "webp",
+            "thumb": "jpg",
+            "thumb_webp": "webp",
+        }
+        for name, (_, data) in variants.items():
+            with Image.open(io.BytesIO(data)) as image:
+                assert max(image.size) == (1600 if name.startswith("full") else 480)
+                assert not image.getexif()
+                assert "icc_profile" not in image.info
+
+    def test_orientation_applied_before_stripping(self):
+        """Test a rotated phone photo keeps looking upright without its EXIF."""
+        _, data = render_variants(photo_with_exif((800, 600), orientation=6))["full"]
+
+        with Image.open(io.BytesIO(data)) as image:
+            assert image.size == (600, 800)
+
+    def test_transparency_kept_as_png(self):
+        """Test images with alpha are not flattened to JPEG."""
+        variants = render_variants(image_bytes((300, 200), "PNG", "RGBA", (0, 0, 0, 0)))
+
+        assert variants["full"][0] == "png"
+        with Image.open(io.BytesIO(variants["thumb_webp"][1])) as image:
+            assert image.mode == "RGBA"
+
+    @pytest.mark.parametrize(
+        "data, message",
+        [
+            (b"fake image content", "Flier is not a valid image"),
+            (image_bytes((10, 10), "BMP"), "Flier must be a JPEG, PNG, GIF or WebP image"),
+            (image_bytes((10, 10), "PNG")[:40], "Flier is not a valid image"),
+        ],
+    )
+    def test_invalid_uploads_rejected(self, app, data, message):
+        """Test anything but a decodable, allowed image is refused."""
+        with pytest.raises(ValueError, match=message):
+            save_flier(data)
+
+    def test_size_limits(self, app):
+        """Test byte and pixel limits are checked before decoding."""
+        app.config["FLIER_MAX_BYTES"] = 1024 * 1024
+        with pytest.raises(ValueError, match="smaller than 1 MB"):
+            save_flier(b"\0" * (1024 * 1024 + 1))
+
+        app.config["FLIER_MAX_PIXELS"] = 100
+        with pytest.raises(ValueError, match="dimensions"):
+            save_flier(image_bytes((20, 20)))
+
+    def test_content_addressed(self, app):
+        """Test identical uploads share a name and URLs follow the variants."""
+        data = image_bytes((40, 40), "PNG", "RGBA")
+        flier_hash, path = save_flier(data)
+
+        assert save_flier(data) == (flier_hash, path)
+        assert path == f"/api/events/fliers/{flier_hash}-full.png"
+        assert (
+            variant_urls(path)["thumb_webp"] == f"/api/events/fliers/{flier_hash}-thumb_webp.webp"
+        )
+
+
+class TestFlierUploads:
+    """Test the upload route and serving."""
+
+    def test_upload_renders_variants(self, app, admin_client, department):
+        """Test create_event exposes variant URLs and the task writes them."""
+        response = post_event(admin_client, department, photo_with_exif())
+
+        assert response.status_code == 201
+        event = response.get_json()["event"]
+        assert event["flier_path"] == event["flier_variants"]["full"]
+        assert set(event["flier_variants"]) == {"full", "full_webp", "thumb", "thumb_webp"}
+        assert len(os.listdir(os.path.join(app.config["MEDIA_ROOT"], "fliers"))) == 4
+
+    def test_duplicate_upload_not_rendered_again(self, app, admin_client, department, monkeypatch):
+        """Test a second event with the same flier reuses the stored files."""
+        import app.fliers as fliers
+
+        flier = image_bytes((300, 300))
+        post_event(admin_client, department, flier)
+        monkeypatch.setattr(fliers, "render_variants", None)  # would fail if called
+
+        second = post_event(admin_client, department, flier).get_json()["event"]
+
+        assert second["flier_variants"]["thumb"].endswith("-thumb.jpg")
+        assert len(os.listdir(os.path.join(app.config["MEDIA_ROOT"], "fliers"))) == 4
+
+    def test_failed_processing_clears_flier(self, app, admin_client, department, monkeypatch):
+        """Test an event whose flier cannot be rendered is left without one."""
+        import app.fliers as fliers
+        from app import db
+        from app.models import Event
+
+        def fail(data):
+            raise OSError("truncated image")
+
+        monkeypatch.setattr(fliers, "render_variants", fail)
+
+        response = post_event(admin_client, department, image_bytes((300, 300)))
+
+        assert response.status_code == 201
+        event = db.session.get(Event, response.get_json()["event"]["id"])
+        db.session.refresh(event)
+        assert (event.flier_path, event.flier_hash) == (None, None)
+
+    def test_invalid_upload_rejected(self, admin_client, department):
+        """Test a non-image upload fails the request and creates no event."""
+        from app.models import Event
+
+        response = post_event(admin_client, department, b"<?php echo 1; ?>")
+
+        assert response.status_code == 400
+        assert response.get_json()["error"] == "Flier is not a valid image"
+        assert Event.query.count() == 0
+
+    def test_oversized_request_rejected(self, app, admin_client, department):
+        """Test bodies over MAX_CONTENT_LENGTH are refused before they are read."""
+        app.config["MAX_CONTENT_LENGTH"] = 1024 * 1024
+
+        response = post_event(admin_client, department, b"\0" * (1024 * 1024 + 1))
+
+        assert response.status_code == 413
+
+    def test_variant_served_immutable(self, client, admin_client, department):
+        """Test variants are served with far-future immutable caching."""
+        event = post_event(admin_client, department, image_bytes((300, 300))).get_json()["event"]
+
+        response = client.get(event["flier_variants"]["thumb_webp"])
+
+        assert response.status_code == 200
+        assert response.mimetype == "image/webp"
+        assert "immutable" in response.headers["Cache-Control"]
+        assert response.cache_control.max_age == 31536000
+
+    def test_unknown_names_not_found(self, client):
+        """Test only variant names are served."""
+        assert client.get("/api/events/fliers/..%2Fconfig.py").status_code == 404
+        assert client.get(f"/api/events/fliers/{'0' * 32}-full.jpg").status_code == 404
+
+    def test_legacy_flier_has_no_variants(self, app, event):
+        """Test fliers uploaded before processing keep their path and no variants."""
+        event.flier_path = "/static/uploads/fliers/20250101_000000_old.png"
+
+        data = event.to_dict()
+
+        assert data["flier_path"] == "/static/uploads/fliers/20250101_000000_old.png"
+        assert data["flier_variants"] is None
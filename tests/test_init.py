@@ -120,3 +120,100 @@ class TestAppInitialization:
         # Should be False to avoid performance overhead
         track_mods = app.config.get("SQLALCHEMY_TRACK_MODIFICATIONS", False)
         assert track_mods is False
+
+
+class TestPrincipalCache:
+    """Test the cached principal returned by the user loader."""
+
+    def test_user_loader_caches_principal(self, app, student_user):
+        """Test the second load is served from the cache."""
+        cache = app.extensions["principal_cache"]
+        app.login_manager._user_callback(student_user.id)
+
+        assert cache.get(student_user.id) == (
+            student_user.id,
+            "student",
+            student_user.department_id,
+            True,
+        )
+
+    def test_principal_authorizes_without_user_row(self, app, student_user):
+        """Test authorization fields do not load the User row."""
+        principal = app.login_manager._user_callback(student_user.id)
+
+        assert principal.role == "student"
+        assert principal.department_id == student_user.department_id
+        assert principal.is_active is True
+        assert principal.is_authenticated is True
+        assert principal.get_id() == str(student_user.id)
+        assert principal._user is None
+
+    def test_principal_delegates_to_user(self, app, student_user):
+        """Test other attributes are loaded from the User row on demand."""
+        principal = app.login_manager._user_callback(student_user.id)
+
+        assert principal.email == "student@test.com"
+        assert principal.to_dict()["department"] == "Computer Science"
+        assert principal.check_password("password123")
+        assert "UserPrincipal" in repr(principal)
+
+    def test_principal_private_attribute_missing(self, app, student_user):
+        """Test private lookups are not delegated."""
+        principal = app.login_manager._user_callback(student_user.id)
+
+        try:
+            principal._missing
+        except AttributeError:
+            pass
+        else:  # pragma: no cover
+            raise AssertionError("expected AttributeError")
+
+    def test_user_update_invalidates_principal(self, app, student_user):
+        """Test committing a user change evicts the cached principal."""
+        cache = app.extensions["principal_cache"]
+        app.login_manager._user_callback(student_user.id)
+
+        student_user.role = "department_admin"
+        db.session.commit()
+
+        assert student_user.id not in cache
+        principal = app.login_manager._user_callback(student_user.id)
+        assert principal.role == "department_admin"
+
+    def test_rollback_discards_pending_invalidation(self, app, student_user):
+        """Test a rolled back change leaves nothing queued."""
+        student_user.first_name = "Changed"
+        db.session.flush()
+        db.session.rollback()
+
+        assert "stale_principals" not in db.session.info
+
+    def test_deactivation_via_admin_api(self, admin_client, student_user):
+        """Test deactivating a user is visible on the next request."""
+        from flask import current_app
+
+        cache = current_app.extensions["principal_cache"]
+        current_app.login_manager._user_callback(student_user.id)
+
+        response = admin_client.put(
+            f"/api/admin/users/{student_user.id}", json={"is_active": False}
+        )
+
+        assert response.status_code == 200
+        assert student_user.id not in cache
+
+    def test_change_password_invalidates_principal(self, authenticated_client, student_user):
+        """Test changing the password evicts the cached principal."""
+        from flask import current_app
+
+        cache = current_app.extensions["principal_cache"]
+        current_app.login_manager._user_callback(student_user.id)
+        assert student_user.id in cache
+
+        response = authenticated_client.put(
+            "/api/auth/change-password",
+            json={"old_password": "password123", "new_password": "newpass456"},
+        )
+
+        assert response.status_code == 200
+        assert student_user.id not in cache
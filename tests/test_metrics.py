@@ -0,0 +1,62 @@
+"""Tests for application metrics."""
+
+from app.metrics import Histogram, Metrics
+
+
+class TestMetrics:
+    """Test the metrics registry and endpoint."""
+
+    def test_counters_by_label(self):
+        """Test counters are tracked per label set."""
+        registry = Metrics()
+        registry.inc("hits", scope="ip")
+        registry.inc("hits", 2, scope="ip")
+        registry.inc("hits", scope="account")
+
+        assert registry.value("hits", scope="ip") == 3
+        assert registry.value("hits", scope="missing") == 0
+        assert registry.snapshot()["counters"]["hits"] == [
+            {"labels": {"scope": "account"}, "value": 1},
+            {"labels": {"scope": "ip"}, "value": 3},
+        ]
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test observations land in the first bucket whose bound covers them."""
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+
+        assert histogram.to_dict() == {
+            "buckets": {"0.1": 2, "1.0": 3, "+Inf": 4},
+            "count": 4,
+            "sum": 3.65,
+        }
+
+    def test_gauges_histograms_and_collectors(self):
+        """Test the snapshot includes every metric type and runs collectors first."""
+        registry = Metrics()
+        registry.observe("latency_seconds", 0.2, source="direct")
+        registry.add_collector(lambda r: r.set_gauge("depth", 7, status="pending"))
+
+        snapshot = registry.snapshot()
+
+        assert snapshot["gauges"]["depth"] == [{"labels": {"status": "pending"}, "value": 7}]
+        assert registry.gauge("depth", status="pending") == 7
+        latency = snapshot["histograms"]["latency_seconds"][0]
+        assert latency["labels"] == {"source": "direct"}
+        assert latency["count"] == 1
+        assert registry.histogram("latency_seconds", source="direct").sum == 0.2
+        assert registry.histogram("latency_seconds") is None
+
+    def test_metrics_endpoint(self, app, admin_client):
+        """Test admins can read the metrics snapshot."""
+        app.extensions["metrics"].inc("example_total")
+
+        response = admin_client.get("/api/admin/metrics")
+
+        assert response.status_code == 200
+        assert response.get_json()["counters"]["example_total"][0]["value"] == 1
+
+    def test_metrics_endpoint_unauthorized(self, dept_admin_client):
+        """Test department admins cannot read metrics."""
+        assert dept_admin_client.get("/api/admin/metrics").status_code == 403
@@ -0,0 +1,147 @@
+"""Tests for the notification inbox API."""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app import db
+from app.models import Notification
+
+
+def add_notifications(user, count, read=False, start=None):
+    start = start or datetime(2026, 1, 1, 9, 0)
+    notifications = [
+        Notification(
+            user_id=user.id,
+            title=f"Notice {i}",
+            message="Body",
+            is_read=read,
+            sent_at=start + timedelta(minutes=i),
+        )
+        for i in range(count)
+    ]
+    db.session.add_all(notifications)
+    db.session.commit()
+    return notifications
+
+
+class TestInbox:
+    """Test listing the inbox."""
+
+    def test_requires_login(self, client):
+        """Test anonymous users are sent to log in."""
+        assert client.get("/api/notifications").status_code == 302
+
+    def test_keyset_pages_cover_inbox_once(self, authenticated_client, student_user):
+        """Test following next_cursor walks the inbox newest first without overlap."""
+        add_notifications(student_user, 5)
+
+        seen = []
+        cursor = None
+        while True:
+            url = "/api/notifications?limit=2" + (f"&before={cursor}" if cursor else "")
+            data = authenticated_client.get(url).get_json()
+            seen.extend(n["title"] for n in data["notifications"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+
+        assert seen == [f"Notice {i}" for i in range(4, -1, -1)]
+        assert data["unread_count"] == 5
+
+    def test_same_timestamp_breaks_tie_on_id(self, authenticated_client, student_user):
+        """Test rows sharing sent_at are neither skipped nor repeated."""
+        same = datetime(2026, 1, 1, 9, 0)
+        db.session.add_all(
+            Notification(user_id=student_user.id, title=f"T{i}", message="m", sent_at=same)
+            for i in range(3)
+        )
+        db.session.commit()
+
+        first = authenticated_client.get("/api/notifications?limit=2").get_json()
+        second = authenticated_client.get(
+            f"/api/notifications?limit=2&before={first['next_cursor']}"
+        ).get_json()
+
+        titles = [n["title"] for n in first["notifications"] + second["notifications"]]
+        assert titles == ["T2", "T1", "T0"]
+        assert second["next_cursor"] is None
+
+    def test_unread_filter_and_ownership(self, authenticated_client, student_user, admin_user):
+        """Test only the caller's notifications are listed, optionally unread only."""
+        add_notifications(student_user, 2)
+        add_notifications(student_user, 1, read=True, start=datetime(2026, 2, 1))
+        add_notifications(admin_user, 3)
+
+        everything = authenticated_client.get("/api/notifications").get_json()
+        unread = authenticated_client.get("/api/notifications?unread=true").get_json()
+
+        assert len(everything["notifications"]) == 3
+        assert len(unread["notifications"]) == 2
+        assert all(n["user_id"] == student_user.id for n in everything["notifications"])
+
+    def test_invalid_cursor(self, authenticated_client):
+        """Test a malformed cursor is rejected."""
+        response = authenticated_client.get("/api/notifications?before=garbage")
+
+        assert response.status_code == 400
+
+
+class TestUnread:
+    """Test the unread count and marking notifications read."""
+
+    def test_unread_count(self, authenticated_client, student_user):
+        """Test the count ignores read notifications."""
+        add_notifications(student_user, 3)
+        add_notifications(student_user, 2, read=True, start=datetime(2026, 2, 1))
+
+        response = authenticated_client.get("/api/notifications/unread-count")
+
+        assert response.get_json() == {"unread_count": 3}
+
+    def test_mark_selected_read(self, authenticated_client, student_user, admin_user):
+        """Test marking ids read leaves other users' notifications alone."""
+        mine = add_notifications(student_user, 3)
+        theirs = add_notifications(admin_user, 1)
+
+        response = authenticated_client.post(
+            "/api/notifications/read", json={"ids": [mine[0].id, mine[1].id, theirs[0].id]}
+        )
+
+        assert response.status_code == 200
+        assert response.get_json() == {"updated": 2, "unread_count": 1}
+        db.session.expire_all()
+        assert db.session.get(Notification, theirs[0].id).is_read is False
+
+    def test_mark_all_read(self, authenticated_client, student_user):
+        """Test clearing the whole inbox."""
+        add_notifications(student_user, 4)
+
+        response = authenticated_client.post("/api/notifications/read", json={"all": True})
+
+        assert response.get_json() == {"updated": 4, "unread_count": 0}
+
+    def test_mark_read_requires_ids(self, authenticated_client):
+        """Test a request without ids or all is rejected."""
+        response = authenticated_client.post("/api/notifications/read", json={"ids": "1"})
+
+        assert response.status_code == 400
+
+    def test_count_uses_partial_index(self, app):
+        """Test SQLite answers the unread count from the partial index."""
+        plan = db.session.execute(
+            text(
+                "EXPLAIN QUERY PLAN SELECT count(*) FROM notifications "
+                "WHERE notifications.user_id = 1 AND notifications.is_read = 0"
+            )
+        ).all()
+
+        assert "ix_notifications_unread" in " ".join(row[-1] for row in plan)
+
+    def test_navbar_badge(self, authenticated_client, student_user):
+        """Test pages show the unread badge for logged-in users."""
+        add_notifications(student_user, 2)
+
+        response = authenticated_client.get("/events")
+
+        assert b'<span class="nav-badge" title="Unread notifications">2</span>' in response.data
@@ -0,0 +1,182 @@
+"""Tests for the email outbox and its background delivery."""
+
+from datetime import datetime, timedelta
+
+from app import db
+from app.email import queue_email
+from app.models import Attendance, OutboxEmail
+from app.outbox import OutboxWorker, deliver_pending, drain_outbox, retry_delay
+
+
+def queue(*recipients):
+    queue_email("Subject", list(recipients), "Body", "<p>Body</p>")
+    db.session.commit()
+
+
+class TestOutboxDelivery:
+    """Test draining the outbox against a local SMTP server."""
+
+    def test_registration_writes_outbox_row(self, authenticated_client, event):
+        """Test registering queues the confirmation in the same commit."""
+        response = authenticated_client.post(f"/api/events/{event.id}/register")
+
+        assert response.status_code == 201
+        assert Attendance.query.count() == 1
+        email = OutboxEmail.query.one()
+        assert email.recipient == "student@test.com"
+        assert email.subject == "Confirmed: You're registered for Test Event"
+        assert email.status == "pending"
+
+    def test_batch_shares_one_connection(self, app, smtp_server):
+        """Test a batch is sent over a single SMTP session."""
+        queue("a@test.com", "b@test.com", "c@test.com")
+
+        assert deliver_pending() == (3, 0)
+
+        assert smtp_server.connections == 1
+        assert [m["recipients"] for m in smtp_server.messages] == [
+            ["a@test.com"],
+            ["b@test.com"],
+            ["c@test.com"],
+        ]
+        assert {e.status for e in OutboxEmail.query.all()} == {"sent"}
+        assert all(e.sent_at for e in OutboxEmail.query.all())
+
+    def test_failed_recipient_is_retried_with_backoff(self, app, smtp_server):
+        """Test a refused message is rescheduled while the rest are sent."""
+        smtp_server.reject_recipients.add("bad@test.com")
+        queue("bad@test.com", "good@test.com")
+
+        assert deliver_pending() == (1, 1)
+
+        bad = OutboxEmail.query.filter_by(recipient="bad@test.com").one()
+        assert bad.status == "pending"
+        assert bad.attempts == 1
+        assert "SMTPRecipientsRefused" in bad.last_error
+        assert bad.next_attempt_at > datetime.utcnow() + timedelta(seconds=20)
+
+        # Not due yet
+        assert deliver_pending() == (0, 0)
+
+    def test_gives_up_after_max_attempts(self, app, smtp_server):
+        """Test an email is marked failed once it runs out of attempts."""
+        app.config["OUTBOX_MAX_ATTEMPTS"] = 2
+        app.config["OUTBOX_RETRY_BASE_DELAY"] = 0
+        smtp_server.reject_recipients.add("bad@test.com")
+        queue("bad@test.com")
+
+        assert drain_outbox() == (0, 2)
+        assert OutboxEmail.query.one().status == "failed"
+
+    def test_connection_failure_reschedules_batch(self, app, smtp_server):
+        """Test an unreachable relay leaves the batch pending for later."""
+        from app import mail
+
+        app.config["MAIL_PORT"] = 1
+        mail.init_app(app)
+        queue("a@test.com", "b@test.com")
+
+        assert deliver_pending() == (0, 2)
+        assert {e.attempts for e in OutboxEmail.query.all()} == {1}
+        assert {e.status for e in OutboxEmail.query.all()} == {"pending"}
+        failures = app.extensions["metrics"].snapshot()["counters"]["email_send_failures_total"]
+        assert [f["labels"]["stage"] for f in failures] == ["connect"]
+        assert failures[0]["labels"]["source"] == "outbox"
+
+    def test_drain_respects_batch_size(self, app, smtp_server):
+        """Test draining keeps going batch after batch."""
+        queue("a@test.com", "b@test.com", "c@test.com")
+
+        assert drain_outbox(batch_size=2) == (3, 0)
+        assert smtp_server.connections == 2
+
+    def test_delivery_metrics(self, app, smtp_server):
+        """Test sends through the outbox are timed and their queue delay recorded."""
+        queue("a@test.com", "b@test.com")
+
+        deliver_pending()
+
+        registry = app.extensions["metrics"]
+        assert registry.value("email_sent_total", source="outbox") == 2
+        assert registry.histogram("email_send_seconds", source="outbox").count == 2
+        assert registry.histogram("email_outbox_delay_seconds").count == 2
+
+    def test_backlog_gauges(self, app, admin_client):
+        """Test the metrics endpoint reports outbox depth and the oldest pending age."""
+        queue("a@test.com", "b@test.com")
+        OutboxEmail.query.filter_by(
+            recipient="a@test.com"
+        ).one().created_at = datetime.utcnow() - timedelta(minutes=10)
+        db.session.add(
+            OutboxEmail(recipient="c@test.com", subject="S", text_body="B", status="failed")
+        )
+        db.session.commit()
+
+        gauges = admin_client.get("/api/admin/metrics").get_json()["gauges"]
+
+        depth = {g["labels"]["status"]: g["value"] for g in gauges["email_outbox_depth"]}
+        assert depth == {"pending": 2, "failed": 1}
+        assert 590 < gauges["email_outbox_oldest_pending_seconds"][0]["value"] < 700
+
+    def test_empty_backlog_gauges(self, app):
+        """Test an empty outbox reports zero depth and age."""
+        registry = app.extensions["metrics"]
+        registry.snapshot()
+
+        assert registry.gauge("email_outbox_depth", status="pending") == 0
+        assert registry.gauge("email_outbox_oldest_pending_seconds") == 0
+
+    def test_retry_delay(self):
+        """Test the backoff doubles up to the cap."""
+        assert [retry_delay(n, 30, 100) for n in (1, 2, 3, 4)] == [30, 60, 100, 100]
+
+    def test_cli_drain(self, app, runner, smtp_server):
+        """Test the outbox drain command."""
+        queue("a@test.com")
+
+        result = runner.invoke(args=["outbox", "drain"])
+
+        assert result.exit_code == 0
+        assert "Sent 1 emails, 0 failed." in result.output
+
+
+class TestOutboxWorker:
+    """Test the background worker thread."""
+
+    def test_worker_delivers_in_background(self, app, smtp_server):
+        """Test the worker drains queued email without a request waiting on it."""
+        app.config["OUTBOX_POLL_INTERVAL"] = 0.05
+        queue("a@test.com")
+
+        worker = OutboxWorker(app)
+        worker.ensure_started()
+        worker.ensure_started()
+        try:
+            for _ in range(100):
+                if smtp_server.messages:
+                    break
+                worker._stop.wait(0.05)
+        finally:
+            worker.stop(timeout=5)
+
+        assert len(smtp_server.messages) == 1
+
+    def test_worker_started_by_first_request(self, monkeypatch):
+        """Test apps with the worker enabled start it on the first request."""
+        import app as app_package
+        from app import create_app
+
+        class WorkerConfig(app_package.config["testing"]):
+            OUTBOX_WORKER_ENABLED = True
+            OUTBOX_POLL_INTERVAL = 60
+
+        monkeypatch.setitem(app_package.config, "worker-test", WorkerConfig)
+        app = create_app("worker-test")
+
+        worker = app.extensions["outbox_worker"]
+        assert worker._thread is None
+
+        app.test_client().get("/login")
+
+        assert worker._thread.is_alive()
+        worker.stop(timeout=5)
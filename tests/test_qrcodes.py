@@ -0,0 +1,282 @@
+"""Tests for cached, content-addressed check-in QR codes."""
+
+import os
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Event
+from app.qrcodes import checkin_payload, qr_code_bytes, qr_code_url, qr_digest, render_qr
+
+
+class TestQRCodeCache:
+    """Test rendering and the memory/disk cache."""
+
+    def test_digest_depends_on_payload_and_format(self):
+        """Test every distinct image gets a distinct address."""
+        payload = "https://example.test/check-in?event=1"
+
+        assert qr_digest(payload, "png") == qr_digest(payload, "png")
+        assert qr_digest(payload, "png") != qr_digest(payload, "svg")
+        assert qr_digest(payload, "png") != qr_digest(payload + "0", "png")
+
+    def test_render_formats(self):
+        """Test PNG and SVG output."""
+        assert render_qr("hello", "png").startswith(b"\x89PNG")
+        svg = render_qr("hello", "svg")
+        assert b"<svg" in svg and b"<path" in svg
+
+    def test_rendered_once_then_served_from_cache(self, app, monkeypatch):
+        """Test a second lookup neither renders nor reads the disk."""
+        import app.qrcodes as qrcodes
+
+        calls = []
+        real_render = qrcodes.render_qr
+        monkeypatch.setattr(
+            qrcodes, "render_qr", lambda *args: calls.append(args) or real_render(*args)
+        )
+        payload = "https://example.test/check-in?event=7"
+
+        digest, data = qr_code_bytes(payload)
+        assert os.path.exists(os.path.join(app.config["MEDIA_ROOT"], "qrcodes", f"{digest}.png"))
+        assert qr_code_bytes(payload) == (digest, data)
+        assert len(calls) == 1
+
+    def test_disk_survives_memory_eviction(self, app, monkeypatch):
+        """Test a worker with a cold memory cache reuses the file on disk."""
+        import app.qrcodes as qrcodes
+
+        payload = "https://example.test/check-in?event=8"
+        digest, data = qr_code_bytes(payload)
+        app.extensions["qr_cache"].clear()
+        monkeypatch.setattr(qrcodes, "render_qr", None)  # would fail if called
+
+        assert qr_code_bytes(payload) == (digest, data)
+
+
+class TestQRCodeEndpoints:
+    """Test the QR code API and image serving."""
+
+    def test_create_event_renders_in_background(self, app, admin_client, department):
+        """Test create_event stores the image URL and the task renders the PNG."""
+        start = datetime.utcnow() + timedelta(days=1)
+        response = admin_client.post(
+            "/api/events",
+            json={
+                "title": "QR Event",
+                "start_time": start.isoformat(),
+                "end_time": (start + timedelta(hours=1)).isoformat(),
+                "department_id": department.id,
+            },
+        )
+
+        data = response.get_json()["event"]
+        payload = checkin_payload(db.session.get(Event, data["id"]))
+        assert data["qr_code_path"] == qr_code_url(data["id"], payload)
+        digest = qr_digest(payload, "png")
+        assert os.path.exists(os.path.join(app.config["MEDIA_ROOT"], "qrcodes", f"{digest}.png"))
+
+    def test_qr_code_json_links_png_and_svg(self, admin_client, event):
+        """Test the QR code endpoint returns image URLs without rendering."""
+        data = admin_client.get(f"/api/events/{event.id}/qr-code").get_json()
+
+        assert data["qr_code"].endswith(".png")
+        assert data["qr_code_svg"].endswith(".svg")
+        assert data["event_title"] == "Test Event"
+
+    def test_image_served_with_immutable_caching(self, client, event):
+        """Test images carry an ETag and a far-future immutable Cache-Control."""
+        url = qr_code_url(event.id, checkin_payload(event))
+
+        response = client.get(url)
+
+        assert response.status_code == 200
+        assert response.content_type == "image/png"
+        assert response.data.startswith(b"\x89PNG")
+        assert response.headers["ETag"] == f'"{qr_digest(checkin_payload(event), "png")}"'
+        cache_control = response.headers["Cache-Control"]
+        assert "immutable" in cache_control and "max-age=31536000" in cache_control
+
+        revalidated = client.get(url, headers={"If-None-Match": response.headers["ETag"]})
+        assert revalidated.status_code == 304
+        assert revalidated.data == b""
+
+    def test_svg_variant(self, client, event):
+        """Test the SVG variant is served as SVG."""
+        response = client.get(qr_code_url(event.id, checkin_payload(event), "svg"))
+
+        assert response.status_code == 200
+        assert response.content_type == "image/svg+xml"
+        assert b"<svg" in response.data
+
+    def test_stale_digest_or_format_not_found(self, client, event):
+        """Test URLs that do not match the event's payload are rejected."""
+        stale = qr_code_url(event.id, "https://old.example/check-in?event=1")
+        wrong_format = qr_code_url(event.id, checkin_payload(event)).replace(".png", ".gif")
+
+        assert client.get(stale).status_code == 404
+        assert client.get(wrong_format).status_code == 404
+        assert client.get(qr_code_url(9999, checkin_payload(event))).status_code == 404
+
+    def test_update_event_times_reissues_code(self, admin_client, event):
+        """Test retiming an event moves its QR code to a new signed payload."""
+        old_url = qr_code_url(event.id, checkin_payload(event))
+
+        response = admin_client.put(
+            f"/api/events/{event.id}",
+            json={"end_time": (event.end_time + timedelta(hours=1)).isoformat()},
+        )
+
+        new_url = response.get_json()["event"]["qr_code_path"]
+        assert new_url == qr_code_url(event.id, checkin_payload(event)) != old_url
+        assert admin_client.get(old_url).status_code == 404
+        assert admin_client.get(new_url).status_code == 200
+
+    def test_making_event_recur_reissues_code(self, admin_client, event):
+        """Test a PUT that adds a recurrence rule keeps the QR image resolvable."""
+        response = admin_client.put(
+            f"/api/events/{event.id}", json={"recurrence_rule": "FREQ=WEEKLY;COUNT=4"}
+        )
+
+        new_url = response.get_json()["event"]["qr_code_path"]
+        assert new_url == qr_code_url(event.id, checkin_payload(event))
+        assert admin_client.get(new_url).status_code == 200
+
+    def test_rotating_code(self, app, admin_client, event):
+        """Test rotating codes are short-lived and kept out of the disk cache."""
+        data = admin_client.get(f"/api/events/{event.id}/qr-code?rotating=true").get_json()
+
+        assert 0 < data["refresh_in"] <= app.config["CHECKIN_TOKEN_ROTATION"]
+        assert data["qr_code"] != qr_code_url(event.id, checkin_payload(event))
+
+        response = admin_client.get(data["qr_code"])
+        assert response.status_code == 200
+        assert "immutable" not in response.headers["Cache-Control"]
+        assert response.cache_control.max_age == 2 * app.config["CHECKIN_TOKEN_ROTATION"]
+        assert not os.path.exists(app.config["MEDIA_ROOT"])
+
+    def test_rotating_code_disabled(self, app, admin_client, event):
+        """Test ``rotating`` is ignored when rotation is switched off."""
+        app.config["CHECKIN_TOKEN_ROTATION"] = 0
+
+        data = admin_client.get(f"/api/events/{event.id}/qr-code?rotating=true").get_json()
+
+        assert "refresh_in" not in data
+        assert data["qr_code"] == qr_code_url(event.id, checkin_payload(event))
+
+
+def make_events(department, admin_user, count, days=1):
+    start = datetime.utcnow() + timedelta(days=days)
+    events = [
+        Event(
+            title=f"Orientation {i}",
+            start_time=start + timedelta(hours=i),
+            end_time=start + timedelta(hours=i + 1),
+            department_id=department.id,
+            created_by=admin_user.id,
+        )
+        for i in range(count)
+    ]
+    db.session.add_all(events)
+    db.session.commit()
+    return events
+
+
+class TestQRCodeExport:
+    """Test batch export of QR codes as a streamed ZIP."""
+
+    def test_stream_zip_across_process_pool(self, app, department, admin_user):
+        """Test a pool-rendered archive holds one valid image per event, in order."""
+        import io
+        import zipfile
+
+        from app.qrcodes import find_events, stream_qr_zip
+
+        events = make_events(department, admin_user, 5)
+        chunks = list(stream_qr_zip(find_events(), "png", workers=2, chunk_size=2))
+
+        assert len(chunks) > 5  # streamed entry by entry, not built in one piece
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+        assert archive.namelist() == [
+            f"event-{e.id}-Orientation_{i}.png" for i, e in enumerate(events)
+        ]
+        payload = checkin_payload(events[0])
+        assert archive.read(archive.namelist()[0]) == qr_code_bytes(payload)[1]
+
+    def test_export_endpoint(self, admin_client, department, admin_user):
+        """Test admins can download a department's QR codes as SVG."""
+        import io
+        import zipfile
+
+        make_events(department, admin_user, 3)
+
+        response = admin_client.get(
+            f"/api/events/qr-codes?department_id={department.id}&format=svg"
+        )
+
+        assert response.status_code == 200
+        assert response.mimetype == "application/zip"
+        assert "qr-codes-svg.zip" in response.headers["Content-Disposition"]
+        names = zipfile.ZipFile(io.BytesIO(response.data)).namelist()
+        assert len(names) == 3 and all(name.endswith(".svg") for name in names)
+
+    def test_export_by_ids_and_dates(self, admin_client, department, admin_user):
+        """Test selecting events by id list and by date range."""
+        import io
+        import zipfile
+
+        events = make_events(department, admin_user, 3)
+        later = make_events(department, admin_user, 1, days=20)
+
+        # Read each streamed body before the next request closes its context
+        by_ids = admin_client.get(f"/api/events/qr-codes?ids={events[0].id},{events[2].id}").data
+        start = (datetime.utcnow() + timedelta(days=10)).isoformat()
+        by_date = admin_client.get(f"/api/events/qr-codes?start_date={start}").data
+
+        assert len(zipfile.ZipFile(io.BytesIO(by_ids)).namelist()) == 2
+        assert zipfile.ZipFile(io.BytesIO(by_date)).namelist() == [
+            f"event-{later[0].id}-Orientation_0.png"
+        ]
+
+    def test_export_validation(self, app, admin_client, department, admin_user):
+        """Test bad selections are rejected before anything is rendered."""
+        make_events(department, admin_user, 2)
+
+        assert admin_client.get("/api/events/qr-codes").status_code == 400
+        assert admin_client.get("/api/events/qr-codes?ids=x").status_code == 400
+        assert admin_client.get("/api/events/qr-codes?ids=1&format=gif").status_code == 400
+        assert admin_client.get("/api/events/qr-codes?ids=9999").status_code == 404
+
+        app.config["QR_BATCH_MAX_EVENTS"] = 1
+        too_many = admin_client.get(f"/api/events/qr-codes?department_id={department.id}")
+        assert too_many.status_code == 400
+
+    def test_dept_admin_limited_to_own_department(self, dept_admin_client, department):
+        """Test department admins export only their department."""
+        from app.models import Department
+
+        other = Department(name="Other")
+        db.session.add(other)
+        db.session.commit()
+
+        response = dept_admin_client.get(f"/api/events/qr-codes?department_id={other.id}")
+
+        assert response.status_code == 403
+
+    def test_students_cannot_export(self, authenticated_client):
+        """Test students are rejected."""
+        assert authenticated_client.get("/api/events/qr-codes?ids=1").status_code == 403
+
+    def test_cli_export(self, app, runner, department, admin_user, tmp_path):
+        """Test the qr export command writes a ZIP."""
+        import zipfile
+
+        events = make_events(department, admin_user, 2)
+        output = tmp_path / "sheet.zip"
+
+        result = runner.invoke(
+            args=["qr", "export", str(output), "--event-id", str(events[1].id), "--workers", "1"]
+        )
+
+        assert result.exit_code == 0
+        assert "Exported 1 QR codes." in result.output
+        assert zipfile.ZipFile(output).namelist() == [f"event-{events[1].id}-Orientation_1.png"]
@@ -0,0 +1,195 @@
+"""Tests for login throttling."""
+
+from app.ratelimit import LoginThrottle, MemoryBackend, RedisBackend, backend_from_url
+
+
+class FakeRedis:
+    """Local stand-in for the handful of Redis sorted-set commands we use."""
+
+    def __init__(self):
+        self.sets = {}
+        self.expiry = {}
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def zremrangebyscore(self, key, low, high):
+        members = self.sets.setdefault(key, {})
+        for member in [m for m, score in members.items() if low <= score <= high]:
+            del members[member]
+
+    def zadd(self, key, mapping):
+        self.sets.setdefault(key, {}).update(mapping)
+
+    def zcard(self, key):
+        return len(self.sets.get(key, {}))
+
+    def expire(self, key, seconds):
+        self.expiry[key] = seconds
+
+    def zrem(self, key, member):
+        self.sets.get(key, {}).pop(member, None)
+
+    def zrange(self, key, start, end, withscores=False):
+        ordered = sorted(self.sets.get(key, {}).items(), key=lambda item: item[1])
+        return ordered[start : end + 1]
+
+
+class FakePipeline:
+    """Queues commands and runs them on ``execute``."""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((getattr(self.client, name), args, kwargs))
+
+        return queue
+
+    def execute(self):
+        return [method(*args, **kwargs) for method, args, kwargs in self.calls]
+
+
+class TestBackends:
+    """Test the sliding-window backends."""
+
+    def test_memory_backend_window_slides(self):
+        """Test old hits fall out of the window."""
+        backend = MemoryBackend()
+
+        assert backend.hit("k", 2, 10, now=0) == 0
+        assert backend.hit("k", 2, 10, now=4) == 0
+        assert backend.hit("k", 2, 10, now=5) == 5
+        assert backend.hit("k", 2, 10, now=10) == 0
+
+    def test_memory_backend_sweeps_idle_keys(self):
+        """Test keys with no recent hits are eventually dropped."""
+        backend = MemoryBackend()
+        backend.sweep_interval = 3
+
+        backend.hit("old", 5, 10, now=0)
+        backend.hit("new", 5, 10, now=20)
+        backend.hit("new", 5, 10, now=21)
+
+        assert "old" not in backend._hits
+        assert "new" in backend._hits
+
+    def test_redis_backend_window_slides(self):
+        """Test the shared backend against a local stand-in."""
+        client = FakeRedis()
+        backend = RedisBackend(client)
+
+        assert backend.hit("k", 2, 10, now=0) == 0
+        assert backend.hit("k", 2, 10, now=4) == 0
+        assert backend.hit("k", 2, 10, now=5) == 5
+        assert client.zcard("mulespace:ratelimit:k") == 2
+        assert client.expiry["mulespace:ratelimit:k"] == 10
+        assert backend.hit("k", 2, 10, now=10) == 0
+
+    def test_redis_backend_zero_limit(self):
+        """Test a zero limit rejects without a previous hit to wait on."""
+        backend = RedisBackend(FakeRedis())
+        assert backend.hit("k", 0, 10, now=0) == 10
+
+    def test_backend_from_url(self):
+        """Test the default backend is in-process."""
+        assert isinstance(backend_from_url(None), MemoryBackend)
+        assert isinstance(backend_from_url("memory://"), MemoryBackend)
+
+
+class TestLoginThrottle:
+    """Test per-IP and per-account limits."""
+
+    def make_throttle(self, ip_limit=3, account_limit=2):
+        self.now = 0
+        return LoginThrottle(
+            MemoryBackend(), ip_limit, account_limit, window=60, timer=lambda: self.now
+        )
+
+    def test_account_limit(self):
+        """Test an account is limited regardless of letter case."""
+        throttle = self.make_throttle()
+
+        assert throttle.check("1.1.1.1", "a@b.com") is None
+        assert throttle.check("2.2.2.2", "A@B.com") is None
+        assert throttle.check("3.3.3.3", "a@b.com ") == ("account", 60)
+
+    def test_ip_limit(self):
+        """Test an address is limited across accounts."""
+        throttle = self.make_throttle()
+
+        for account in ("a@b.com", "c@d.com", "e@f.com"):
+            assert throttle.check("1.1.1.1", account) is None
+        self.now = 30
+        assert throttle.check("1.1.1.1", "g@h.com") == ("ip", 30)
+
+
+class TestLoginThrottling:
+    """Test throttling on the login endpoints."""
+
+    def test_login_throttled_before_hashing(self, app, client, student_user, monkeypatch):
+        """Test over-limit attempts are rejected without checking the password."""
+        from app.models import User
+
+        app.config["LOGIN_RATE_LIMIT_PER_ACCOUNT"] = 2
+        app.extensions["login_throttle"] = LoginThrottle.from_config(app.config)
+
+        for _ in range(2):
+            response = client.post(
+                "/api/auth/login", json={"email": "student@test.com", "password": "wrong"}
+            )
+            assert response.status_code == 401
+
+        def fail(*args, **kwargs):  # pragma: no cover - must not be reached
+            raise AssertionError("password checked while throttled")
+
+        monkeypatch.setattr(User, "check_password", fail)
+        response = client.post(
+            "/api/auth/login", json={"email": "student@test.com", "password": "password123"}
+        )
+
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) > 0
+        assert app.extensions["metrics"].value("auth_login_throttled_total", scope="account") == 1
+
+    def test_token_endpoint_throttled(self, app, client, student_user):
+        """Test the token endpoint shares the login limits."""
+        app.config["LOGIN_RATE_LIMIT_PER_IP"] = 1
+        app.extensions["login_throttle"] = LoginThrottle.from_config(app.config)
+
+        client.post("/api/auth/token", json={"email": "x@test.com", "password": "wrong"})
+        response = client.post(
+            "/api/auth/token", json={"email": "student@test.com", "password": "password123"}
+        )
+
+        assert response.status_code == 429
+        assert app.extensions["metrics"].value("auth_login_throttled_total", scope="ip") == 1
+
+    def test_ip_limit_uses_forwarded_address(self, monkeypatch):
+        """Test clients behind the router are limited by their own address."""
+        from app import config, create_app, db
+
+        monkeypatch.setattr(config["testing"], "TRUSTED_PROXY_COUNT", 1)
+        monkeypatch.setattr(config["testing"], "LOGIN_RATE_LIMIT_PER_IP", 1)
+        app = create_app("testing")
+        client = app.test_client()
+
+        def login(address):
+            return client.post(
+                "/api/auth/login",
+                json={"email": "nobody@test.com", "password": "wrong"},
+                headers={"X-Forwarded-For": address},
+                environ_base={"REMOTE_ADDR": "10.0.0.1"},  # the router
+            )
+
+        with app.app_context():
+            db.create_all()
+            try:
+                assert login("203.0.113.5").status_code == 401
+                assert login("198.51.100.7").status_code == 401
+                assert login("203.0.113.5").status_code == 429
+            finally:
+                db.session.remove()
+                db.drop_all()
@@ -0,0 +1,181 @@
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app.models import Event, EventException
+from app.recurrence import (
+    expand,
+    format_rule,
+    is_occurrence,
+    occurrences,
+    parse_rule,
+    series_conditions,
+    set_recurrence,
+)
+
+MONDAY = datetime(2031, 3, 3, 15)  # series in these tests start on a Monday
+
+
+def starts(event, window_start, window_end, exceptions=None):
+    return [
+        occurrence.start_time
+        for occurrence in occurrences(event, window_start, window_end, exceptions)
+    ]
+
+
+class TestParseRule:
+    """Test the supported RRULE subset."""
+
+    def test_round_trip(self):
+        """Test rules are normalized to a canonical string."""
+        rule = parse_rule("RRULE:freq=weekly;byday=we,mo;interval=2;until=20311215")
+
+        assert rule.byday == (0, 2)
+        assert rule.until == datetime(2031, 12, 15, 23, 59, 59, 999999)
+        assert format_rule(rule) == "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE;UNTIL=20311215T235959"
+        assert format_rule(parse_rule("FREQ=DAILY;COUNT=5")) == "FREQ=DAILY;COUNT=5"
+
+    @pytest.mark.parametrize(
+        "text, message",
+        [
+            ("FREQ=YEARLY", "FREQ must be one of"),
+            ("FREQ=DAILY;BYHOUR=9", "Unsupported recurrence rule part: BYHOUR"),
+            ("FREQ=DAILY;;", "Invalid recurrence rule part"),
+            ("FREQ=DAILY;INTERVAL=x", "whole numbers"),
+            ("FREQ=DAILY;INTERVAL=0", "INTERVAL must be at least 1"),
+            ("FREQ=DAILY;COUNT=5000", "COUNT must be between"),
+            ("FREQ=DAILY;COUNT=2;UNTIL=20310101", "not both"),
+            ("FREQ=DAILY;BYDAY=MO", "only supported for weekly"),
+            ("FREQ=WEEKLY;BYDAY=1MO", "weekday codes"),
+            ("FREQ=DAILY;UNTIL=tomorrow", "UNTIL must look like"),
+        ],
+    )
+    def test_invalid_rules(self, text, message):
+        """Test unsupported or malformed rules are rejected with a reason."""
+        with pytest.raises(ValueError, match=message):
+            parse_rule(text)
+
+
+class TestExpansion:
+    """Test occurrences are computed for a window."""
+
+    def test_weekly_byday(self, app, make_event):
+        """Test a weekly rule on several days, bounded by COUNT."""
+        event = make_event(start=MONDAY, rule="FREQ=WEEKLY;BYDAY=MO,WE;COUNT=5")
+
+        assert starts(event, datetime(2031, 1, 1), datetime(2032, 1, 1)) == [
+            datetime(2031, 3, 3, 15),
+            datetime(2031, 3, 5, 15),
+            datetime(2031, 3, 10, 15),
+            datetime(2031, 3, 12, 15),
+            datetime(2031, 3, 17, 15),
+        ]
+        assert event.recurrence_end == datetime(2031, 3, 17, 16)
+
+    def test_window_skips_to_its_period(self, app, monkeypatch, make_event):
+        """Test an open-ended series is not walked from its first occurrence."""
+        import app.recurrence as recurrence
+
+        event = make_event(start=MONDAY, rule="FREQ=DAILY;INTERVAL=2")
+        assert event.recurrence_end is None
+
+        calls = []
+        real = recurrence._period_starts
+
+        def period_starts(*args):
+            calls.append(args)
+            return real(*args)
+
+        monkeypatch.setattr(recurrence, "_period_starts", period_starts)
+        found = starts(event, datetime(2131, 3, 3), datetime(2131, 3, 9))
+
+        assert len(found) == 3
+        assert all(start.hour == 15 for start in found)
+        assert len(calls) < 6
+
+    def test_window_overlap(self, app, make_event):
+        """Test an occurrence already running at the window's start is included."""
+        event = make_event(start=MONDAY, hours=3, rule="FREQ=DAILY")
+
+        assert starts(event, datetime(2031, 3, 10, 17), datetime(2031, 3, 11)) == [
+            datetime(2031, 3, 10, 15)
+        ]
+
+    def test_monthly_skips_short_months(self, app, make_event):
+        """Test a monthly rule on the 31st skips months without one."""
+        event = make_event(
+            "Office Hours", start=datetime(2031, 1, 31, 9), rule="FREQ=MONTHLY;UNTIL=20310731"
+        )
+
+        assert starts(event, datetime(2031, 1, 1), datetime(2032, 1, 1)) == [
+            datetime(2031, 1, 31, 9),
+            datetime(2031, 3, 31, 9),
+            datetime(2031, 5, 31, 9),
+            datetime(2031, 7, 31, 9),
+        ]
+        assert starts(event, datetime(2031, 5, 1), datetime(2031, 6, 1)) == [
+            datetime(2031, 5, 31, 9)
+        ]
+
+    def test_exceptions(self, app, make_event):
+        """Test cancelled occurrences are dropped and moved ones reported at their new times."""
+        event = make_event(start=MONDAY, rule="FREQ=WEEKLY")
+        db.session.add_all(
+            [
+                EventException(
+                    event_id=event.id, original_start=datetime(2031, 3, 10, 15), is_cancelled=True
+                ),
+                EventException(
+                    event_id=event.id,
+                    original_start=datetime(2031, 3, 17, 15),
+                    start_time=datetime(2031, 4, 1, 10),
+                    end_time=datetime(2031, 4, 1, 11),
+                ),
+            ]
+        )
+        db.session.commit()
+
+        march = [o.start_time for o in expand([event], datetime(2031, 3, 1), datetime(2031, 4, 1))]
+        april = list(expand([event], datetime(2031, 4, 1), datetime(2031, 4, 8)))
+
+        assert march == [
+            datetime(2031, 3, 3, 15),
+            datetime(2031, 3, 24, 15),
+            datetime(2031, 3, 31, 15),
+        ]
+        assert [(o.start_time, o.original_start) for o in april] == [
+            (datetime(2031, 4, 1, 10), datetime(2031, 3, 17, 15)),
+            (datetime(2031, 4, 7, 15), datetime(2031, 4, 7, 15)),
+        ]
+
+    def test_is_occurrence(self, app, make_event):
+        """Test only starts generated by the rule name an occurrence."""
+        event = make_event(start=MONDAY, rule="FREQ=WEEKLY;COUNT=3")
+
+        assert is_occurrence(event, datetime(2031, 3, 17, 15))
+        assert not is_occurrence(event, datetime(2031, 3, 17, 16))
+        assert not is_occurrence(event, datetime(2031, 3, 24, 15))
+
+    def test_series_conditions(self, app, make_event):
+        """Test a series that finished before a window is not selected for it."""
+        finished = make_event(start=MONDAY, rule="FREQ=DAILY;COUNT=3")
+        ongoing = make_event(start=MONDAY, rule="FREQ=DAILY")
+
+        selected = Event.query.filter(
+            *series_conditions(datetime(2031, 4, 1), datetime(2031, 5, 1))
+        ).all()
+
+        assert selected == [ongoing]
+        assert finished.recurrence_end == datetime(2031, 3, 5, 16)
+
+    def test_set_recurrence_validation(self, app, make_event):
+        """Test a rule must start with the event itself."""
+        with pytest.raises(ValueError, match="weekday of the first occurrence"):
+            make_event(start=MONDAY, rule="FREQ=WEEKLY;BYDAY=TU")
+        with pytest.raises(ValueError, match="UNTIL must not be before"):
+            make_event(start=MONDAY, rule="FREQ=DAILY;UNTIL=20300101")
+
+        event = make_event(start=MONDAY, rule="FREQ=DAILY")
+        set_recurrence(event, None)
+        assert event.recurrence_rule is None and event.recurrence_end is None
@@ -0,0 +1,251 @@
+"""Tests for scheduled event reminders."""
+
+from datetime import datetime, timedelta
+
+from app import db
+from app.claims import claim_one_by_one
+from app.models import Attendance, Notification, OutboxEmail, ReminderDispatch
+from app.reminders import DISPATCH_KEY, ReminderScheduler, describe_offset, send_due_reminders
+
+
+def register(event, *users):
+    db.session.add_all(Attendance(event_id=event.id, user_id=user.id) for user in users)
+    db.session.commit()
+
+
+class TestSendDueReminders:
+    """Test finding due events and claiming reminders."""
+
+    def test_reminds_attendees_once(self, app, admin_user, student_user, make_event):
+        """Test attendees get a notification and an email, and only once."""
+        event = make_event(
+            "Reminder Event", starts_in=timedelta(hours=23, minutes=30), location="Lovejoy 100"
+        )
+        register(event, student_user, admin_user)
+
+        assert send_due_reminders() == 2
+        assert send_due_reminders() == 0
+
+        notification = Notification.query.filter_by(user_id=student_user.id).one()
+        assert notification.notification_type == "reminder"
+        assert notification.title == "Reminder: Reminder Event"
+        assert notification.message == "Reminder Event starts in 24 hours."
+
+        email = OutboxEmail.query.filter_by(recipient="student@test.com").one()
+        assert email.subject == "Reminder: Reminder Event starts in 24 hours"
+        assert "Hi Test," in email.text_body
+        assert "Lovejoy 100" in email.html_body
+        assert ReminderDispatch.query.count() == 2
+
+    def test_each_offset_sent_as_event_approaches(self, app, student_user, make_event):
+        """Test the 24h and 1h reminders are separate deliveries."""
+        event = make_event(starts_in=timedelta(hours=24, minutes=30))
+        register(event, student_user)
+
+        assert send_due_reminders() == 0
+        assert send_due_reminders(now=datetime.utcnow() + timedelta(minutes=45)) == 1
+        assert send_due_reminders(now=datetime.utcnow() + timedelta(hours=2)) == 0
+        assert send_due_reminders(now=datetime.utcnow() + timedelta(hours=23, minutes=45)) == 1
+        assert send_due_reminders(now=datetime.utcnow() + timedelta(hours=24)) == 0
+
+        offsets = {row.offset_minutes for row in ReminderDispatch.query.all()}
+        assert offsets == {24 * 60, 60}
+        assert OutboxEmail.query.count() == 2
+
+    def test_late_registration_gets_nearest_reminder_only(self, app, student_user, make_event):
+        """Test an event already inside the 1h window does not also get the 24h one."""
+        event = make_event(starts_in=timedelta(minutes=30))
+        register(event, student_user)
+
+        assert send_due_reminders() == 1
+        assert ReminderDispatch.query.one().offset_minutes == 60
+        assert "starts in 1 hour" in OutboxEmail.query.one().subject
+
+    def test_missed_reminder_not_sent_late(self, app, student_user, make_event):
+        """Test an event created two hours out skips the 24h reminder for the 1h one."""
+        event = make_event(starts_in=timedelta(hours=2))
+        register(event, student_user)
+
+        assert send_due_reminders() == 0
+        assert send_due_reminders(now=datetime.utcnow() + timedelta(minutes=90)) == 1
+        assert ReminderDispatch.query.one().offset_minutes == 60
+        assert "starts in 1 hour" in OutboxEmail.query.one().subject
+
+    def test_compared_on_campus_clock(self, app, student_user, make_event):
+        """Test start times are read as campus wall-clock times, not UTC."""
+        from zoneinfo import ZoneInfo
+
+        app.config["EVENT_TIMEZONE"] = "Etc/GMT+4"  # UTC-4, without daylight saving
+        local_now = datetime.now(ZoneInfo("Etc/GMT+4")).replace(tzinfo=None)
+        soon = make_event(starts_in=timedelta(0), title="Soon")
+        soon.start_time = local_now + timedelta(minutes=30)
+        # 30 minutes after UTC now is four and a half hours away on campus
+        later = make_event(starts_in=timedelta(minutes=30), title="Later")
+        db.session.commit()
+        register(soon, student_user)
+        register(later, student_user)
+
+        assert send_due_reminders() == 1
+        assert ReminderDispatch.query.one().event_id == soon.id
+
+    def test_skips_out_of_window_inactive_and_past(self, app, student_user, make_event):
+        """Test only active events starting inside a window are considered."""
+        far = make_event(starts_in=timedelta(days=3))
+        cancelled = make_event(starts_in=timedelta(hours=3), is_active=False)
+        started = make_event(starts_in=timedelta(minutes=-5))
+        register(far, student_user)
+        register(cancelled, student_user)
+        register(started, student_user)
+
+        assert send_due_reminders() == 0
+        assert Notification.query.count() == 0
+
+    def test_skips_inactive_users(self, app, student_user, make_event):
+        """Test deactivated accounts are not reminded."""
+        event = make_event(starts_in=timedelta(minutes=30))
+        register(event, student_user)
+        student_user.is_active = False
+        db.session.commit()
+
+        assert send_due_reminders() == 0
+
+    def test_claimed_elsewhere_is_not_resent(self, app, admin_user, student_user, make_event):
+        """Test a ledger row written by another worker wins the race."""
+        event = make_event(starts_in=timedelta(minutes=30))
+        register(event, student_user, admin_user)
+        db.session.add(
+            ReminderDispatch(
+                event_id=event.id,
+                occurrence_start=event.start_time,
+                user_id=student_user.id,
+                offset_minutes=60,
+            )
+        )
+        db.session.commit()
+
+        assert send_due_reminders() == 1
+        assert OutboxEmail.query.one().recipient == "admin@test.com"
+
+    def test_claim_fallback_skips_duplicates(self, app, admin_user, student_user, make_event):
+        """Test the portable claim path returns only new rows."""
+        event = make_event(starts_in=timedelta(hours=3))
+        start = event.start_time
+        row = {
+            "event_id": event.id,
+            "occurrence_start": start,
+            "user_id": student_user.id,
+            "offset_minutes": 60,
+        }
+        other = {**row, "user_id": admin_user.id}
+
+        assert claim_one_by_one(ReminderDispatch, [row], DISPATCH_KEY) == {
+            (event.id, start, student_user.id, 60)
+        }
+        assert claim_one_by_one(ReminderDispatch, [row, other], DISPATCH_KEY) == {
+            (event.id, start, admin_user.id, 60)
+        }
+        assert ReminderDispatch.query.count() == 2
+
+    def test_rescheduled_event_reminded_again(self, app, student_user, make_event):
+        """Test moving an event to a new start sends reminders for the new time."""
+        event = make_event(starts_in=timedelta(minutes=30))
+        register(event, student_user)
+        assert send_due_reminders() == 1
+
+        event.start_time += timedelta(minutes=15)
+        event.end_time += timedelta(minutes=15)
+        db.session.commit()
+
+        assert send_due_reminders() == 1
+        assert ReminderDispatch.query.count() == 2
+
+    def test_each_occurrence_of_a_series(self, app, student_user, make_event):
+        """Test registrants of a recurring series are reminded of every occurrence."""
+        from app.models import EventException
+
+        weekly = make_event(
+            "Weekly Lab", starts_in=timedelta(days=-7, minutes=30), rule="FREQ=WEEKLY"
+        )
+        db.session.add(
+            EventException(
+                event_id=weekly.id,
+                original_start=weekly.start_time + timedelta(weeks=2),
+                is_cancelled=True,
+            )
+        )
+        db.session.commit()
+        register(weekly, student_user)
+        now = datetime.utcnow()
+
+        assert send_due_reminders(now=now) == 1
+        assert send_due_reminders(now=now) == 0
+        assert send_due_reminders(now=now + timedelta(weeks=1)) == 0  # cancelled
+        assert send_due_reminders(now=now + timedelta(weeks=2)) == 1
+
+        dispatches = ReminderDispatch.query.order_by(ReminderDispatch.occurrence_start).all()
+        assert [row.occurrence_start for row in dispatches] == [
+            weekly.start_time + timedelta(weeks=1),
+            weekly.start_time + timedelta(weeks=3),
+        ]
+        first = OutboxEmail.query.order_by(OutboxEmail.id).first()
+        next_date = (weekly.start_time + timedelta(weeks=1)).strftime("%A, %B %d, %Y")
+        assert f"Date: {next_date}" in first.text_body
+
+    def test_describe_offset(self):
+        """Test lead times read naturally."""
+        assert describe_offset(24 * 60) == "24 hours"
+        assert describe_offset(60) == "1 hour"
+        assert describe_offset(90) == "90 minutes"
+        assert describe_offset(1) == "1 minute"
+
+    def test_cli_send(self, app, runner, student_user, make_event):
+        """Test the reminders send command."""
+        event = make_event(starts_in=timedelta(minutes=30))
+        register(event, student_user)
+
+        result = runner.invoke(args=["reminders", "send"])
+
+        assert result.exit_code == 0
+        assert "Sent 1 reminders." in result.output
+
+
+class TestReminderScheduler:
+    """Test the background scheduler thread."""
+
+    def test_scheduler_sends_in_background(self, app, student_user, make_event):
+        """Test the scheduler picks up due reminders on its own."""
+        app.config["REMINDER_INTERVAL"] = 0.05
+        event = make_event(starts_in=timedelta(minutes=30))
+        register(event, student_user)
+
+        scheduler = ReminderScheduler(app)
+        scheduler.ensure_started()
+        try:
+            for _ in range(100):
+                if db.session.query(ReminderDispatch.id).count():
+                    break
+                scheduler._stop.wait(0.05)
+        finally:
+            scheduler.stop(timeout=5)
+
+        assert Notification.query.filter_by(notification_type="reminder").count() == 1
+
+    def test_scheduler_started_by_first_request(self, monkeypatch):
+        """Test apps with the scheduler enabled start it on the first request."""
+        import app as app_package
+        from app import create_app
+
+        class SchedulerConfig(app_package.config["testing"]):
+            REMINDER_SCHEDULER_ENABLED = True
+            REMINDER_INTERVAL = 60
+
+        monkeypatch.setitem(app_package.config, "scheduler-test", SchedulerConfig)
+        app = create_app("scheduler-test")
+
+        scheduler = app.extensions["reminder_scheduler"]
+        assert scheduler._thread is None
+
+        app.test_client().get("/login")
+
+        assert scheduler._thread.is_alive()
+        scheduler.stop(timeout=5)
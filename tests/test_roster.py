@@ -0,0 +1,214 @@
+"""Tests for bulk roster import."""
+
+import io
+
+from app import db
+from app.models import User
+from app.roster import UNUSABLE_PASSWORD_PREFIX, import_roster
+
+
+def roster(*rows):
+    """Build CSV lines with a header row."""
+    return io.StringIO("\n".join(("email,name,password,department,role",) + rows) + "\n")
+
+
+class TestImportRoster:
+    """Test the import pipeline."""
+
+    def test_import_creates_users(self, app, department):
+        """Test valid rows are inserted with hashed passwords."""
+        report = import_roster(
+            roster(
+                "ada@colby.edu,Ada Lovelace,secret1,Computer Science,",
+                "alan@colby.edu,Alan,secret2,,department_admin",
+            ),
+            workers=1,
+        )
+
+        assert report == {"created": 2, "without_password": 0, "failed": 0, "errors": []}
+        ada = User.query.filter_by(email="ada@colby.edu").first()
+        assert ada.username == "ada"
+        assert ada.last_name == "Lovelace"
+        assert ada.department_id == department.id
+        assert ada.role == "student"
+        assert ada.check_password("secret1")
+        alan = User.query.filter_by(email="alan@colby.edu").first()
+        assert alan.last_name == ""
+        assert alan.role == "department_admin"
+
+    def test_import_with_process_pool(self, app):
+        """Test hashing across worker processes."""
+        report = import_roster(
+            roster("p1@colby.edu,P One,pw1,,", "p2@colby.edu,P Two,pw2,,"),
+            workers=2,
+        )
+
+        assert report["created"] == 2
+        assert User.query.filter_by(email="p2@colby.edu").first().check_password("pw2")
+
+    def test_import_without_password_is_unusable(self, app):
+        """Test rows without a password cannot log in."""
+        report = import_roster(roster("nopw@colby.edu,No Password,,,"), workers=1)
+
+        assert report["created"] == 1
+        assert report["without_password"] == 1
+        user = User.query.filter_by(email="nopw@colby.edu").first()
+        assert user.password_hash.startswith(UNUSABLE_PASSWORD_PREFIX)
+        assert not user.check_password("")
+
+    def test_import_first_and_last_name_columns(self, app, department):
+        """Test explicit name columns and department ids."""
+        lines = io.StringIO(
+            f"Email,First_Name,Last_Name,Department_ID\n"
+            f"grace@colby.edu,Grace,Hopper,{department.id}\n"
+        )
+        report = import_roster(lines, workers=1)
+
+        assert report["created"] == 1
+        grace = User.query.filter_by(email="grace@colby.edu").first()
+        assert (grace.first_name, grace.last_name) == ("Grace", "Hopper")
+        assert grace.department_id == department.id
+
+    def test_import_reports_row_errors(self, app, student_user):
+        """Test invalid rows are reported per line and skipped."""
+        report = import_roster(
+            roster(
+                "not-an-email,Bad Email,pw,,",
+                "student@test.com,Existing User,pw,,",
+                "dup@colby.edu,First Copy,,,",
+                "DUP@colby.edu,Second Copy,,,",
+                "noname@colby.edu,,,,",
+                "role@colby.edu,Bad Role,,,superuser",
+                "dept@colby.edu,Bad Dept,,Underwater Basketry,",
+            ),
+            workers=1,
+        )
+
+        assert report["created"] == 1
+        assert report["failed"] == 6
+        errors = {error["line"]: error["error"] for error in report["errors"]}
+        assert errors == {
+            2: "Invalid or missing email",
+            3: "Email already registered",
+            5: "Duplicate email in roster",
+            6: "Missing name",
+            7: "Invalid role: superuser",
+            8: "Unknown department: Underwater Basketry",
+        }
+
+    def test_import_resolves_username_clashes(self, app, student_user):
+        """Test usernames get numeric suffixes across the table and the file."""
+        db.session.add(
+            User(
+                email="student1@old.com",
+                username="student1",
+                first_name="Old",
+                last_name="Student",
+                password_hash="x",
+            )
+        )
+        db.session.commit()
+
+        report = import_roster(
+            roster(
+                "student@a.com,A,,,",
+                "student@b.com,B,,,",
+                "solo@a.com,Solo,,,",
+            ),
+            workers=1,
+            batch_size=2,
+        )
+
+        assert report["created"] == 3
+        usernames = {
+            u.email: u.username for u in User.query.filter(User.email.like("%@_.com")).all()
+        }
+        assert usernames["student@a.com"] == "student2"
+        assert usernames["student@b.com"] == "student3"
+        assert usernames["solo@a.com"] == "solo"
+
+    def test_import_isolates_conflicting_rows(self, app, monkeypatch):
+        """Test a batch that hits a constraint falls back to row-by-row inserts."""
+        from app import roster as roster_module
+
+        original = roster_module._RosterImporter._drop_existing_emails
+
+        def add_conflicting_user(self, rows):
+            kept = original(self, rows)
+            db.session.add(
+                User(
+                    email="race@colby.edu",
+                    username="racer",
+                    first_name="Race",
+                    last_name="Condition",
+                    password_hash="x",
+                )
+            )
+            db.session.commit()
+            return kept
+
+        monkeypatch.setattr(
+            roster_module._RosterImporter, "_drop_existing_emails", add_conflicting_user
+        )
+
+        report = import_roster(roster("race@colby.edu,Race,,,", "ok@colby.edu,Ok,,,"), workers=1)
+
+        assert report["created"] == 1
+        assert report["errors"] == [
+            {"line": 2, "email": "race@colby.edu", "error": "Conflicts with existing user"}
+        ]
+
+    def test_import_empty_roster(self, app):
+        """Test a header-only file creates nothing."""
+        assert import_roster(io.StringIO("email,name\n"), workers=1)["created"] == 0
+
+
+class TestImportEndpoint:
+    """Test the admin import endpoint and CLI."""
+
+    def test_import_upload(self, admin_client, app):
+        """Test uploading a roster file."""
+        app.config["ROSTER_IMPORT_WORKERS"] = 1
+        response = admin_client.post(
+            "/api/admin/users/import",
+            data={"file": (io.BytesIO(b"email,name\nup@colby.edu,Up Load\n"), "roster.csv")},
+            content_type="multipart/form-data",
+        )
+
+        assert response.status_code == 200
+        assert response.get_json()["created"] == 1
+
+    def test_import_raw_csv_body(self, admin_client, app):
+        """Test posting the roster as a text/csv body."""
+        app.config["ROSTER_IMPORT_WORKERS"] = 1
+        response = admin_client.post(
+            "/api/admin/users/import",
+            data=b"\xef\xbb\xbfemail,name\nraw@colby.edu,Raw Body\n",
+            content_type="text/csv",
+        )
+
+        assert response.status_code == 200
+        assert User.query.filter_by(email="raw@colby.edu").first() is not None
+
+    def test_import_requires_file(self, admin_client):
+        """Test a request without a roster is rejected."""
+        response = admin_client.post("/api/admin/users/import", json={})
+        assert response.status_code == 400
+
+    def test_import_unauthorized(self, dept_admin_client):
+        """Test only admins can import."""
+        response = dept_admin_client.post(
+            "/api/admin/users/import", data=b"", content_type="text/csv"
+        )
+        assert response.status_code == 403
+
+    def test_cli_import(self, app, runner, tmp_path):
+        """Test the roster import CLI command."""
+        path = tmp_path / "roster.csv"
+        path.write_text("email,name\ncli@colby.edu,Cli User\nbad,Bad\n")
+
+        result = runner.invoke(args=["roster", "import", str(path), "--workers", "1"])
+
+        assert result.exit_code == 0
+        assert "Created 1 users (1 without a password), 1 failed." in result.output
+        assert "line 3: bad: Invalid or missing email" in result.output
@@ -0,0 +1,143 @@
+from datetime import datetime, time, timedelta
+
+from app import db
+from app.models import Event
+from app.scheduling import closed_hours, free_slots
+
+
+def day(hour, minute=0, date=3):
+    return datetime(2031, 3, date, hour, minute)
+
+
+class TestFreeSlots:
+    """Test the sweep over sorted busy intervals."""
+
+    def test_gaps_between_overlapping_intervals(self):
+        """Test overlapping and nested intervals are swept in one pass."""
+        busy = [
+            (day(9), day(10)),
+            (day(9, 30), day(11)),
+            (day(9, 45), day(10, 15)),  # nested
+            (day(11, 30), day(12)),
+            (day(14), day(15)),
+        ]
+
+        slots = list(free_slots(busy, day(8), day(17), timedelta(minutes=45)))
+
+        assert slots == [(day(8), day(9)), (day(12), day(14)), (day(15), day(17))]
+
+    def test_short_gaps_and_range_edges(self):
+        """Test gaps shorter than the duration are skipped and busy time past the range ignored."""
+        busy = [(day(7), day(9)), (day(9, 30), day(10)), (day(18), day(19))]
+
+        slots = list(free_slots(busy, day(8), day(12), timedelta(hours=1)))
+
+        assert slots == [(day(10), day(12))]
+        assert list(free_slots([], day(8), day(9), timedelta(hours=2))) == []
+
+    def test_closed_hours(self):
+        """Test each night between closing and opening is busy."""
+        nights = list(closed_hours(day(12), day(12, date=4), time(8), time(22)))
+
+        assert nights == [
+            (day(22, date=2), day(8, date=3)),
+            (day(22, date=3), day(8, date=4)),
+        ]
+
+
+class TestAvailabilityRoute:
+    """Test the availability endpoint."""
+
+    url = "/api/calendar/availability?start=2031-03-03T00:00:00&end=2031-03-04T00:00:00"
+
+    def test_slots_within_opening_hours(self, admin_client, make_event):
+        """Test single events and recurring occurrences are both busy."""
+        make_event(start=day(9), hours=2)
+        make_event(start=day(13, date=1), rule="FREQ=DAILY")  # 13:00-14:00
+
+        response = admin_client.get(f"{self.url}&duration=60")
+
+        assert response.status_code == 200
+        assert response.get_json()["slots"] == [
+            {"start": "2031-03-03T08:00:00", "end": "2031-03-03T09:00:00"},
+            {"start": "2031-03-03T11:00:00", "end": "2031-03-03T13:00:00"},
+            {"start": "2031-03-03T14:00:00", "end": "2031-03-03T22:00:00"},
+        ]
+
+    def test_location_and_department_filters(self, admin_client, department, make_event):
+        """Test only events at the location (or of the department) count as busy."""
+        from app.models import Department
+
+        other = Department(name="Biology")
+        db.session.add(other)
+        db.session.commit()
+        make_event(start=day(9), hours=5, location=" Lovejoy 100 ")
+        make_event(start=day(15), hours=5, location="Olin 1", department=other)
+
+        at_lovejoy = admin_client.get(f"{self.url}&duration=60&location=lovejoy 100 ")
+        biology = admin_client.get(f"{self.url}&duration=60&department_id={other.id}")
+
+        assert at_lovejoy.get_json()["slots"] == [
+            {"start": "2031-03-03T08:00:00", "end": "2031-03-03T09:00:00"},
+            {"start": "2031-03-03T14:00:00", "end": "2031-03-03T22:00:00"},
+        ]
+        assert biology.get_json()["slots"] == [
+            {"start": "2031-03-03T08:00:00", "end": "2031-03-03T15:00:00"},
+            {"start": "2031-03-03T20:00:00", "end": "2031-03-03T22:00:00"},
+        ]
+
+    def test_semester_in_few_queries(self, app, admin_client, department, admin_user):
+        """Test a semester of events is read with a fixed number of queries."""
+        from sqlalchemy import event as sa_event
+        from sqlalchemy import insert
+
+        first = datetime(2031, 1, 13, 8)
+        db.session.execute(
+            insert(Event),
+            [
+                {
+                    "title": f"Event {i}",
+                    "start_time": first + timedelta(hours=i),
+                    "end_time": first + timedelta(hours=i, minutes=30),
+                    "department_id": department.id,
+                    "created_by": admin_user.id,
+                }
+                for i in range(0, 120 * 24, 3)
+            ],
+        )
+        db.session.commit()
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        sa_event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            response = admin_client.get(
+                "/api/calendar/availability?start=2031-01-13T00:00:00"
+                "&end=2031-05-13T00:00:00&duration=90"
+            )
+        finally:
+            sa_event.remove(db.engine, "before_cursor_execute", record)
+
+        assert response.status_code == 200
+        assert response.get_json()["count"] == 120 * 5  # the gaps 8:30-11, 11:30-14... 20:30-22
+        assert len([sql for sql in statements if "FROM events" in sql]) == 2
+
+    def test_validation(self, admin_client):
+        """Test the duration and range are required to be sensible."""
+        assert admin_client.get(self.url).status_code == 400
+        assert admin_client.get(f"{self.url}&duration=-5").status_code == 400
+        assert (
+            admin_client.get("/api/calendar/availability?duration=30&start=soon").status_code == 400
+        )
+        overlong = "/api/calendar/availability?duration=30&start=2031-01-01&end=2033-01-01"
+        assert admin_client.get(overlong).status_code == 400
+        too_long = admin_client.get(f"{self.url}&duration=1441")
+        assert too_long.status_code == 400
+        assert too_long.get_json()["error"] == "duration is longer than the date range"
+        assert admin_client.get(f"{self.url}&duration={10**12}").status_code == 400
+
+    def test_students_refused(self, authenticated_client):
+        """Test only event organizers can search for slots."""
+        assert authenticated_client.get(f"{self.url}&duration=30").status_code == 403
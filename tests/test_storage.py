@@ -0,0 +1,199 @@
+"""Tests for the media storage backends."""
+
+import io
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.storage import CHUNK_SIZE, LocalStorage, S3Storage, storage_from_config
+
+
+class NotFound(Exception):
+    """Shaped like botocore's ``ClientError`` for a missing key."""
+
+    def __init__(self):
+        super().__init__("Not Found")
+        self.response = {"Error": {"Code": "404"}}
+
+
+class FakeBody:
+    def __init__(self, data):
+        self.data = data
+
+    def iter_chunks(self, chunk_size):
+        for start in range(0, len(self.data), chunk_size):
+            yield self.data[start : start + chunk_size]
+
+
+class FakeS3Client:
+    """In-memory stand-in for the boto3 S3 client calls the backend uses."""
+
+    def __init__(self):
+        self.objects = {}
+        self.reads = []
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None):
+        chunks = iter(lambda: fileobj.read(CHUNK_SIZE), b"")
+        self.objects[(bucket, key)] = (b"".join(chunks), ExtraArgs or {})
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise NotFound()
+        return {}
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise NotFound()
+        self.reads.append(Key)
+        return {"Body": FakeBody(self.objects[(Bucket, Key)][0])}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"https://s3.test/{Params['Bucket']}/{Params['Key']}?expires={ExpiresIn}&sig=x"
+
+
+@pytest.fixture
+def s3(app):
+    """Switch the app's media storage to a fake S3 bucket."""
+    client = FakeS3Client()
+    app.extensions["storage"] = S3Storage(client, "media-bucket", "prod/")
+    return client
+
+
+class TestLocalStorage:
+    """Test the filesystem backend."""
+
+    def test_round_trip_in_chunks(self, tmp_path):
+        """Test streams are stored and read back in bounded chunks."""
+        media = LocalStorage(str(tmp_path))
+        data = bytes(range(256)) * 1000  # several chunks
+
+        media.save("fliers/a.jpg", io.BytesIO(data))
+
+        chunks = list(media.open("fliers/a.jpg"))
+        assert len(chunks) > 1 and max(map(len, chunks)) <= CHUNK_SIZE
+        assert b"".join(chunks) == data == media.read("fliers/a.jpg")
+        assert media.exists("fliers/a.jpg")
+        assert media.url("fliers/a.jpg") is None
+
+    def test_missing_and_delete(self, tmp_path):
+        """Test missing keys and deletion."""
+        media = LocalStorage(str(tmp_path))
+        media.save("qrcodes/x.png", b"png")
+        media.delete("qrcodes/x.png")
+        media.delete("qrcodes/x.png")
+
+        assert not media.exists("qrcodes/x.png")
+        assert media.read("qrcodes/x.png") is None
+        with pytest.raises(FileNotFoundError):
+            media.open("qrcodes/x.png")
+
+    def test_keys_cannot_escape_root(self, tmp_path):
+        """Test traversal keys are refused."""
+        with pytest.raises(ValueError):
+            LocalStorage(str(tmp_path / "media")).save("../outside.txt", b"x")
+
+
+class TestS3Storage:
+    """Test the S3 backend against an in-memory stand-in."""
+
+    def test_round_trip(self, app):
+        """Test uploads carry headers and downloads arrive in chunks."""
+        client = FakeS3Client()
+        media = S3Storage(client, "bucket", "prod/")
+        data = b"x" * (CHUNK_SIZE * 2 + 1)
+
+        media.save("fliers/a.webp", data, "image/webp", "public, max-age=60")
+
+        assert client.objects[("bucket", "prod/fliers/a.webp")][1] == {
+            "ContentType": "image/webp",
+            "CacheControl": "public, max-age=60",
+        }
+        assert [len(chunk) for chunk in media.open("fliers/a.webp")] == [
+            CHUNK_SIZE,
+            CHUNK_SIZE,
+            1,
+        ]
+        assert media.exists("fliers/a.webp")
+        assert media.url("fliers/a.webp") == (
+            "https://s3.test/bucket/prod/fliers/a.webp?expires=3600&sig=x"
+        )
+
+        media.delete("fliers/a.webp")
+        assert not media.exists("fliers/a.webp")
+        assert media.read("fliers/a.webp") is None
+
+    def test_other_errors_propagate(self):
+        """Test failures other than a missing key are not swallowed."""
+        client = FakeS3Client()
+        client.head_object = client.get_object = lambda **kwargs: (_ for _ in ()).throw(
+            ConnectionError("down")
+        )
+        media = S3Storage(client, "bucket")
+
+        with pytest.raises(ConnectionError):
+            media.exists("a")
+        with pytest.raises(ConnectionError):
+            media.open("a")
+
+    def test_from_config(self, tmp_path):
+        """Test the backend is chosen by MEDIA_STORAGE_URL."""
+        config = {"MEDIA_STORAGE_URL": None, "MEDIA_ROOT": str(tmp_path)}
+        assert storage_from_config(config).root == str(tmp_path)
+
+        config["MEDIA_STORAGE_URL"] = "file:///srv/media"
+        assert storage_from_config(config).root == "/srv/media"
+
+        config["MEDIA_STORAGE_URL"] = "ftp://example.com/media"
+        with pytest.raises(ValueError):
+            storage_from_config(config)
+
+
+class TestS3Media:
+    """Test QR codes and fliers are stored in and served from the bucket."""
+
+    def test_qr_code_redirects_to_signed_url(self, client, event, s3):
+        """Test the image is rendered into the bucket once and clients are redirected."""
+        from app.qrcodes import checkin_payload, qr_code_url, qr_digest
+
+        url = qr_code_url(event.id, checkin_payload(event))
+        key = f"prod/qrcodes/{qr_digest(checkin_payload(event), 'png')}.png"
+
+        response = client.get(url)
+
+        assert response.status_code == 302
+        assert response.location.startswith(f"https://s3.test/media-bucket/{key}")
+        assert response.cache_control.max_age == 1800
+        data, extra = s3.objects[("media-bucket", key)]
+        assert data.startswith(b"\x89PNG")
+        assert extra["CacheControl"].endswith("immutable")
+
+    def test_flier_variants_uploaded_and_redirected(self, client, admin_client, department, s3):
+        """Test the pipeline writes variants to the bucket and the route redirects."""
+        from PIL import Image
+
+        image = io.BytesIO()
+        Image.new("RGB", (900, 600), "orange").save(image, "JPEG")
+        start = datetime.utcnow() + timedelta(days=2)
+        response = admin_client.post(
+            "/api/events",
+            data={
+                "title": "Bucket Fair",
+                "start_time": start.isoformat(),
+                "end_time": (start + timedelta(hours=1)).isoformat(),
+                "department_id": str(department.id),
+                "flier": (io.BytesIO(image.getvalue()), "fair.jpg"),
+            },
+            content_type="multipart/form-data",
+        )
+
+        variants = response.get_json()["event"]["flier_variants"]
+        keys = {key for _, key in s3.objects if key.startswith("prod/fliers/")}
+        assert keys == {"prod/fliers/" + url.rpartition("/")[2] for url in variants.values()}
+
+        served = client.get(variants["thumb_webp"])
+        assert served.status_code == 302
+        assert "/prod/fliers/" in served.location
+        assert not s3.reads  # the app never downloaded the bytes
@@ -0,0 +1,60 @@
+"""Tests for the background task runner."""
+
+import pytest
+
+from app.tasks import PeriodicWorker, TaskRunner
+
+
+def record_app_name(results):
+    from flask import current_app
+
+    results.append(current_app.name)
+    return "done"
+
+
+def explode():
+    raise RuntimeError("boom")
+
+
+class TestTaskRunner:
+    """Test eager and threaded execution."""
+
+    def test_eager_runs_inline(self, app):
+        """Test eager mode runs the task before returning."""
+        results = []
+        assert TaskRunner(app).submit(record_app_name, results) is None
+        assert results == ["app"]
+
+    def test_threaded_runs_in_app_context(self, app):
+        """Test tasks get an app context on the pool."""
+        app.config["TASKS_EAGER"] = False
+        runner = TaskRunner(app)
+        results = []
+
+        future = runner.submit(record_app_name, results)
+
+        assert future.result(timeout=5) == "done"
+        assert results == ["app"]
+        runner.shutdown()
+
+    def test_failures_are_logged_not_raised(self, app, caplog):
+        """Test a failing task does not propagate into the caller."""
+        TaskRunner(app).submit(explode)
+        assert "Background task explode failed" in caplog.text
+
+    def test_shutdown_without_executor(self, app):
+        """Test shutting down an unused runner is a no-op."""
+        TaskRunner(app).shutdown()
+
+
+class TestPeriodicWorker:
+    """Test the base class of the background threads."""
+
+    def test_tick_must_be_implemented(self, app):
+        """Test a worker without ``tick`` cannot be created."""
+
+        class Idle(PeriodicWorker):
+            pass
+
+        with pytest.raises(TypeError, match="tick"):
+            Idle(app)
@@ -0,0 +1,278 @@
+"""Tests for signed bearer tokens."""
+
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import g
+from sqlalchemy import event
+
+from app import db
+from app.models import RevokedToken, UserPrincipal
+from app.tokens import (
+    issue_access_token,
+    issue_checkin_token,
+    verify_access_token,
+    verify_checkin_token,
+)
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def forget_current_user():
+    """Drop the user Flask-Login cached on ``g`` by a previous request."""
+    g.pop("_login_user", None)
+
+
+class TestAccessTokens:
+    """Test issuing and verifying tokens."""
+
+    def test_issue_and_verify(self, app, student_user):
+        """Test a freshly issued token round-trips its claims."""
+        token, claims = issue_access_token(student_user)
+
+        assert verify_access_token(token) == claims
+        assert claims["uid"] == student_user.id
+        assert claims["role"] == "student"
+        assert claims["dept"] == student_user.department_id
+
+    def test_expired_token_rejected(self, app, student_user):
+        """Test tokens past their expiry are rejected."""
+        token, _ = issue_access_token(student_user, expires_in=-1)
+        assert verify_access_token(token) is None
+
+    def test_tampered_token_rejected(self, app, student_user):
+        """Test tokens signed with another key are rejected."""
+        token, _ = issue_access_token(student_user)
+        app.config["SECRET_KEY"] = "another-key"
+        assert verify_access_token(token) is None
+        assert verify_access_token("garbage") is None
+
+
+class TestCheckInTokens:
+    """Test the signed tokens printed in event QR codes."""
+
+    def test_claims_cover_event_and_window(self, app, event):
+        """Test the token carries the event, department and check-in window."""
+        claims = verify_checkin_token(issue_checkin_token(event))
+
+        assert claims["eid"] == event.id
+        assert claims["dept"] == event.department_id
+        assert claims["exp"] - claims["nbf"] == 2 * 3600 + 2 * 3600  # event + margins
+        assert "slot" not in claims
+
+    def test_window_on_campus_clock(self, app, event):
+        """Test event times are read as campus wall-clock times, not UTC."""
+        app.config["EVENT_TIMEZONE"] = "America/New_York"
+        event.start_time = datetime(2031, 7, 1, 14)  # 14:00 EDT is 18:00 UTC
+        event.end_time = datetime(2031, 7, 1, 16)
+
+        claims = verify_checkin_token(issue_checkin_token(event))
+
+        starts = datetime(2031, 7, 1, 18, tzinfo=timezone.utc).timestamp()
+        assert claims["nbf"] == starts - 3600
+        assert claims["exp"] == starts + 2 * 3600 + 3600
+
+    def test_series_token(self, app, event):
+        """Test a series' token spans every occurrence, open-ended without an end."""
+        from app.recurrence import set_recurrence
+
+        set_recurrence(event, "FREQ=WEEKLY;COUNT=3")
+        claims = verify_checkin_token(issue_checkin_token(event))
+
+        assert claims["series"] is True
+        assert (
+            claims["nbf"] == int(event.start_time.replace(tzinfo=timezone.utc).timestamp()) - 3600
+        )
+        last_end = event.end_time + timedelta(weeks=2)
+        assert claims["exp"] == int(last_end.replace(tzinfo=timezone.utc).timestamp()) + 3600
+
+        set_recurrence(event, "FREQ=WEEKLY")
+        assert verify_checkin_token(issue_checkin_token(event))["exp"] is None
+        rotating = verify_checkin_token(issue_checkin_token(event, rotation=60))
+        assert rotating["exp"] == (rotating["slot"] + 2) * 60
+
+    def test_fixed_token_is_stable_until_retimed(self, app, event):
+        """Test the printed code only changes when the event's times do."""
+        token = issue_checkin_token(event)
+        assert issue_checkin_token(event) == token
+
+        event.end_time += timedelta(hours=1)
+        assert issue_checkin_token(event) != token
+
+    def test_rotating_token_expires_with_its_slot(self, app, event):
+        """Test rotating tokens last until the end of the following slot."""
+        now = time.time()
+        claims = verify_checkin_token(issue_checkin_token(event, rotation=60, now=now))
+
+        assert claims["slot"] == int(now // 60)
+        assert claims["exp"] == (claims["slot"] + 2) * 60
+        assert issue_checkin_token(event, rotation=60, now=now + 60) != issue_checkin_token(
+            event, rotation=60, now=now
+        )
+
+    def test_forged_token_rejected(self, app, event):
+        """Test tokens signed with another key or salt are rejected."""
+        access_token, _ = issue_access_token(event.creator)
+        assert verify_checkin_token(access_token) is None
+        assert verify_checkin_token("garbage") is None
+
+        token = issue_checkin_token(event)
+        app.config["SECRET_KEY"] = "another-key"
+        assert verify_checkin_token(token) is None
+
+
+class TestTokenRoutes:
+    """Test token endpoints and bearer authentication."""
+
+    def test_issue_token(self, client, student_user):
+        """Test exchanging credentials for a token."""
+        response = client.post(
+            "/api/auth/token", json={"email": "student@test.com", "password": "password123"}
+        )
+
+        assert response.status_code == 201
+        data = response.get_json()
+        assert data["token_type"] == "Bearer"
+        assert data["expires_at"] > time.time()
+        assert verify_access_token(data["access_token"])["uid"] == student_user.id
+
+    def test_issue_token_missing_fields(self, client):
+        """Test credentials are required."""
+        response = client.post("/api/auth/token", json={"email": "student@test.com"})
+        assert response.status_code == 400
+
+    def test_issue_token_bad_password(self, client, student_user):
+        """Test wrong credentials are rejected."""
+        response = client.post(
+            "/api/auth/token", json={"email": "student@test.com", "password": "wrong"}
+        )
+        assert response.status_code == 401
+
+    def test_issue_token_disabled_account(self, client, student_user):
+        """Test disabled accounts cannot get tokens."""
+        student_user.is_active = False
+        db.session.commit()
+
+        response = client.post(
+            "/api/auth/token", json={"email": "student@test.com", "password": "password123"}
+        )
+        assert response.status_code == 403
+
+    def test_bearer_token_authorizes_without_users_query(self, app, client, admin_user):
+        """Test role checks are served from the token claims alone."""
+        token, _ = issue_access_token(admin_user)
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            response = client.get("/api/attendance/my-events", headers=bearer(token))
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+
+        assert response.status_code == 200
+        assert not [s for s in statements if "FROM users" in s]
+
+    def test_bearer_token_require_role(self, client, student_user):
+        """Test require_role uses the role carried by the token."""
+        token, _ = issue_access_token(student_user)
+        response = client.get("/api/admin/dashboard", headers=bearer(token))
+        assert response.status_code == 403
+
+    def test_bearer_token_check_in(self, client, student_user, event):
+        """Test a kiosk can check in with a token."""
+        token, _ = issue_access_token(student_user)
+        response = client.post(
+            "/api/attendance/check-in", json={"event_id": event.id}, headers=bearer(token)
+        )
+        assert response.status_code == 201
+
+    def test_invalid_bearer_token(self, client):
+        """Test malformed or unsigned tokens are anonymous."""
+        assert client.get("/api/auth/me", headers=bearer("nope")).status_code == 302
+        assert client.get("/api/auth/me", headers={"Authorization": "Basic x"}).status_code == 302
+
+    def test_revoked_token_rejected_on_writes_only(self, client, student_user, event):
+        """Test the revocation list is consulted for writes."""
+        token, _ = issue_access_token(student_user)
+
+        response = client.post("/api/auth/token/revoke", headers=bearer(token))
+        assert response.status_code == 200
+        assert RevokedToken.query.count() == 1
+
+        forget_current_user()
+        assert client.get("/api/auth/me", headers=bearer(token)).status_code == 200
+
+        forget_current_user()
+        response = client.post(
+            "/api/attendance/check-in", json={"event_id": event.id}, headers=bearer(token)
+        )
+        assert response.status_code == 302
+
+    def test_tokens_outdated_by_role_change_or_deactivation(self, client, student_user, event):
+        """Test tokens issued before a role change or deactivation cannot write."""
+
+        def check_in(token):
+            forget_current_user()
+            return client.post(
+                "/api/attendance/check-in", json={"event_id": event.id}, headers=bearer(token)
+            )
+
+        old, _ = issue_access_token(student_user)
+        student_user.role = "department_admin"
+        db.session.commit()
+        new, _ = issue_access_token(student_user)
+        student_user.first_name = "Renamed"  # not carried by the token
+        db.session.commit()
+
+        assert check_in(old).status_code == 302
+        assert check_in(new).status_code == 201
+        forget_current_user()
+        assert client.get("/api/auth/me", headers=bearer(old)).status_code == 200
+
+        student_user.is_active = False
+        db.session.commit()
+        assert check_in(new).status_code == 302
+
+        gone, _ = issue_access_token(UserPrincipal(9999, "student", None, True))
+        assert check_in(gone).status_code == 302
+
+    def test_revoke_twice_and_prune(self, app, client, student_user):
+        """Test revoking is idempotent and prunes expired entries."""
+        from datetime import datetime, timedelta
+
+        db.session.add(
+            RevokedToken(
+                jti="old",
+                user_id=student_user.id,
+                expires_at=datetime.utcnow() - timedelta(days=1),
+            )
+        )
+        db.session.commit()
+        token, _ = issue_access_token(student_user)
+        other, _ = issue_access_token(student_user)
+
+        response = client.post(
+            "/api/auth/token/revoke", json={"token": token}, headers=bearer(other)
+        )
+        assert response.status_code == 200
+        from app.tokens import revoke_token
+
+        revoke_token(verify_access_token(token))
+
+        assert [r.jti for r in RevokedToken.query.all()] == [verify_access_token(token)["jti"]]
+
+    def test_revoke_requires_valid_token(self, authenticated_client):
+        """Test revoking needs a token to act on."""
+        response = authenticated_client.post("/api/auth/token/revoke", json={"token": "bad"})
+        assert response.status_code == 400
+
+    def test_revoke_other_users_token(self, authenticated_client, admin_user):
+        """Test users cannot revoke someone else's token."""
+        token, _ = issue_access_token(admin_user)
+        response = authenticated_client.post("/api/auth/token/revoke", json={"token": token})
+        assert response.status_code == 403
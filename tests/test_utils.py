@@ -4,13 +4,13 @@ from app.utils import generate_qr_code, validate_email
 class TestUtils:
     """Test utility functions."""
 
-    def test_generate_qr_code(self, app):
+    def test_generate_qr_code(self, app, event):
         """Test QR code generation."""
         with app.app_context():
-            qr_path = generate_qr_code(1)
+            qr_path = generate_qr_code(event)
 
-            assert qr_path is not None
-            assert "event_1.png" in qr_path
+            assert qr_path.startswith(f"/api/events/{event.id}/qr-code/")
+            assert qr_path.endswith(".png")
 
     def test_validate_email_valid(self):
         """Test email validation with valid emails."""
@@ -35,10 +35,10 @@ class TestUtils:
         response = authenticated_client.get("/api/admin/dashboard")
         assert response.status_code == 403
 
-    def test_generate_qr_code_with_custom_url(self, app):
+    def test_generate_qr_code_with_custom_url(self, app, event):
         """Test QR code generation with custom base URL."""
         with app.app_context():
-            qr_path = generate_qr_code(999, base_url="https://custom.com")
+            qr_path = generate_qr_code(event, base_url="https://custom.com")
             assert qr_path is not None
 
     def test_validate_email_empty(self):
@@ -54,10 +54,10 @@ class TestUtils:
         """Test email validation with special characters."""
         assert validate_email("test!#$%@example.com") is not None
 
-    def test_generate_qr_code_creates_directory(self, app):
+    def test_generate_qr_code_creates_directory(self, app, event):
         """Test QR code generation creates directory if not exists."""
         with app.app_context():
-            qr_path = generate_qr_code(12345)
+            qr_path = generate_qr_code(event)
             assert qr_path is not None
 
     def test_validate_email_colby_domain(self):